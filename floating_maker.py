@@ -16,6 +16,7 @@ from driftpy.constants.numeric_constants import BASE_PRECISION, PRICE_PRECISION
 from borsh_construct.enum import _rust_enum
 
 from extractkey import extractKey
+from src.market_registry import MarketRegistry
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -61,16 +62,10 @@ async def main(
     provider = Provider(connection, wallet)
     drift_acct = ClearingHouse.from_config(config, provider)
 
-    is_perp  = 'PERP' in market_name.upper()
-    market_type = MarketType.PERP() if is_perp else MarketType.SPOT()
-
-    market_index = -1
-    for perp_market_config in config.markets:
-        if perp_market_config.symbol == market_name:
-            market_index = perp_market_config.market_index
-    for spot_market_config in config.banks:
-        if spot_market_config.symbol == market_name:
-            market_index = spot_market_config.bank_index
+    market = MarketRegistry.from_config(config)[market_name]
+    is_perp = market.is_perp
+    market_type = market.market_type
+    market_index = market.market_index
 
     default_order_params = OrderParams(
                 order_type=OrderType.LIMIT(),
@@ -21,6 +21,7 @@ from driftpy.addresses import *
 from driftpy.accounts import *
 
 from src.utils import extractKey
+from src.market_registry import MarketRegistry
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -58,16 +59,10 @@ async def main():
     provider = Provider(connection, wallet)
     drift_acct = ClearingHouse.from_config(config, provider)
 
-    is_perp  = 'PERP' in market_name.upper()
-    market_type = MarketType.PERP() if is_perp else MarketType.SPOT()
-
-    market_index = -1
-    for perp_market_config in config.markets:
-        if perp_market_config.symbol == market_name:
-            market_index = perp_market_config.market_index
-    for spot_market_config in config.banks:
-        if spot_market_config.symbol == market_name:
-            market_index = spot_market_config.bank_index
+    market = MarketRegistry.from_config(config)[market_name]
+    is_perp = market.is_perp
+    market_type = market.market_type
+    market_index = market.market_index
 
     default_order_params = OrderParams(
                 order_type=OrderType.LIMIT(),
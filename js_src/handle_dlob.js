@@ -7,6 +7,9 @@ import {
 	getMarketsAndOraclesForSubscription,
 	DLOB,
 	UserMap,
+	SlotSubscriber,
+	PerpMarkets,
+	SpotMarkets,
 	Wallet,
 	BN,
 	convertToNumber,
@@ -16,6 +19,7 @@ import {
 } from "@drift-labs/sdk";
 import dotenv from 'dotenv';
 import fs from 'fs';
+import net from 'net';
 import bs58 from 'bs58';
 import { join, dirname } from 'path';
 import { fileURLToPath } from 'url';
@@ -27,19 +31,121 @@ const __dirname = dirname(__filename);
 // Construct the absolute path to the .env file
 const pathToEnv = join(__dirname, '..', '.env');
 
+// Default location of the sidecar socket (see --serve)
+const defaultSocketPath = join(__dirname, '..', 'data', 'dlob.sock');
+
+// Default location of the shared-memory ring (see --ring)
+const defaultRingPath = join(__dirname, '..', 'data', 'dlob.ring');
+
+// Delta feed: milliseconds between diffs, and deltas between full resync snapshots
+const deltaIntervalMs = 1000;
+const snapshotEvery = 60;
+
+// Market list is read from MARKET_NAME in src/__init__.py unless --markets is given
+const pathToConstants = join(__dirname, '..', 'src', '__init__.py');
+
+/*
+User account layout used to filter getProgramAccounts (see the User and Order
+types in the Drift IDL): 32 orders of 96 bytes start at byte 1192 and the idle
+flag is at byte 4350. Idle users cannot have open orders.
+*/
+const USER_ORDERS_OFFSET = 1192;
+const USER_ORDER_SIZE = 96;
+const USER_MAX_ORDERS = 32;
+const USER_IDLE_OFFSET = 4350;
+const ORDER_MARKET_INDEX_OFFSET = 80;
+const ORDER_STATUS_OFFSET = 82;
+const ORDER_MARKET_TYPE_OFFSET = 84;
+const ORDER_STATUS_OPEN = 1;
+const MARKET_TYPE_PERP = 1;
+
+// Milliseconds between getProgramAccounts rescans for users that started quoting our markets
+const rescanIntervalMs = 30000;
+
+// Per-snapshot fields, sent once per message instead of on every order
+const headerFields = ['oracle_price', 'oracle_twap'];
+
+/*
+Binary snapshot format (little-endian), decoded by src/dlob_binary.py
+	header (48 bytes): magic 'DLOB', u16 version, u16 record size, u32 count, u32 reserved,
+	                   u64 slot, u64 seq, f64 oracle_price, f64 oracle_twap
+	record (72 bytes): 32 byte user pubkey, u32 orderId, u8 orderType, u8 direction,
+	                   u8 existingPositionDirection, u8 postOnly, f64 price,
+	                   f64 baseAssetAmount, f64 baseAssetAmountFilled, f64 oraclePriceOffset
+*/
+const BINARY_VERSION = 1;
+const BINARY_HEADER_SIZE = 48;
+const BINARY_RECORD_SIZE = 72;
+const ORDER_TYPES = ['market', 'limit', 'triggerMarket', 'triggerLimit', 'oracle'];
+const DIRECTIONS = ['long', 'short'];
+
+/*
+Shared-memory ring of binary snapshots, read with mmap by src/dlob_ring.py
+	header (64 bytes): magic 'DRNG', u16 version, u16 reserved, u32 slot count,
+	                   u32 slot size, u64 write seq (last published snapshot), reserved
+	slot (slot size bytes): u64 slot seq, u32 length, u32 reserved, binary snapshot
+Snapshot n goes to slot (n - 1) % slot count. Each slot is a seqlock: its seq
+is 2n - 1 while being written and 2n once complete, and the header write seq
+is only advanced to n after the slot is complete.
+*/
+const RING_VERSION = 1;
+const RING_HEADER_SIZE = 64;
+const RING_SLOT_HEADER_SIZE = 16;
+const RING_SLOTS = 16;
+const RING_SLOT_SIZE = 1 << 20;
 
 // Load the environment variables
 dotenv.config({ path: pathToEnv });
-/* 
+/*
 This code uses the template from sdk/src/examples/loadDlob.ts
 And modifies it to read, filter, and store data from
 dlob.getDLOBOrders()
+
+Usage:
+	node handle_dlob.js [--json]            One-shot: write data/dlob.bin (or data/dlob.json) and data/userorders.json then exit
+	node handle_dlob.js --serve [--socket]  Sidecar: stay subscribed and serve snapshots over a Unix socket
+	node handle_dlob.js --serve --ring      Sidecar that also publishes every snapshot to data/dlob.ring
+	--markets SOL-PERP,BTC-PERP             Perp markets to load (default: MARKET_NAME in src/__init__.py)
+	--all-users                             Subscribe the full UserMap instead of only users quoting our markets
+	--websocket                             Receive account updates over websocket subscriptions instead of polling
+
+In sidecar mode a client can also send {"type": "subscribe"} to receive a
+delta feed: a snapshot message followed by one delta message per interval,
+each tagged with a sequence number and the slot. Every snapshotEvery deltas a
+full snapshot is pushed so subscribers can resync.
 */
 const main = async () => {
+	const args = parseArgs(process.argv.slice(2));
+	const ctx = await connect(args);
+
+	if (args.serve) {
+		await serve(ctx, args);
+		return;
+	}
+	const snapshot = await buildSnapshot(ctx);
+	// Store DLOB in data directory
+	const filename2 = join(__dirname, '..','data/','userorders.json');
+	if (args.json) {
+		const filename = join(__dirname, '..','data/','dlob.json');
+		create_JSON(filename, JSON.stringify(snapshot.dlob));
+	} else {
+		const filename = join(__dirname, '..','data/','dlob.bin');
+		create_JSON(filename, encodeSnapshot(snapshot, 0));
+	}
+	create_JSON(filename2, JSON.stringify(snapshot.userorders));
+	await disconnect(ctx);
+};
+
+/*
+Initialize the SDK, subscribe a DriftClient for our markets and load the
+users with open orders in them (or the full UserMap with --all-users).
+Returns the handles needed to build snapshots and to tear down.
+*/
+async function connect(args) {
 	// Initialize Drift SDK
 	console.log(__dirname)
 	const sdkConfig = initialize({ env });
-	
+
     // Load privatekey
 	const keypath = process.env.ANCHOR_WALLET;
     const privateKey = await get_privateKey(keypath);
@@ -47,11 +153,11 @@ const main = async () => {
 	// Determine type(privatekey): base58 (string) or base64 (object)
 	let keypair;
 	if(typeof privateKey === "string"){
-		//decode to Uint8Array object 
+		//decode to Uint8Array object
 		const privateKeyBytes = bs58.decode(privateKey)
 		keypair = Keypair.fromSecretKey(privateKeyBytes);
 	}
-	else { keypair = Keypair.fromSecretKey(Uint8Array.from((privateKey))); 
+	else { keypair = Keypair.fromSecretKey(Uint8Array.from((privateKey)));
 	}
     // Set up the Wallet, Provider, Connection
     const wallet = new Wallet(keypair);
@@ -63,44 +169,238 @@ const main = async () => {
 
 	// Set up the Drift Clearing House
 	const driftPublicKey = new PublicKey(sdkConfig.DRIFT_PROGRAM_ID);
-	const bulkAccountLoader = new BulkAccountLoader(connection,'confirmed',1000);
+	const markets = resolveMarkets(args.markets);
+
+	// Account updates are either polled in bulk or pushed over websocket subscriptions
+	let bulkAccountLoader, slotSubscriber, accountSubscription, getSlot, trackAccount;
+	if (args.websocket) {
+		slotSubscriber = new SlotSubscriber(connection);
+		await slotSubscriber.subscribe();
+		accountSubscription = { type: 'websocket' };
+		getSlot = () => slotSubscriber.getSlot();
+		trackAccount = (publicKey, onData) => {
+			const id = connection.onAccountChange(publicKey, (accountInfo) => onData(accountInfo.data), 'confirmed');
+			return () => connection.removeAccountChangeListener(id);
+		};
+	} else {
+		bulkAccountLoader = new BulkAccountLoader(connection,'confirmed',1000);
+		accountSubscription = { type: 'polling', accountLoader: bulkAccountLoader };
+		getSlot = () => bulkAccountLoader.mostRecentSlot;
+		trackAccount = async (publicKey, onData) => {
+			const callbackId = await bulkAccountLoader.addAccount(publicKey, onData);
+			return () => bulkAccountLoader.removeAccount(publicKey, callbackId);
+		};
+	}
+
 	const driftClient = new DriftClient({
 		connection,
 		wallet: provider.wallet,
 		programID: driftPublicKey,
-		...getMarketsAndOraclesForSubscription(env),
-		accountSubscription: {
-			type: 'polling',
-			accountLoader: bulkAccountLoader,
-		},
+		...(args.allUsers ? getMarketsAndOraclesForSubscription(env) : getMarketsAndOracles(markets)),
+		accountSubscription,
 	});
 
 	//console.log('Subscribing drift client...');
 	await driftClient.subscribe();
 
-	//console.log('Loading user map...');
-	const userMap = new UserMap(driftClient, {
-		type: 'polling',
-		accountLoader: bulkAccountLoader,
-	});
+	let userMap;
+	if (args.allUsers) {
+		//console.log('Loading user map...');
+		userMap = new UserMap(driftClient, accountSubscription);
+	} else {
+		userMap = new MarketOrderMap(driftClient, trackAccount, markets);
+	}
 
-	// Fetches all users and subscribes for updates
+	// Fetches the users and subscribes for updates
 	await userMap.subscribe();
 
+	const userAddress = (await driftClient.getUserAccountPublicKey()).toBase58();
+	return { driftClient, userMap, slotSubscriber, getSlot, userAddress, markets };
+}
+
+/*
+Resolve perp market symbols (e.g. SOL-PERP) to their SDK market configs.
+Without explicit names, MARKET_NAME is read from src/__init__.py.
+*/
+function resolveMarkets(names) {
+	if (!names) {
+		const constants = fs.readFileSync(pathToConstants, 'utf8');
+		const line = constants.split('\n').find((l) => l.startsWith('MARKET_NAME'));
+		names = line ? [...line.matchAll(/["']([^"']+)["']/g)].map((m) => m[1]) : [];
+	}
+	const markets = names.map((name) => {
+		const market = PerpMarkets[env].find((config) => config.symbol === name);
+		if (market === undefined) {
+			throw new Error(`Unknown perp market: ${name}`);
+		}
+		return market;
+	});
+	if (markets.length === 0) {
+		throw new Error('No markets configured: set MARKET_NAME in src/__init__.py');
+	}
+	return markets;
+}
+
+/*
+DriftClient subscription limited to our perp markets, the quote spot market
+and their oracles.
+*/
+function getMarketsAndOracles(markets) {
+	const oracleInfos = new Map();
+	const quoteMarket = SpotMarkets[env][0];
+	for (const market of [...markets, quoteMarket]) {
+		oracleInfos.set(market.oracle.toString(), { publicKey: market.oracle, source: market.oracleSource });
+	}
+	return {
+		perpMarketIndexes: markets.map((market) => market.marketIndex),
+		spotMarketIndexes: [quoteMarket.marketIndex],
+		oracleInfos: Array.from(oracleInfos.values()),
+	};
+}
+
+/*
+Loads and tracks only the user accounts with open perp orders in our markets,
+as a drop-in for UserMap when building the DLOB.
+
+Users are found with getProgramAccounts filtered to non-idle User accounts and
+sliced to the orders region, and checked on the raw order bytes so only
+matching accounts are decoded. Matching users are then tracked individually
+with trackAccount(publicKey, onData), which resolves to a function that stops
+tracking (polling or websocket, see connect), and the scan is repeated every
+rescanIntervalMs to pick up users that start quoting our markets.
+*/
+class MarketOrderMap {
+	constructor(driftClient, trackAccount, markets) {
+		this.driftClient = driftClient;
+		this.trackAccount = trackAccount;
+		this.marketIndexes = new Set(markets.map((market) => market.marketIndex));
+		// pubkey -> { publicKey, orders, untrack }
+		this.users = new Map();
+		this.timer = undefined;
+	}
+
+	async subscribe() {
+		await this.sync();
+		this.timer = setInterval(() => this.sync().catch((err) => console.error(err)), rescanIntervalMs);
+	}
+
+	async unsubscribe() {
+		clearInterval(this.timer);
+		for (const user of this.users.values()) {
+			await user.untrack();
+		}
+		this.users.clear();
+	}
+
+	async sync() {
+		const coder = this.driftClient.program.coder;
+		const accounts = await this.driftClient.connection.getProgramAccounts(
+			this.driftClient.program.programId,
+			{
+				commitment: this.driftClient.connection.commitment,
+				filters: [
+					{ memcmp: coder.accounts.memcmp('User') },
+					{ memcmp: { offset: USER_IDLE_OFFSET, bytes: bs58.encode(Uint8Array.from([0])) } },
+				],
+				dataSlice: { offset: USER_ORDERS_OFFSET, length: USER_ORDER_SIZE * USER_MAX_ORDERS },
+			}
+		);
+
+		const found = new Set();
+		for (const { pubkey, account } of accounts) {
+			const orders = this.marketOrders(account.data, (offset) =>
+				coder.types.decode('Order', account.data.subarray(offset, offset + USER_ORDER_SIZE)));
+			if (orders.length === 0) continue;
+			const key = pubkey.toBase58();
+			found.add(key);
+			if (this.users.has(key)) {
+				this.users.get(key).orders = orders;
+			} else {
+				const user = { publicKey: pubkey, orders, untrack: undefined };
+				this.users.set(key, user);
+				user.untrack = await this.trackAccount(pubkey, (buffer) => {
+					const userAccount = coder.accounts.decode('User', buffer);
+					user.orders = userAccount.orders.filter((order) => this.isMarketOrder(order));
+				});
+			}
+		}
+		// Stop tracking users that no longer quote our markets
+		for (const [key, user] of this.users) {
+			if (!found.has(key)) {
+				await user.untrack();
+				this.users.delete(key);
+			}
+		}
+	}
+
+	// Decode the open orders in our markets from a buffer holding the 32 order slots
+	marketOrders(data, decode) {
+		const orders = [];
+		for (let i = 0; i < USER_MAX_ORDERS; i++) {
+			const offset = i * USER_ORDER_SIZE;
+			if (data[offset + ORDER_STATUS_OFFSET] === ORDER_STATUS_OPEN
+				&& data[offset + ORDER_MARKET_TYPE_OFFSET] === MARKET_TYPE_PERP
+				&& this.marketIndexes.has(data.readUInt16LE(offset + ORDER_MARKET_INDEX_OFFSET))) {
+				orders.push(decode(offset));
+			}
+		}
+		return orders;
+	}
+
+	isMarketOrder(order) {
+		return 'open' in order.status && 'perp' in order.marketType && this.marketIndexes.has(order.marketIndex);
+	}
+
+	// Orders in the { user, order } form accepted by DLOB.initFromOrders
+	getDLOBOrders() {
+		const dlobOrders = [];
+		for (const user of this.users.values()) {
+			for (const order of user.orders) {
+				dlobOrders.push({ user: user.publicKey, order });
+			}
+		}
+		return dlobOrders;
+	}
+}
+
+async function disconnect(ctx) {
+	//console.log('Unsubscribing users...');
+	await ctx.userMap.unsubscribe();
+
+	//console.log('Unsubscribing drift client...');
+	await ctx.driftClient.unsubscribe();
+	if (ctx.slotSubscriber) {
+		await ctx.slotSubscriber.unsubscribe();
+	}
+}
+
+/*
+Build a snapshot of the first configured market (MARKET_NAME) from the currently loaded users.
+Returns { slot, dlob, userorders } where dlob is the formatted order list.
+*/
+async function buildSnapshot(ctx) {
+	const { driftClient, userMap, getSlot, userAddress, markets } = ctx;
+	const slot = getSlot();
+	const marketIndex = markets[0].marketIndex;
+
 	//console.log('Loading dlob from user map...');
 	const dlob = new DLOB();
-	await dlob.initFromUserMap(userMap, bulkAccountLoader.mostRecentSlot);
+	if (userMap instanceof MarketOrderMap) {
+		dlob.initFromOrders(userMap.getDLOBOrders(), slot);
+	} else {
+		await dlob.initFromUserMap(userMap, slot);
+	}
 
 	const dlobOrders = dlob.getDLOBOrders()
 	//console.log('number of orders', dlobOrders.length);
 
-	// Search and store only SOL-PERP orders
+	// Search and store only orders for our (first) market
 	const SOLPERPOrders = dlobOrders.filter(order => {
-		return order.order.marketIndex === 0 &&
+		return order.order.marketIndex === marketIndex &&
 			   JSON.stringify(order.order.marketType) === '{"perp":{}}';
 	});
 
-	let oracledata = driftClient.getOracleDataForPerpMarket(0)
+	let oracledata = driftClient.getOracleDataForPerpMarket(marketIndex)
 
 	// Recreate JSON with data extracted and type adjustments
 	const ourDLOB = SOLPERPOrders.map(order => {
@@ -115,30 +415,295 @@ const main = async () => {
             direction: Object.keys(order.order.direction)[0],
             existingPositionDirection: Object.keys(order.order.existingPositionDirection)[0],
             postOnly: order.order.postOnly.toString(),
-            oraclePriceOffset: parseFloat(order.order.oraclePriceOffset)/PRICE_PRECISION
+            oraclePriceOffset: parseFloat(order.order.oraclePriceOffset)/PRICE_PRECISION,
+            orderId: order.order.orderId
 	    };
 	});
 	dlob.clear();
 
-	// Create JSON for orders from User Account
-	let userAddress = (await driftClient.getUserAccountPublicKey()).toBase58();
-	const userOrders = dlobOrders.filter(order => {
-		return String(order.order.user) === userAddress;
+	// Create JSON for our own orders in this market, in the same format as the DLOB
+	const userOrders = ourDLOB.filter(order => {
+		return String(order.user) === userAddress;
 	});
-	// Store DLOB in data directory
-	const data = JSON.stringify(ourDLOB);
-	const userOrderData = JSON.stringify(userOrders)
-	const pathToDataDir = join(__dirname, '..','data/');
-    const filename = join(__dirname, '..','data/','dlob.json');
-    const filename2 = join(__dirname, '..','data/','userorders.json');
-	create_JSON(filename, data);
-	create_JSON(filename2,userOrderData);
-	//console.log('Unsubscribing users...');
-	await userMap.unsubscribe();
+	return { slot, dlob: ourDLOB, userorders: userOrders };
+}
 
-	//console.log('Unsubscribing drift client...');
-	await driftClient.unsubscribe();
-};
+/*
+Sidecar mode: keep the DriftClient and UserMap subscribed and answer
+newline-delimited JSON requests on a Unix socket. Each request is one line
+({"type": "dlob"}, {"type": "ping"}, {"type": "subscribe"}, {"type": "snapshot"}
+or {"type": "shutdown"}) and each response is one line of JSON. Subscribed
+sockets additionally receive the pushed delta feed (see tickFeed).
+*/
+async function serve(ctx, args) {
+	const socketPath = args.socket;
+	if (fs.existsSync(socketPath)) {
+		fs.unlinkSync(socketPath);
+	}
+	ctx.feed = { seq: 0, slot: 0, header: {}, orders: new Map(), subscribers: new Set() };
+	if (args.ring) {
+		ctx.ring = new RingWriter(args.ring, RING_SLOTS, RING_SLOT_SIZE);
+	}
+	await tickFeed(ctx);
+	const timer = setInterval(() => tickFeed(ctx).catch((err) => console.error(err)), deltaIntervalMs);
+
+	const server = net.createServer((socket) => {
+		let buffer = '';
+		// Pipelined requests are answered one at a time, in the order they arrived
+		let pending = Promise.resolve();
+		async function answer(line) {
+			const response = await handleRequest(ctx, line, shutdown, socket);
+			if (Buffer.isBuffer(response)) {
+				// Binary payloads are preceded by a JSON line announcing their length
+				socket.write(JSON.stringify({ ok: true, format: 'binary', length: response.length }) + '\n');
+				socket.write(response);
+			} else {
+				socket.write(JSON.stringify(response) + '\n');
+			}
+		}
+		socket.setEncoding('utf8');
+		socket.on('data', (chunk) => {
+			const lines = (buffer + chunk).split('\n');
+			buffer = lines.pop();
+			for (const line of lines) {
+				pending = pending.then(() => answer(line)).catch((err) => console.error(err));
+			}
+		});
+		socket.on('close', () => ctx.feed.subscribers.delete(socket));
+		socket.on('error', (err) => console.error(err));
+	});
+
+	let closing = false;
+	async function shutdown() {
+		if (closing) return;
+		closing = true;
+		clearInterval(timer);
+		server.close();
+		if (ctx.ring) {
+			ctx.ring.close();
+		}
+		if (fs.existsSync(socketPath)) {
+			fs.unlinkSync(socketPath);
+		}
+		await disconnect(ctx);
+		process.exit(0);
+	}
+	process.on('SIGINT', shutdown);
+	process.on('SIGTERM', shutdown);
+
+	server.listen(socketPath, () => {
+		console.log(`DLOB sidecar listening on ${socketPath}`);
+	});
+}
+
+async function handleRequest(ctx, line, shutdown, socket) {
+	let request;
+	try {
+		request = JSON.parse(line);
+	} catch (err) {
+		return { ok: false, error: `invalid request: ${line}` };
+	}
+	try {
+		switch (request.type) {
+			case 'ping':
+				return { ok: true, slot: ctx.getSlot() };
+			case 'dlob':
+				if (request.format === 'binary') {
+					return encodeSnapshot(await buildSnapshot(ctx), ctx.feed.seq);
+				}
+				return { ok: true, ...(await buildSnapshot(ctx)) };
+			case 'subscribe':
+				ctx.feed.subscribers.add(socket);
+				return feedSnapshot(ctx.feed);
+			case 'snapshot':
+				return feedSnapshot(ctx.feed);
+			case 'shutdown':
+				setImmediate(shutdown);
+				return { ok: true };
+			default:
+				return { ok: false, error: `unknown request type: ${request.type}` };
+		}
+	} catch (err) {
+		return { ok: false, error: String(err) };
+	}
+}
+
+/*
+Diff the current book against the last published state and push the
+changes to every subscriber. Orders are keyed by user and orderId:
+	insert  new order
+	fill    baseAssetAmountFilled increased
+	update  any other field changed (e.g. modified price or size)
+	cancel  order left the book (cancelled, expired or fully filled)
+*/
+async function tickFeed(ctx) {
+	const feed = ctx.feed;
+	const snapshot = await buildSnapshot(ctx);
+	const current = new Map();
+	for (const record of snapshot.dlob) {
+		const order = { ...record };
+		for (const field of headerFields) {
+			feed.header[field] = order[field];
+			delete order[field];
+		}
+		current.set(`${order.user}:${order.orderId}`, order);
+	}
+	const changes = [];
+	for (const [key, order] of current) {
+		const previous = feed.orders.get(key);
+		if (previous === undefined) {
+			changes.push({ op: 'insert', key, order });
+		} else if (order.baseAssetAmountFilled > previous.baseAssetAmountFilled) {
+			changes.push({ op: 'fill', key, order });
+		} else if (JSON.stringify(order) !== JSON.stringify(previous)) {
+			changes.push({ op: 'update', key, order });
+		}
+	}
+	for (const key of feed.orders.keys()) {
+		if (!current.has(key)) {
+			changes.push({ op: 'cancel', key });
+		}
+	}
+	feed.orders = current;
+	feed.slot = snapshot.slot;
+	feed.seq += 1;
+	if (ctx.ring) {
+		ctx.ring.publish(encodeSnapshot(snapshot, feed.seq));
+	}
+
+	const message = feed.seq % snapshotEvery === 0
+		? feedSnapshot(feed)
+		: { type: 'delta', seq: feed.seq, slot: feed.slot, ...feed.header, changes };
+	const line = JSON.stringify(message) + '\n';
+	for (const socket of feed.subscribers) {
+		socket.write(line);
+	}
+}
+
+function feedSnapshot(feed) {
+	const orders = [];
+	for (const [key, order] of feed.orders) {
+		orders.push({ key, order });
+	}
+	return { type: 'snapshot', seq: feed.seq, slot: feed.slot, ...feed.header, orders };
+}
+
+/*
+Encode a snapshot into the fixed-width binary format described at the top
+of this file. The oracle fields are written once in the header.
+*/
+function encodeSnapshot(snapshot, seq) {
+	const orders = snapshot.dlob;
+	const buffer = Buffer.alloc(BINARY_HEADER_SIZE + BINARY_RECORD_SIZE * orders.length);
+	const oracle = orders.length > 0 ? orders[0] : { oracle_price: 0, oracle_twap: 0 };
+	buffer.write('DLOB', 0, 'ascii');
+	buffer.writeUInt16LE(BINARY_VERSION, 4);
+	buffer.writeUInt16LE(BINARY_RECORD_SIZE, 6);
+	buffer.writeUInt32LE(orders.length, 8);
+	buffer.writeBigUInt64LE(BigInt(snapshot.slot || 0), 16);
+	buffer.writeBigUInt64LE(BigInt(seq || 0), 24);
+	buffer.writeDoubleLE(oracle.oracle_price, 32);
+	buffer.writeDoubleLE(oracle.oracle_twap, 40);
+
+	let offset = BINARY_HEADER_SIZE;
+	for (const order of orders) {
+		new PublicKey(order.user).toBuffer().copy(buffer, offset);
+		buffer.writeUInt32LE(order.orderId, offset + 32);
+		buffer.writeUInt8(ORDER_TYPES.indexOf(order.orderType), offset + 36);
+		buffer.writeUInt8(DIRECTIONS.indexOf(order.direction), offset + 37);
+		buffer.writeUInt8(DIRECTIONS.indexOf(order.existingPositionDirection), offset + 38);
+		buffer.writeUInt8(order.postOnly === 'true' ? 1 : 0, offset + 39);
+		buffer.writeDoubleLE(order.price, offset + 40);
+		buffer.writeDoubleLE(order.baseAssetAmount, offset + 48);
+		buffer.writeDoubleLE(order.baseAssetAmountFilled, offset + 56);
+		buffer.writeDoubleLE(order.oraclePriceOffset, offset + 64);
+		offset += BINARY_RECORD_SIZE;
+	}
+	return buffer;
+}
+
+/*
+Writer side of the snapshot ring described at the top of this file. The ring
+file is written with positional writes so the reader's mmap sees the same
+page cache; an existing ring of the same geometry is reused and its write seq
+continued, so a restarted sidecar never truncates a file a reader has mapped.
+*/
+class RingWriter {
+	constructor(path, slots, slotSize) {
+		this.slots = slots;
+		this.slotSize = slotSize;
+		const size = RING_HEADER_SIZE + slots * slotSize;
+		this.seq = 0n;
+		if (fs.existsSync(path) && fs.statSync(path).size === size) {
+			this.fd = fs.openSync(path, 'r+');
+			const header = Buffer.alloc(RING_HEADER_SIZE);
+			fs.readSync(this.fd, header, 0, RING_HEADER_SIZE, 0);
+			if (header.toString('ascii', 0, 4) === 'DRNG' && header.readUInt16LE(4) === RING_VERSION
+				&& header.readUInt32LE(8) === slots && header.readUInt32LE(12) === slotSize) {
+				this.seq = header.readBigUInt64LE(16);
+				return;
+			}
+		} else {
+			this.fd = fs.openSync(path, 'w+');
+			fs.ftruncateSync(this.fd, size);
+		}
+		const header = Buffer.alloc(RING_HEADER_SIZE);
+		header.write('DRNG', 0, 'ascii');
+		header.writeUInt16LE(RING_VERSION, 4);
+		header.writeUInt32LE(slots, 8);
+		header.writeUInt32LE(slotSize, 12);
+		fs.writeSync(this.fd, header, 0, RING_HEADER_SIZE, 0);
+	}
+
+	publish(payload) {
+		if (payload.length > this.slotSize - RING_SLOT_HEADER_SIZE) {
+			console.error(`DLOB snapshot of ${payload.length} bytes does not fit a ring slot`);
+			return;
+		}
+		const n = this.seq + 1n;
+		const offset = RING_HEADER_SIZE + Number((n - 1n) % BigInt(this.slots)) * this.slotSize;
+		const slotHeader = Buffer.alloc(RING_SLOT_HEADER_SIZE);
+		// Mark the slot as being written, then write the payload and mark it complete
+		slotHeader.writeBigUInt64LE(2n * n - 1n, 0);
+		slotHeader.writeUInt32LE(payload.length, 8);
+		fs.writeSync(this.fd, slotHeader, 0, RING_SLOT_HEADER_SIZE, offset);
+		fs.writeSync(this.fd, payload, 0, payload.length, offset + RING_SLOT_HEADER_SIZE);
+		slotHeader.writeBigUInt64LE(2n * n, 0);
+		fs.writeSync(this.fd, slotHeader, 0, 8, offset);
+		// Publish
+		const seq = Buffer.alloc(8);
+		seq.writeBigUInt64LE(n, 0);
+		fs.writeSync(this.fd, seq, 0, 8, 16);
+		this.seq = n;
+	}
+
+	close() {
+		fs.closeSync(this.fd);
+	}
+}
+
+function parseArgs(argv) {
+	const args = { serve: false, json: false, socket: defaultSocketPath, ring: null, markets: null, allUsers: false, websocket: false };
+	for (let i = 0; i < argv.length; i++) {
+		if (argv[i] === '--serve') {
+			args.serve = true;
+		} else if (argv[i] === '--json') {
+			args.json = true;
+		} else if (argv[i] === '--socket') {
+			args.socket = argv[++i];
+		} else if (argv[i] === '--markets') {
+			args.markets = argv[++i].split(',');
+		} else if (argv[i] === '--all-users') {
+			args.allUsers = true;
+		} else if (argv[i] === '--websocket') {
+			args.websocket = true;
+		} else if (argv[i] === '--ring') {
+			// Optional path; defaults to data/dlob.ring
+			args.ring = argv[i + 1] && !argv[i + 1].startsWith('--') ? argv[++i] : defaultRingPath;
+		}
+	}
+	return args;
+}
 
 function get_privateKey(keypath) {
 	return new Promise((resolve, reject) => {
@@ -164,4 +729,3 @@ function create_JSON(filename, data) {
 };
 
 main();
-
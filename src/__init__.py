@@ -4,15 +4,162 @@ ENV = 'devnet'
 """str: The current environment (e.g. devnet)."""
 
 MARKET_NAME = "SOL-PERP"
-"""str: The name of the market (e.g. SOL-PERP)."""
+"""str: The name of the market (e.g. SOL-PERP). js_src/handle_dlob.js reads it to only load users quoting this market."""
 
 URL = 'https://api.devnet.solana.com'
 """str: The URL of the API to use."""
 
+RPC_URLS = [URL]
+"""list[str]: RPC endpoints pooled by src/rpc_pool.py. Add more (e.g. private devnet nodes) to route around slow or rate limited ones."""
+
 # DEV CONSTANTS
 DEV_MODE = False
 """bool: Whether the code is currently running in development mode. Use archived data to reduce runtime"""
 
+# DLOB SOURCE
+DLOB_ENGINE = 'js'
+"""str: Builder of the order book: 'js' (js_src/handle_dlob.js, configured below) or 'python' (src/dlob_builder.py, no Node)."""
+
+FETCH_TIMEOUT = 30
+"""int: Seconds a cycle's concurrent data fetch (driftpy, DLOB and the TRADE_FREQUENCY wait) may take before it is cancelled."""
+
+# DLOB SIDECAR
+USE_DLOB_SIDECAR = True
+"""bool: Keep js_src/handle_dlob.js running as a subscribed sidecar instead of spawning node every cycle."""
+
+DLOB_SOCKET_NAME = 'dlob.sock'
+"""str: File name (inside data/) of the Unix socket the DLOB sidecar listens on."""
+
+DLOB_SIDECAR_TIMEOUT = 60
+"""int: Seconds to wait for the sidecar to start or answer a request before giving up."""
+
+USE_BINARY_DLOB = True
+"""bool: Transfer full DLOB snapshots in the fixed-width binary format (data/dlob.bin) instead of JSON."""
+
+USE_DLOB_DELTAS = True
+"""bool: Keep a local book in sync with the sidecar delta feed instead of requesting full snapshots."""
+
+USE_DLOB_RING = False
+"""bool: Read the latest snapshot from the sidecar's shared-memory ring (takes precedence over USE_DLOB_DELTAS)."""
+
+DLOB_RING_NAME = 'dlob.ring'
+"""str: File name (inside data/) of the memory-mapped snapshot ring written by the sidecar."""
+
+# RPC POOL
+RPC_EWMA_ALPHA = 0.2
+"""float: Weight of the newest request in each endpoint's moving average latency."""
+
+RPC_HEDGE_PERCENTILE = 90
+"""float: Percentile of an endpoint's recent latencies after which an unanswered read is also sent to the next fastest endpoint."""
+
+RPC_HEDGE_DELAY = 0.5
+"""float: Seconds before hedging a read while an endpoint has too few latency samples for the percentile."""
+
+RPC_TIMEOUT = 10
+"""float: Seconds before a single RPC request is abandoned."""
+
+RPC_MAX_FAILURES = 3
+"""int: Consecutive failed requests after which an endpoint is benched."""
+
+RPC_COOLDOWN = 30
+"""float: Seconds a benched endpoint only serves requests when no healthy endpoint is left."""
+
+# ACCOUNT SUBSCRIPTIONS
+USE_WEBSOCKET_FEEDS = True
+"""bool: Keep user, market and oracle accounts (and the sidecar's order accounts) updated from websocket notifications instead of polling RPC every cycle."""
+
+USE_BATCHED_ACCOUNT_FETCH = True
+"""bool: Without websocket feeds, load the user, market and oracle accounts with one getMultipleAccounts call per cycle and compute collateral, liability and PnL locally."""
+
+WEBSOCKET_RECONNECT_DELAY = 1
+"""int: Seconds to wait before reconnecting a dropped account websocket."""
+
+WEBSOCKET_TIMEOUT = 30
+"""int: Seconds to wait for the account websocket subscriptions to be confirmed."""
+
+# SNAPSHOT CONSISTENCY
+SNAPSHOT_DEGRADE_SLOT_SKEW = 25
+"""int: Slots the DLOB, user and market data may be apart before a cycle trades in degraded mode (wider quotes)."""
+
+SNAPSHOT_MAX_SLOT_SKEW = 150
+"""int: Slots the DLOB, user and market data may be apart before a cycle is skipped."""
+
+SNAPSHOT_DEGRADE_AGE = 15
+"""int: Seconds since the oldest dataset was received before a cycle trades in degraded mode. Includes the TRADE_FREQUENCY wait."""
+
+SNAPSHOT_MAX_AGE = 30
+"""int: Seconds since the oldest dataset was received before a cycle is skipped."""
+
+# ORDER BOOK
+ORDERBOOK_TICK_SIZES = (0.01, 0.1, 1.0)
+"""tuple[float]: Level widths aggregated together (from the finest price levels) the first time any of them is read."""
+
+ORDERBOOK_BPS_BUCKET = 10
+"""int: Level width, in basis points of the mid price, of the 'bps' order book resolution."""
+
+# MARKET REGISTRY
+MIN_ORDER_SIZE = 0.1
+"""float: Smallest order size (base asset) assumed until the market account's min_order_size is loaded."""
+
+# QUOTE RECONCILIATION
+USE_QUOTE_RECONCILIATION = True
+"""bool: Only cancel, modify or place the orders that differ from the wanted ladder instead of adding to or rebuilding it."""
+
+QUOTE_PRICE_TOLERANCE = 0.005
+"""float: Oracle offset difference (USD) within which a resting order is kept for a wanted quote."""
+
+QUOTE_SIZE_TOLERANCE = 0.1
+"""float: Size difference, as a fraction of the wanted size, within which a resting order is kept for a wanted quote."""
+
+# TRANSACTION PACKING
+TX_MAX_SIZE = 1232
+"""int: Largest serialized transaction (bytes): the 1280 byte IPv6 MTU less the IP and UDP headers."""
+
+TX_IX_COMPUTE_UNITS = 100_000
+"""int: Compute units assumed for one order instruction when packing transactions."""
+
+TX_MAX_COMPUTE_UNITS = 1_400_000
+"""int: Compute budget of a transaction."""
+
+# TRANSACTION PIPELINE
+USE_TX_PIPELINE = True
+"""bool: Sign transactions with a blockhash refreshed in the background and reuse instruction templates."""
+
+BLOCKHASH_REFRESH = 2.0
+"""float: Seconds between background blockhash refreshes."""
+
+BLOCKHASH_MAX_AGE = 30.0
+"""float: Seconds after which a cached blockhash is no longer used (blockhashes expire after ~60-90s)."""
+
+TX_TEMPLATE_TTL = 60.0
+"""float: Seconds instruction templates (accounts, cancel-all) are reused before being rebuilt."""
+
+# CONFIRMATION TRACKING
+USE_ASYNC_SUBMISSION = True
+"""bool: Send orders in the background and track confirmations instead of awaiting them in the trading loop."""
+
+CONFIRM_COMMITMENT = 'confirmed'
+"""str: Commitment at which a sent transaction counts as landed."""
+
+CONFIRM_POLL_INTERVAL = 0.5
+"""float: Seconds between getSignatureStatuses polls of pending transactions."""
+
+CONFIRM_TIMEOUT = 60.0
+"""float: Seconds after which a transaction that never got a status is counted as expired."""
+
+CONFIRM_WINDOW = 100
+"""int: Number of landing latencies kept for confirmation stats."""
+
+# ORDER MANAGEMENT
+USE_ORDER_MANAGER = True
+"""bool: Track our orders locally, reconciled with the user account, instead of reading them from the DLOB."""
+
+OMS_PENDING_TIMEOUT = 30.0
+"""float: Seconds a submitted order may go unseen in the user account before it is counted as expired."""
+
+OMS_HISTORY = 500
+"""int: Number of closed orders and fills the order manager keeps."""
+
 # TRADING, SAMPLING, AND DELETION PERIODS
 TRADE_FREQUENCY = 10
 """int: The frequency (in seconds) at which the code should attempt to place trades."""
@@ -0,0 +1,354 @@
+"""Websocket account subscriptions and batched account loads.
+
+Keeps in-memory copies of the accounts ClearingHouseUser reads (state, spot
+and perp markets, their oracles and the user account) up to date from
+accountSubscribe notifications, so each trading cycle reads local memory
+instead of re-fetching every account over RPC. Without websockets, the same
+accounts are refreshed with a single getMultipleAccounts call per cycle.
+
+Classes:
+- AccountSubscriber: Maintains a ClearingHouseUser cache from websocket notifications.
+- BatchAccountLoader: Refreshes a ClearingHouseUser cache with one getMultipleAccounts call.
+
+Functions:
+- websocket_url(http_url: str) -> str: Returns the websocket endpoint matching an RPC URL.
+- decode_oracle_data(address, value: dict, slot: int) -> OracleData: Decodes a Pyth price account notification.
+- cached_accounts(chu: ClearingHouseUser) -> dict: Maps every account in a ClearingHouseUser cache to its places in the cache.
+- decode_account(chu, key: str, pubkey: str, value: dict, slot: int): Decodes an account as stored in the cache.
+"""
+import asyncio
+import base64
+import json
+import time
+from typing import Optional
+
+import websockets
+from pythclient.pythaccounts import PythPriceAccount
+from pythclient.solana import SolanaPublicKey
+
+from driftpy.clearing_house_user import ClearingHouseUser
+from driftpy.math.oracle import OracleData, convert_pyth_price
+from driftpy.addresses import *
+
+import sys
+from pathlib import Path
+base_path = Path(__file__).resolve().parent
+sys.path.append(str(base_path.parent))
+from src import *
+
+
+def websocket_url(http_url: str) -> str:
+    """
+    Returns the websocket endpoint of an RPC node from its HTTP URL.
+
+    Args:
+        http_url (str): The RPC URL, e.g. https://api.devnet.solana.com
+
+    Returns:
+        str: The websocket URL, e.g. wss://api.devnet.solana.com
+    """
+    if http_url.startswith('http'):
+        return 'ws' + http_url[len('http'):]
+    return http_url
+
+
+def decode_oracle_data(address, value: dict, slot: int) -> OracleData:
+    """
+    Decodes a Pyth price account from an account notification, as
+    driftpy.math.oracle.get_oracle_data does for an RPC response.
+
+    Args:
+        address (PublicKey): The oracle account.
+        value (dict): The notification value, with base64 'data'.
+        slot (int): The notification slot.
+
+    Returns:
+        OracleData: The decoded oracle data.
+    """
+    price = PythPriceAccount(SolanaPublicKey(str(address)), None)
+    price.update_with_rpc_response(slot, value)
+    return OracleData(
+        price=convert_pyth_price(price.aggregate_price_info.price),
+        slot=price.last_slot,
+        confidence=convert_pyth_price(price.aggregate_price_info.confidence_interval),
+        twap=0,
+        twap_confidence=0,
+        has_sufficient_number_of_datapoints=True,
+    )
+
+
+def cached_accounts(chu: ClearingHouseUser) -> dict:
+    """
+    Maps every account of a loaded ClearingHouseUser cache to its places in
+    the cache. An oracle shared by a spot and a perp market (e.g. SOL, BTC)
+    has a place in both oracle lists.
+
+    Args:
+        chu (ClearingHouseUser): A user whose cache is set.
+
+    Returns:
+        dict[str, list[tuple[str, Optional[int]]]]: Cache keys and indexes (None for single accounts) by pubkey.
+    """
+    program_id = chu.program.program_id
+    accounts = {
+        str(get_state_public_key(program_id)): [("state", None)],
+        str(get_user_account_public_key(program_id, chu.authority, chu.subaccount_id)): [("user", None)],
+    }
+    for i, spot_market in enumerate(chu.CACHE["spot_markets"]):
+        accounts.setdefault(str(get_spot_market_public_key(program_id, i)), []).append(("spot_markets", i))
+        if i != 0:
+            # The quote market oracle is a constant in ClearingHouseUser
+            accounts.setdefault(str(spot_market.oracle), []).append(("spot_market_oracles", i))
+    for i, perp_market in enumerate(chu.CACHE["perp_markets"]):
+        accounts.setdefault(str(get_perp_market_public_key(program_id, i)), []).append(("perp_markets", i))
+        accounts.setdefault(str(perp_market.amm.oracle), []).append(("perp_market_oracles", i))
+    return accounts
+
+
+def decode_account(chu: ClearingHouseUser, key: str, pubkey: str, value: dict, slot: int):
+    """
+    Decodes an account in the form ClearingHouseUser caches it.
+
+    Args:
+        chu (ClearingHouseUser): Provides the program's account coder.
+        key (str): The cache key the account belongs to.
+        pubkey (str): The account address.
+        value (dict): The account value from RPC or a notification, with base64 'data'.
+        slot (int): The slot the value was read at.
+
+    Returns:
+        Any: The decoded Drift account, or OracleData for oracles.
+    """
+    if key.endswith('oracles'):
+        return decode_oracle_data(pubkey, value, slot)
+    return chu.program.coder.accounts.decode(base64.b64decode(value['data'][0]))
+
+
+def store_account(cache: dict, key: str, index: Optional[int], account):
+    """Replaces one account in a ClearingHouseUser cache."""
+    if index is None:
+        cache[key] = account
+    else:
+        cache[key][index] = account
+
+
+def store_decoded(chu: ClearingHouseUser, cache: dict, places: list, pubkey: str, value: dict, slot: int):
+    """Decodes an account once and replaces it at each of its places in a ClearingHouseUser cache."""
+    account = decode_account(chu, places[0][0], pubkey, value, slot)
+    for key, index in places:
+        store_account(cache, key, index, account)
+
+
+class AccountSubscriber:
+    """
+    Keeps a ClearingHouseUser cache current from websocket notifications.
+
+    subscribe() takes one RPC snapshot with chu.set_cache() to learn every
+    account (including the oracle of each market), then subscribes to all of
+    them. From then on notifications replace the cached accounts in place. A
+    dropped connection is reopened, resubscribed and the snapshot refreshed,
+    so updates missed while disconnected are recovered; notifications older
+    than the snapshot are dropped, and subscribed is only set again once
+    both are done.
+
+    Attributes:
+        chu (ClearingHouseUser): The user whose cache is maintained.
+        url (str): Websocket endpoint of the RPC node.
+        timeout (float): Seconds subscribe() waits for every subscription to be confirmed.
+        cache (dict): The ClearingHouseUser cache, see ClearingHouseUser.set_cache.
+        accounts (dict[str, list[tuple[str, Optional[int]]]]): Cache keys and indexes of every subscribed account, by pubkey.
+        slots (dict[str, int]): Slot of the last notification applied per account.
+        slot (int): Highest slot the cache reflects: the snapshot slot or a later notification's.
+        last_update (float): time.monotonic() of the last applied notification or snapshot.
+    """
+
+    def __init__(self, chu: ClearingHouseUser, url: str = None,
+                 timeout: float = WEBSOCKET_TIMEOUT, reconnect_delay: float = WEBSOCKET_RECONNECT_DELAY):
+        self.chu = chu
+        self.url = url or websocket_url(URL)
+        self.timeout = timeout
+        self.reconnect_delay = reconnect_delay
+        self.cache = None
+        self.accounts = {}
+        self.slots = {}
+        self.slot = 0
+        self.last_update = 0.0
+        self.task = None
+        self.subscribed = asyncio.Event()
+        self._pending = {}
+        self._subscriptions = {}
+
+    async def subscribe(self):
+        """Loads the initial snapshot and starts listening. Does nothing if already running."""
+        if self.task is not None:
+            return
+        await self.refresh()
+        self.task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self.subscribed.wait(), self.timeout)
+        except asyncio.TimeoutError:
+            await self.unsubscribe()
+            raise Exception("APICallError: Account websocket subscriptions were not confirmed in time")
+
+    async def unsubscribe(self):
+        """Stops listening. The cache keeps its last values."""
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        self.subscribed.clear()
+
+    async def refresh(self):
+        """Reloads every account over RPC and rebuilds the list of accounts to subscribe."""
+        connection = self.chu.program.provider.connection
+        # Read the slot first: the accounts loaded after it are at least that recent
+        snapshot_slot = (await connection.get_slot("confirmed")).get('result', 0)
+        await self.chu.set_cache()
+        self.cache = self.chu.CACHE
+        self.slot = max(self.slot, snapshot_slot)
+        self.last_update = time.monotonic()
+        self.accounts = cached_accounts(self.chu)
+        # Notifications queued from before the snapshot would roll it back
+        self.slots = {pubkey: max(self.slots.get(pubkey, 0), snapshot_slot) for pubkey in self.accounts}
+
+    def handle_message(self, message: dict):
+        """
+        Applies one websocket message: a subscription confirmation or an account notification.
+
+        Args:
+            message (dict): The decoded JSON-RPC message.
+        """
+        if 'id' in message:
+            pubkey = self._pending.pop(message['id'], None)
+            if pubkey is None:
+                return
+            if 'result' not in message:
+                raise Exception(f"APICallError: accountSubscribe failed for {pubkey}: {message.get('error')}")
+            self._subscriptions[message['result']] = pubkey
+            if not self._pending:
+                self.subscribed.set()
+        elif message.get('method') == 'accountNotification':
+            params = message['params']
+            pubkey = self._subscriptions.get(params['subscription'])
+            if pubkey is not None:
+                result = params['result']
+                self.apply(pubkey, result['value'], result['context']['slot'])
+
+    def apply(self, pubkey: str, value: dict, slot: int):
+        """
+        Replaces a cached account with the data from a notification.
+
+        Args:
+            pubkey (str): The account that changed.
+            value (dict): The notification value, with base64 'data'.
+            slot (int): The notification slot.
+        """
+        if slot < self.slots.get(pubkey, 0):
+            return
+        store_decoded(self.chu, self.cache, self.accounts[pubkey], pubkey, value, slot)
+        self.slots[pubkey] = slot
+        self.slot = max(self.slot, slot)
+        self.last_update = time.monotonic()
+
+    async def _run(self):
+        reconnect = False
+        while True:
+            try:
+                async with websockets.connect(self.url) as ws:
+                    await self._subscribe_all(ws)
+                    if reconnect:
+                        await self.refresh()
+                    async for raw in ws:
+                        self.handle_message(json.loads(raw))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Account websocket disconnected: {e}")
+            # Set again once resubscribed and refreshed
+            self.subscribed.clear()
+            reconnect = True
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _subscribe_all(self, ws):
+        self._pending.clear()
+        self._subscriptions.clear()
+        for request_id, pubkey in enumerate(self.accounts, start=1):
+            self._pending[request_id] = pubkey
+            await ws.send(json.dumps({
+                "jsonrpc": "2.0", "id": request_id, "method": "accountSubscribe",
+                "params": [pubkey, {"encoding": "base64", "commitment": "confirmed"}],
+            }))
+
+
+class BatchAccountLoader:
+    """
+    Refreshes a ClearingHouseUser cache with one getMultipleAccounts call.
+
+    The first load() runs chu.set_cache() to learn every account, including
+    the oracle of each market. Later loads fetch all of those accounts in a
+    single request (split only past the RPC limit of keys per call) and
+    decode them into a fresh cache, so a cycle costs one round trip instead
+    of one per account. Accounts whose data did not change keep their
+    previously decoded object, so consumers can tell what moved by identity.
+
+    Attributes:
+        chu (ClearingHouseUser): The user whose cache is loaded.
+        commitment (str): Commitment of the getMultipleAccounts calls.
+        cache (dict): The last loaded cache, see ClearingHouseUser.set_cache.
+        accounts (dict[str, list[tuple[str, Optional[int]]]]): Cache keys and indexes of every account, by pubkey.
+        slot (int): Slot of the last load.
+        data (dict[str, str]): Base64 data last decoded per account.
+    """
+
+    MAX_KEYS = 100
+    """int: Most pubkeys accepted by one getMultipleAccounts call."""
+
+    def __init__(self, chu: ClearingHouseUser, commitment: str = 'confirmed'):
+        self.chu = chu
+        self.commitment = commitment
+        self.cache = None
+        self.accounts = {}
+        self.slot = 0
+        self.data = {}
+
+    async def load(self) -> int:
+        """
+        Loads every cached account.
+
+        Returns:
+            int: The slot the accounts were read at.
+
+        Raises:
+            Exception: If a getMultipleAccounts call fails.
+        """
+        connection = self.chu.program.provider.connection
+        if self.cache is None:
+            _, response = await asyncio.gather(self.chu.set_cache(), connection.get_slot(self.commitment))
+            self.cache = self.chu.CACHE
+            self.accounts = cached_accounts(self.chu)
+            self.slot = response.get('result', 0)
+            return self.slot
+        pubkeys = list(self.accounts)
+        chunks = [pubkeys[i:i + self.MAX_KEYS] for i in range(0, len(pubkeys), self.MAX_KEYS)]
+        responses = await asyncio.gather(*[connection._provider.make_request(
+            "getMultipleAccounts", chunk, {"encoding": "base64", "commitment": self.commitment})
+            for chunk in chunks])
+        cache = {key: list(value) if isinstance(value, list) else value for key, value in self.cache.items()}
+        slot = 0
+        for chunk, response in zip(chunks, responses):
+            if "result" not in response:
+                raise Exception(f"APICallError: getMultipleAccounts failed: {response.get('error')}")
+            result = response["result"]
+            slot = max(slot, result["context"]["slot"])
+            for pubkey, value in zip(chunk, result["value"]):
+                if value is None or self.data.get(pubkey) == value['data'][0]:
+                    continue
+                self.data[pubkey] = value['data'][0]
+                store_decoded(self.chu, cache, self.accounts[pubkey], pubkey, value, result["context"]["slot"])
+        self.cache = cache
+        self.slot = slot
+        return slot
@@ -0,0 +1,133 @@
+"""Order book analytics.
+
+Vectorized measures of an OrderBook for strategies: microprice, top-N
+imbalance, depth within a distance of the oracle, VWAP to fill a size and
+the spread to the oracle. Each result is cached on the book's BookAnalytics,
+so any number of strategies or ladder levels can ask for the same figure in
+a cycle and it is computed once. The cache lives as long as the book and is
+dropped when the book is re-marked at a new oracle price.
+
+Classes:
+- BookAnalytics: Cached analytics of one OrderBook.
+"""
+from functools import wraps
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    # order_book imports this module
+    from order_book import OrderBook
+
+
+def cached(method):
+    """Caches a BookAnalytics method's result per arguments."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        if key not in self._cache:
+            self._cache[key] = method(self, *args, **kwargs)
+        return self._cache[key]
+    return wrapper
+
+
+class BookAnalytics:
+    """
+    Analytics of one OrderBook, computed on first request and cached.
+    Obtain it through OrderBook.analytics rather than constructing it, so
+    every caller in the cycle shares the same cache.
+
+    Attributes:
+        book (OrderBook): The book analysed.
+    """
+
+    def __init__(self, book: 'OrderBook'):
+        self.book = book
+        self._cache = {}
+
+    @property
+    def oracle_price(self) -> float:
+        """float: Oracle price the book is marked at."""
+        return self.book.oracle_price
+
+    @cached
+    def microprice(self) -> Optional[float]:
+        """
+        Returns the best bid and ask weighted by the size on the opposite side:
+        (bid * ask_size + ask * bid_size) / (bid_size + ask_size).
+
+        Returns:
+            Optional[float]: The microprice, None if a side is empty.
+        """
+        bid_prices, bid_sizes = self.book.bids.finest_levels()
+        ask_prices, ask_sizes = self.book.asks.finest_levels()
+        if len(bid_prices) == 0 or len(ask_prices) == 0:
+            return None
+        bid_size, ask_size = bid_sizes[0], ask_sizes[0]
+        return float((bid_prices[0] * ask_size + ask_prices[0] * bid_size) / (bid_size + ask_size))
+
+    @cached
+    def imbalance(self, levels: int = 5) -> float:
+        """
+        Returns the size imbalance of the top price levels of each side.
+
+        Args:
+            levels (int): Number of distinct price levels per side.
+
+        Returns:
+            float: (bid size - ask size) / (bid size + ask size), in [-1, 1]. 0 for an empty book.
+        """
+        bid_size = float(self.book.bids.finest_levels()[1][:levels].sum())
+        ask_size = float(self.book.asks.finest_levels()[1][:levels].sum())
+        total = bid_size + ask_size
+        return (bid_size - ask_size) / total if total > 0 else 0.0
+
+    @cached
+    def depth_within_bps(self, bps: float) -> tuple[float, float]:
+        """
+        Returns the size resting within a distance of the oracle price.
+
+        Args:
+            bps (float): Distance from the oracle price, in basis points.
+
+        Returns:
+            tuple[float, float]: Bid size priced at or above oracle * (1 - bps), ask size at or below oracle * (1 + bps).
+        """
+        distance = self.oracle_price * bps / 10000
+        return (self.book.bids.depth_at(self.oracle_price - distance),
+                self.book.asks.depth_at(self.oracle_price + distance))
+
+    @cached
+    def vwap(self, size: float, side: str) -> Optional[float]:
+        """
+        Returns the average price of taking `size` from one side of the book.
+
+        Args:
+            size (float): Size to fill.
+            side (str): Side taken from: 'short' (the asks) to buy, 'long' (the bids) to sell.
+
+        Returns:
+            Optional[float]: The volume weighted average fill price, None if the side is too thin.
+        """
+        book_side = self.book.side(side)
+        depth = book_side.depth
+        if size <= 0 or len(depth) == 0 or depth[-1] < size:
+            return None
+        last = int(np.searchsorted(depth, size, side='left'))
+        filled = book_side.sizes[:last + 1].copy()
+        # Only part of the last order is needed
+        filled[-1] -= depth[last] - size
+        return float(np.dot(book_side.prices[:last + 1], filled) / size)
+
+    @cached
+    def spread_to_oracle(self) -> tuple[Optional[float], Optional[float]]:
+        """
+        Returns how far the best bid and ask are from the oracle price.
+
+        Returns:
+            tuple[Optional[float], Optional[float]]: oracle - best bid and best ask - oracle
+            (positive when the book straddles the oracle), None for an empty side.
+        """
+        best_bid, best_ask = self.book.best_bid, self.book.best_ask
+        return (self.oracle_price - best_bid if best_bid is not None else None,
+                best_ask - self.oracle_price if best_ask is not None else None)
@@ -0,0 +1,282 @@
+"""Order submission and confirmation tracking.
+
+Awaiting Orders.send_orders in the trading loop holds the next data fetch
+until every transaction is sent. Instead the tracker submits orders in a
+task and returns a Submission handle at once; a background task then polls
+getSignatureStatuses for every signature, recording how long each took to
+land, or that it failed or expired. Orders are sent with skip_confirmation,
+so sending returns once the RPC node accepted a transaction, not once it
+landed; orders split into several phases still wait, inside the task, for
+each phase to land before the next is sent. Until a submission settles its changes
+are overlaid on the live orders the strategy reads from the book (placed
+orders added, cancelled ones removed, modified ones updated), so quoting
+carries on with the orders in flight accounted for.
+
+Classes:
+- PendingTransaction: One sent transaction and its confirmation.
+- Submission: Handle on one Orders being sent and confirmed.
+- ConfirmationTracker: Submits orders and tracks their confirmations.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Optional
+
+import numpy as np
+from solana.rpc.commitment import Processed
+from solana.rpc.types import TxOpts
+
+import sys
+from pathlib import Path
+base_path = Path(__file__).resolve().parent
+sys.path.append(str(base_path.parent))
+from src import *
+from quote_reconciler import LiveOrder
+
+PENDING, LANDED, FAILED, EXPIRED = 'pending', 'landed', 'failed', 'expired'
+COMMITMENT_LEVELS = ['processed', 'confirmed', 'finalized']
+# getSignatureStatuses takes at most 256 signatures
+MAX_SIGNATURES = 256
+# Return once the node accepted a transaction: confirmation is the tracker's job
+SEND_OPTIONS = TxOpts(skip_confirmation=True, preflight_commitment=Processed)
+
+
+class PendingTransaction:
+    """
+    One sent transaction and its confirmation.
+
+    Attributes:
+        signature (Optional[str]): The transaction signature, None if it was never sent.
+        ixs (int): Number of instructions in it.
+        sent_at (float): time.monotonic() just before it was sent.
+        status (str): 'pending', 'landed', 'failed' or 'expired'.
+        latency (Optional[float]): Seconds from sending to landing or failing.
+        slot (Optional[int]): Slot it landed in.
+        error (Any): Why it failed.
+    """
+
+    def __init__(self, signature: Optional[str], ixs: int, sent_at: float = None):
+        self.signature = signature
+        self.ixs = ixs
+        self.sent_at = sent_at or time.monotonic()
+        self.status = PENDING
+        self.latency = None
+        self.slot = None
+        self.error = None
+
+    def settle(self, status: str, slot: int = None, error=None):
+        """Records the outcome of the transaction."""
+        self.status = status
+        self.latency = time.monotonic() - self.sent_at
+        self.slot = slot
+        self.error = error
+
+    def __repr__(self):
+        return f"PendingTransaction({self.signature}, {self.status})"
+
+
+class Submission:
+    """
+    Handle on one Orders being sent and confirmed. Awaiting it waits for
+    the orders to be sent, not confirmed.
+
+    Attributes:
+        orders (Orders): The orders submitted.
+        task (asyncio.Task): Sends the orders; its result is the list[BatchResult].
+        transactions (list[PendingTransaction]): The transactions sent, once the task is done.
+        submitted_at (float): time.monotonic() of the submission.
+    """
+
+    def __init__(self, orders):
+        self.orders = orders
+        self.task = None
+        self.transactions = []
+        self.submitted_at = time.monotonic()
+
+    @property
+    def sent(self) -> bool:
+        """bool: Whether every transaction was sent (or failed to be)."""
+        return self.task is not None and self.task.done()
+
+    @property
+    def settled(self) -> bool:
+        """bool: Whether every transaction landed, failed or expired."""
+        return self.sent and all(tx.status != PENDING for tx in self.transactions)
+
+    @property
+    def landed(self) -> bool:
+        """bool: Whether every transaction landed."""
+        return self.settled and bool(self.transactions) and all(tx.status == LANDED for tx in self.transactions)
+
+    def __await__(self):
+        return self.task.__await__()
+
+
+class ConfirmationTracker:
+    """
+    Submits orders without blocking the trading loop and tracks their
+    confirmations in the background.
+
+    Attributes:
+        rpc (RPCPool): Sends getSignatureStatuses; anything with make_request(method, *params).
+        commitment (str): Commitment at which a transaction counts as landed.
+        poll_interval (float): Seconds between status polls.
+        timeout (float): Seconds after which a transaction without a status is expired.
+        submissions (list[Submission]): Submissions not settled yet.
+        transactions (list[PendingTransaction]): Transactions not settled yet.
+        latencies (deque[float]): Seconds to land of the last CONFIRM_WINDOW landed transactions.
+        counts (dict[str, int]): Settled transactions by outcome.
+        opts (TxOpts): Options orders are sent with.
+    """
+
+    def __init__(self, rpc, commitment: str = CONFIRM_COMMITMENT, poll_interval: float = CONFIRM_POLL_INTERVAL,
+                 timeout: float = CONFIRM_TIMEOUT, opts: TxOpts = SEND_OPTIONS):
+        self.rpc = rpc
+        self.opts = opts
+        self.commitment = commitment
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.submissions = []
+        self.transactions = []
+        self.latencies = deque(maxlen=CONFIRM_WINDOW)
+        self.counts = {LANDED: 0, FAILED: 0, EXPIRED: 0}
+        self.task = None
+
+    def submit(self, orders, on_sent: Callable = None) -> Submission:
+        """
+        Starts sending orders and returns at once.
+
+        Args:
+            orders (Orders): The orders to send.
+            on_sent (Callable): Called with the list[BatchResult] once they are sent, e.g. Strategy.report_batches.
+
+        Returns:
+            Submission: Handle on the orders in flight.
+        """
+        submission = Submission(orders)
+        submission.task = asyncio.create_task(self._send(submission, on_sent))
+        self.submissions.append(submission)
+        return submission
+
+    async def _send(self, submission: Submission, on_sent: Callable = None) -> list:
+        try:
+            results = await submission.orders.send_orders(opts=self.opts) or []
+        except Exception as e:
+            print(f"Order submission failed: {e}")
+            results = []
+        for result in results:
+            submission.transactions.append(self.track(result.signature, len(result.ixs), result.error, result.sent_at))
+        if on_sent is not None:
+            on_sent(results)
+        return results
+
+    def track(self, signature: Optional[str], ixs: int = 0, error=None, sent_at: float = None) -> PendingTransaction:
+        """
+        Starts tracking a sent transaction.
+
+        Args:
+            signature (Optional[str]): Its signature, None if sending failed.
+            ixs (int): Number of instructions in it.
+            error (Any): Why sending failed.
+            sent_at (float): time.monotonic() just before it was sent. Defaults to now.
+
+        Returns:
+            PendingTransaction: The tracked transaction, already failed if it was not sent.
+        """
+        tx = PendingTransaction(signature, ixs, sent_at)
+        if signature is None or error is not None:
+            self._settle(tx, FAILED, error=error)
+        else:
+            self.transactions.append(tx)
+        return tx
+
+    def _settle(self, tx: PendingTransaction, status: str, slot: int = None, error=None):
+        tx.settle(status, slot, error)
+        self.counts[status] += 1
+        if status == LANDED:
+            self.latencies.append(tx.latency)
+
+    async def poll(self):
+        """Fetches the status of every pending transaction and settles those that landed, failed or expired."""
+        required = COMMITMENT_LEVELS.index(self.commitment)
+        for i in range(0, len(self.transactions), MAX_SIGNATURES):
+            chunk = self.transactions[i:i + MAX_SIGNATURES]
+            response = await self.rpc.make_request("getSignatureStatuses", [tx.signature for tx in chunk],
+                                                   {"searchTransactionHistory": False})
+            if "result" not in response:
+                raise Exception(f"APICallError: getSignatureStatuses failed: {response.get('error')}")
+            for tx, status in zip(chunk, response["result"]["value"]):
+                if status is None:
+                    if time.monotonic() - tx.sent_at > self.timeout:
+                        self._settle(tx, EXPIRED)
+                elif status.get("err") is not None:
+                    self._settle(tx, FAILED, status.get("slot"), status["err"])
+                elif COMMITMENT_LEVELS.index(status.get("confirmationStatus") or 'processed') >= required:
+                    self._settle(tx, LANDED, status.get("slot"))
+        self.transactions = [tx for tx in self.transactions if tx.status == PENDING]
+        self.submissions = [submission for submission in self.submissions if not submission.settled]
+
+    @property
+    def in_flight(self) -> bool:
+        """bool: Whether any submission is not settled yet."""
+        return any(not submission.settled for submission in self.submissions)
+
+    def overlay(self, live_orders: list[LiveOrder]) -> list[LiveOrder]:
+        """
+        Applies the changes of unsettled submissions to the live orders read
+        from the book: cancelled orders are removed, modified ones updated
+        and placed ones added without an order id.
+
+        Args:
+            live_orders (list[LiveOrder]): Our resting orders in the book.
+
+        Returns:
+            list[LiveOrder]: Our orders once the submissions in flight land.
+        """
+        for submission in self.submissions:
+            diff = submission.orders.diff
+            if submission.settled or diff is None:
+                continue
+            cancelled = {order.order_id for order in diff.cancel}
+            modified = {order.order_id: quote for order, quote in diff.modify}
+            live_orders = [order if order.order_id not in modified else
+                           LiveOrder(order.order_id, order.side, modified[order.order_id].size,
+                                     modified[order.order_id].offset)
+                           for order in live_orders if order.order_id not in cancelled]
+            live_orders += [LiveOrder(None, quote.side, quote.size, quote.offset) for quote in diff.place]
+        return live_orders
+
+    def stats(self) -> dict:
+        """Returns the outcome counts and the median and 90th percentile seconds to land."""
+        stats = dict(self.counts, pending=len(self.transactions))
+        if self.latencies:
+            stats['latency_p50'], stats['latency_p90'] = np.percentile(self.latencies, [50, 90]).tolist()
+        return stats
+
+    async def start(self):
+        """Starts polling. Does nothing if already running."""
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Waits for submissions still being sent, then stops polling."""
+        await asyncio.gather(*(s.task for s in self.submissions if not s.sent), return_exceptions=True)
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if not self.transactions:
+                self.submissions = [submission for submission in self.submissions if not submission.settled]
+                continue
+            try:
+                await self.poll()
+            except Exception as e:
+                print(f"Confirmation poll failed: {e}")
@@ -0,0 +1,159 @@
+"""Binary DLOB snapshot format.
+
+Decodes the fixed-width snapshots written by js_src/handle_dlob.js straight
+into NumPy structured arrays. Per-snapshot fields (slot, oracle price and
+TWAP) are stored once in the header instead of being repeated on every order.
+
+Layout (little-endian):
+- header (48 bytes): magic 'DLOB', u16 version, u16 record size, u32 count, u32 reserved,
+  u64 slot, u64 seq, f64 oracle_price, f64 oracle_twap
+- record (72 bytes): 32 byte user pubkey, u32 orderId, u8 orderType, u8 direction,
+  u8 existingPositionDirection, u8 postOnly, f64 price, f64 baseAssetAmount,
+  f64 baseAssetAmountFilled, f64 oraclePriceOffset
+"""
+from typing import Union
+
+import numpy as np
+import base58
+
+DLOB_MAGIC = b'DLOB'
+DLOB_VERSION = 1
+
+DLOB_HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'),
+    ('version', '<u2'),
+    ('record_size', '<u2'),
+    ('count', '<u4'),
+    ('reserved', '<u4'),
+    ('slot', '<u8'),
+    ('seq', '<u8'),
+    ('oracle_price', '<f8'),
+    ('oracle_twap', '<f8'),
+])
+"""np.dtype: Snapshot header, 48 bytes."""
+
+DLOB_RECORD_DTYPE = np.dtype([
+    ('user', 'u1', (32,)),
+    ('orderId', '<u4'),
+    ('orderType', 'u1'),
+    ('direction', 'u1'),
+    ('existingPositionDirection', 'u1'),
+    ('postOnly', 'u1'),
+    ('price', '<f8'),
+    ('baseAssetAmount', '<f8'),
+    ('baseAssetAmountFilled', '<f8'),
+    ('oraclePriceOffset', '<f8'),
+])
+"""np.dtype: One DLOB order, 72 bytes."""
+
+ORDER_TYPES = ('market', 'limit', 'triggerMarket', 'triggerLimit', 'oracle')
+"""tuple[str]: orderType names indexed by their encoded value."""
+
+DIRECTIONS = ('long', 'short')
+"""tuple[str]: direction names indexed by their encoded value."""
+
+
+class DLOBSnapshot:
+    """
+    A decoded binary DLOB snapshot.
+
+    Attributes:
+        slot (int): Slot the snapshot was taken at.
+        seq (int): Sidecar feed sequence number at the time of the snapshot (0 for one-shot runs).
+        oracle_price (float): Oracle price for the market.
+        oracle_twap (float): Oracle TWAP for the market.
+        records (np.ndarray): Orders as a structured array of DLOB_RECORD_DTYPE.
+    """
+
+    def __init__(self, header: np.ndarray, records: np.ndarray):
+        self.slot = int(header['slot'])
+        self.seq = int(header['seq'])
+        self.oracle_price = float(header['oracle_price'])
+        self.oracle_twap = float(header['oracle_twap'])
+        self.records = records
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def to_dicts(self, index: np.ndarray = None) -> list[dict]:
+        """
+        Converts the records into the list of dictionaries written by
+        handle_dlob.js in JSON mode, for callers that expect that format.
+
+        Args:
+            index (np.ndarray, optional): Positions of the records to convert, in output order. Defaults to all.
+
+        Returns:
+            list[dict]: One dictionary per order.
+        """
+        records = self.records if index is None else self.records[index]
+        users = [base58.b58encode(user.tobytes()).decode('ascii') for user in records['user']]
+        columns = zip(
+            users,
+            records['orderType'].tolist(),
+            records['price'].tolist(),
+            records['baseAssetAmount'].tolist(),
+            records['baseAssetAmountFilled'].tolist(),
+            records['direction'].tolist(),
+            records['existingPositionDirection'].tolist(),
+            records['postOnly'].tolist(),
+            records['oraclePriceOffset'].tolist(),
+            records['orderId'].tolist(),
+        )
+        return [{
+            'user': user,
+            'orderType': ORDER_TYPES[order_type],
+            'price': price,
+            'oracle_price': self.oracle_price,
+            'oracle_twap': self.oracle_twap,
+            'baseAssetAmount': amount,
+            'baseAssetAmountFilled': filled,
+            'direction': DIRECTIONS[direction],
+            'existingPositionDirection': DIRECTIONS[existing],
+            'postOnly': 'true' if post_only else 'false',
+            'oraclePriceOffset': offset,
+            'orderId': order_id,
+        } for (user, order_type, price, amount, filled, direction,
+               existing, post_only, offset, order_id) in columns]
+
+
+def decode_dlob_snapshot(buffer: Union[bytes, bytearray, memoryview]) -> DLOBSnapshot:
+    """
+    Decodes a binary snapshot without copying the order records.
+
+    Args:
+        buffer (bytes-like): The encoded snapshot.
+
+    Returns:
+        DLOBSnapshot: The decoded snapshot. Its records are a view over `buffer`.
+
+    Raises:
+        ValueError: If the buffer is not a valid snapshot.
+    """
+    if len(buffer) < DLOB_HEADER_DTYPE.itemsize:
+        raise ValueError("Invalid DLOB snapshot: buffer shorter than header")
+    header = np.frombuffer(buffer, dtype=DLOB_HEADER_DTYPE, count=1)[0]
+    if header['magic'] != DLOB_MAGIC or header['version'] != DLOB_VERSION:
+        raise ValueError("Invalid DLOB snapshot: unknown magic or version")
+    if header['record_size'] != DLOB_RECORD_DTYPE.itemsize:
+        raise ValueError("Invalid DLOB snapshot: record size mismatch")
+    count = int(header['count'])
+    if len(buffer) < DLOB_HEADER_DTYPE.itemsize + count * DLOB_RECORD_DTYPE.itemsize:
+        raise ValueError("Invalid DLOB snapshot: truncated records")
+    records = np.frombuffer(buffer, dtype=DLOB_RECORD_DTYPE, count=count,
+                            offset=DLOB_HEADER_DTYPE.itemsize)
+    return DLOBSnapshot(header, records)
+
+
+def read_dlob_binary(path: str) -> DLOBSnapshot:
+    """
+    Reads a binary snapshot file such as data/dlob.bin.
+
+    Args:
+        path (str): Path of the snapshot file.
+
+    Returns:
+        DLOBSnapshot: The decoded snapshot.
+    """
+    with open(path, 'rb') as f: buffer = f.read()
+    return decode_dlob_snapshot(buffer)
@@ -0,0 +1,166 @@
+"""Native Python DLOB builder.
+
+Builds the order book for the configured market directly from Drift User
+accounts, without the Node SDK. One filtered getProgramAccounts call returns
+only the order slots of non-idle users, which are decoded in bulk with NumPy
+into a DLOBSnapshot, the same type read from the binary JS snapshots, so
+utils.format_dlob turns it into the usual book.
+
+Selected with DLOB_ENGINE = 'python' in src/__init__.py.
+
+Classes:
+- DLOBBuilder: Fetches and decodes the open orders of one perp market.
+
+Functions:
+- decode_market_orders(...) -> DLOBSnapshot: Extracts one market's open orders from raw order slots.
+"""
+import base64
+import hashlib
+
+import numpy as np
+import base58
+from solana.publickey import PublicKey
+from solana.rpc.async_api import AsyncClient
+from driftpy.constants.numeric_constants import BASE_PRECISION, PRICE_PRECISION
+
+from dlob_binary import DLOB_MAGIC, DLOB_VERSION, DLOB_HEADER_DTYPE, DLOB_RECORD_DTYPE, DLOBSnapshot
+
+# User account layout (see the User and Order types in the Drift IDL)
+USER_DISCRIMINATOR = hashlib.sha256(b"account:User").digest()[:8]
+USER_ORDERS_OFFSET = 1192
+USER_MAX_ORDERS = 32
+USER_IDLE_OFFSET = 4350
+
+ORDER_DTYPE = np.dtype([
+    ('slot', '<u8'),
+    ('price', '<u8'),
+    ('baseAssetAmount', '<u8'),
+    ('baseAssetAmountFilled', '<u8'),
+    ('quoteAssetAmountFilled', '<u8'),
+    ('triggerPrice', '<u8'),
+    ('auctionStartPrice', '<i8'),
+    ('auctionEndPrice', '<i8'),
+    ('maxTs', '<i8'),
+    ('oraclePriceOffset', '<i4'),
+    ('orderId', '<u4'),
+    ('marketIndex', '<u2'),
+    ('status', 'u1'),
+    ('orderType', 'u1'),
+    ('marketType', 'u1'),
+    ('userOrderId', 'u1'),
+    ('existingPositionDirection', 'u1'),
+    ('direction', 'u1'),
+    ('reduceOnly', 'u1'),
+    ('postOnly', 'u1'),
+    ('immediateOrCancel', 'u1'),
+    ('triggerCondition', 'u1'),
+    ('auctionDuration', 'u1'),
+    ('padding', 'u1', (3,)),
+])
+"""np.dtype: On-chain Order, 96 bytes."""
+
+ORDER_STATUS_OPEN = 1
+MARKET_TYPE_PERP = 1
+
+
+def decode_market_orders(data: bytes, users: np.ndarray, market_index: int,
+                         oracle_price: float, oracle_twap: float, slot: int = 0) -> DLOBSnapshot:
+    """
+    Extracts the open perp orders of one market from raw user order slots.
+
+    Args:
+        data (bytes): The order regions of the users, concatenated (32 orders of 96 bytes each).
+        users (np.ndarray): Array of shape (n, 32) with the user account pubkeys, in the same order.
+        market_index (int): Perp market to keep.
+        oracle_price (float): Oracle price written to the snapshot header.
+        oracle_twap (float): Oracle TWAP written to the snapshot header.
+        slot (int): Slot the accounts were read at.
+
+    Returns:
+        DLOBSnapshot: The market's orders.
+    """
+    orders = np.frombuffer(data, dtype=ORDER_DTYPE).reshape(-1, USER_MAX_ORDERS)
+    mask = ((orders['status'] == ORDER_STATUS_OPEN) & (orders['marketType'] == MARKET_TYPE_PERP)
+            & (orders['marketIndex'] == market_index))
+    rows, _ = np.nonzero(mask)
+    selected = orders[mask]
+
+    records = np.zeros(len(selected), dtype=DLOB_RECORD_DTYPE)
+    records['user'] = users[rows]
+    records['orderId'] = selected['orderId']
+    records['orderType'] = selected['orderType']
+    records['direction'] = selected['direction']
+    records['existingPositionDirection'] = selected['existingPositionDirection']
+    records['postOnly'] = selected['postOnly']
+    records['price'] = selected['price'] / PRICE_PRECISION
+    records['baseAssetAmount'] = selected['baseAssetAmount'] / BASE_PRECISION
+    records['baseAssetAmountFilled'] = selected['baseAssetAmountFilled'] / BASE_PRECISION
+    records['oraclePriceOffset'] = selected['oraclePriceOffset'] / PRICE_PRECISION
+
+    header = np.zeros(1, dtype=DLOB_HEADER_DTYPE)[0]
+    header['magic'] = DLOB_MAGIC
+    header['version'] = DLOB_VERSION
+    header['record_size'] = DLOB_RECORD_DTYPE.itemsize
+    header['count'] = len(records)
+    header['slot'] = slot
+    header['oracle_price'] = oracle_price
+    header['oracle_twap'] = oracle_twap
+    return DLOBSnapshot(header, records)
+
+
+class DLOBBuilder:
+    """
+    Builds the DLOB of one perp market from User accounts over RPC.
+
+    Attributes:
+        connection (AsyncClient): RPC connection.
+        program_id (PublicKey): Drift program id.
+        market_index (int): The perp market to build.
+        commitment (str): Commitment used for getProgramAccounts.
+    """
+
+    def __init__(self, connection: AsyncClient, program_id: PublicKey, market_index: int,
+                 commitment: str = 'confirmed'):
+        self.connection = connection
+        self.program_id = program_id
+        self.market_index = market_index
+        self.commitment = commitment
+
+    async def fetch(self, oracle_price: float = 0.0, oracle_twap: float = 0.0) -> DLOBSnapshot:
+        """
+        Loads every non-idle user's orders and returns the market's open orders.
+
+        Args:
+            oracle_price (float): Current oracle price, used to price oracle-pegged orders.
+                May instead be set on the returned snapshot once known.
+            oracle_twap (float): Current oracle TWAP.
+
+        Returns:
+            DLOBSnapshot: The market's orders, tagged with the slot they were read at.
+
+        Raises:
+            Exception: If the RPC call fails.
+        """
+        response = await self.connection._provider.make_request(
+            "getProgramAccounts",
+            str(self.program_id),
+            {
+                "encoding": "base64",
+                "commitment": self.commitment,
+                "withContext": True,
+                "filters": [
+                    {"memcmp": {"offset": 0, "bytes": base58.b58encode(USER_DISCRIMINATOR).decode()}},
+                    {"memcmp": {"offset": USER_IDLE_OFFSET, "bytes": base58.b58encode(b"\x00").decode()}},
+                ],
+                "dataSlice": {"offset": USER_ORDERS_OFFSET, "length": USER_MAX_ORDERS * ORDER_DTYPE.itemsize},
+            },
+        )
+        if "result" not in response:
+            raise Exception(f"APICallError: getProgramAccounts failed: {response.get('error')}")
+        result = response["result"]
+        accounts = result["value"]
+        data = b"".join(base64.b64decode(account["account"]["data"][0]) for account in accounts)
+        users = np.frombuffer(b"".join(base58.b58decode(account["pubkey"]) for account in accounts),
+                              dtype=np.uint8).reshape(-1, 32)
+        return decode_market_orders(data, users, self.market_index,
+                                    oracle_price, oracle_twap, result["context"]["slot"])
@@ -0,0 +1,284 @@
+"""Incremental DLOB feed.
+
+Keeps a local copy of the SOL-PERP book in sync with the delta feed pushed by
+js_src/handle_dlob.js in sidecar mode, so each cycle only pays for the orders
+that changed instead of re-reading and re-sorting the whole book.
+
+Classes:
+- LocalDLOB: Order book that applies insert/update/fill/cancel deltas in place.
+- DLOBDeltaFeed: Subscribes to the sidecar delta feed and keeps a LocalDLOB in sync.
+"""
+import json
+import time
+import threading
+from bisect import bisect_left, insort
+
+import numpy as np
+
+import sys
+from pathlib import Path
+base_path = Path(__file__).resolve().parent
+sys.path.append(str(base_path.parent))
+from src import *
+from utils import DLOBSidecarClient
+from order_book import OrderBook, BookSide
+
+
+class LocalDLOB:
+    """
+    Local order book built from sidecar snapshot and delta messages.
+
+    Orders are keyed by '<user>:<orderId>'. Limit orders are also kept in a
+    sorted index per side, so applying a delta costs O(log n) and reading the
+    book does not require a re-sort. Oracle-pegged orders (price 0) are
+    indexed by their offset, which keeps them ordered for any oracle price:
+    each side is handed to its BookSide as a fixed-price run and a pegged
+    run, so a new oracle price only re-marks it.
+
+    Attributes:
+        orders (dict[str, dict]): Every order on the book, keyed by '<user>:<orderId>'.
+        seq (int): Sequence number of the last applied message, None until the first snapshot.
+        slot (int): Slot of the last applied message.
+        oracle_price (float): Oracle price sent with the last message.
+        oracle_twap (float): Oracle TWAP sent with the last message.
+        in_sync (bool): False after a sequence gap until the next snapshot is applied.
+    """
+
+    def __init__(self):
+        self.orders = {}
+        self.seq = None
+        self.slot = 0
+        self.oracle_price = 0.0
+        self.oracle_twap = 0.0
+        self.in_sync = False
+        self._arrival = 0
+        self._index = {}
+        self._sides = {(side, pegged): [] for side in ('long', 'short') for pegged in (False, True)}
+        self._book_sides = {}
+
+    def apply(self, message: dict) -> bool:
+        """
+        Applies a snapshot or delta message from the sidecar feed.
+
+        Args:
+            message (dict): A decoded feed message with 'type' 'snapshot' or 'delta'.
+
+        Returns:
+            bool: False if a sequence gap was detected and a snapshot is needed to resync.
+        """
+        if message['type'] == 'snapshot':
+            if self.in_sync and message['seq'] < self.seq:
+                return True
+            self.reset()
+            for entry in message['orders']:
+                self._insert(entry['key'], entry['order'])
+            self._update_header(message)
+            self.in_sync = True
+            return True
+
+        if not self.in_sync or message['seq'] <= self.seq:
+            # Waiting for a snapshot, or a delta we have already applied
+            return self.in_sync
+        if message['seq'] != self.seq + 1:
+            print(f"DLOB feed gap: expected seq {self.seq + 1}, received {message['seq']}")
+            self.in_sync = False
+            return False
+        for change in message['changes']:
+            key = change['key']
+            if change['op'] == 'cancel':
+                self._remove(key)
+            elif key in self.orders:
+                self._replace(key, change['order'])
+            else:
+                self._insert(key, change['order'])
+        self._update_header(message)
+        return True
+
+    def reset(self):
+        """Clears every order and marks the book out of sync."""
+        self.orders.clear()
+        self._index.clear()
+        for orders in self._sides.values():
+            orders.clear()
+        self._book_sides.clear()
+        self.seq = None
+        self.in_sync = False
+
+    def sorted_orders(self, side: str = 'long') -> list[dict]:
+        """
+        Returns the limit orders of one side, best price first, in the
+        same dictionary format produced by handle_dlob.js.
+
+        Args:
+            side (str): 'long' or 'short'.
+
+        Returns:
+            list[dict]: The orders, with oracle-pegged prices resolved against the current oracle price.
+        """
+        return self._book_side(side).orders
+
+    def format(self) -> OrderBook:
+        """
+        Returns the book in the format produced by utils.format_dlob. A side
+        whose orders did not change since the last call keeps its BookSide,
+        and with it every cached level aggregation unless the oracle moved
+        its pegged orders.
+        """
+        book = OrderBook(self._book_side('long'), self._book_side('short'))
+        book.set_oracle_price(self.oracle_price)
+        return book
+
+    def _book_side(self, side: str) -> BookSide:
+        book_side = self._book_sides.get(side)
+        if book_side is None:
+            # Both indexes are sorted best first: the fixed run, then the pegged run
+            orders = [self.orders[entry[-1]] for pegged in (False, True) for entry in self._sides[(side, pegged)]]
+            count = len(orders)
+            prices = np.fromiter((order['price'] for order in orders), dtype=np.float64, count=count)
+            offsets = np.fromiter((order['oraclePriceOffset'] for order in orders), dtype=np.float64, count=count)
+            sizes = np.fromiter((order['baseAssetAmount'] for order in orders), dtype=np.float64, count=count)
+            order_ids = np.fromiter((order.get('orderId', 0) for order in orders), dtype=np.int64, count=count)
+            export = lambda positions, side_prices, oracle: [
+                {**orders[i], 'price': price, 'oracle_price': oracle, 'oracle_twap': self.oracle_twap}
+                for i, price in zip(positions.tolist(), side_prices.tolist())]
+            users = lambda positions: [orders[i]['user'] for i in positions.tolist()]
+            book_side = BookSide(side, prices, sizes, export, users, order_ids, offsets, prices == 0,
+                                 self.oracle_price)
+            self._book_sides[side] = book_side
+        book_side.set_oracle_price(self.oracle_price)
+        return book_side
+
+    def _update_header(self, message: dict):
+        self.seq = message['seq']
+        self.slot = message['slot']
+        self.oracle_price = message.get('oracle_price', self.oracle_price)
+        self.oracle_twap = message.get('oracle_twap', self.oracle_twap)
+
+    def _insert(self, key: str, order: dict):
+        self.orders[key] = order
+        if order['orderType'] != 'limit':
+            return
+        side = order['direction']
+        sign = -1 if side == 'long' else 1
+        pegged = order['price'] == 0
+        value = order['oraclePriceOffset'] if pegged else order['price']
+        self._arrival += 1
+        entry = (sign * value, self._arrival, key)
+        insort(self._sides[(side, pegged)], entry)
+        self._index[key] = ((side, pegged), entry)
+        self._book_sides.pop(side, None)
+
+    def _replace(self, key: str, order: dict):
+        previous = self.orders[key]
+        if (previous['price'] == order['price'] and previous['direction'] == order['direction']
+                and previous['oraclePriceOffset'] == order['oraclePriceOffset']
+                and previous['orderType'] == order['orderType']):
+            # Same level (e.g. a partial fill): keep the order's place in the queue
+            self.orders[key] = order
+            self._book_sides.pop(order['direction'], None)
+        else:
+            self._remove(key)
+            self._insert(key, order)
+
+    def _remove(self, key: str):
+        if self.orders.pop(key, None) is None:
+            return
+        if key not in self._index:
+            return
+        side_key, entry = self._index.pop(key)
+        orders = self._sides[side_key]
+        del orders[bisect_left(orders, entry)]
+        self._book_sides.pop(side_key[0], None)
+
+
+class DLOBDeltaFeed(DLOBSidecarClient):
+    """
+    Subscription to the sidecar delta feed. Each call to poll() drains the
+    messages pushed since the previous call and applies them to the local
+    book. When a sequence gap is detected a fresh snapshot is requested.
+
+    Attributes:
+        book (LocalDLOB): The local order book kept in sync with the feed.
+    """
+
+    def __init__(self, book: LocalDLOB = None, socket_path: str = None,
+                 timeout: float = DLOB_SIDECAR_TIMEOUT, spawn: bool = True):
+        super().__init__(socket_path, timeout, spawn)
+        self.book = book if book is not None else LocalDLOB()
+        self.buffer = bytearray()
+        self._lock = threading.Lock()
+
+    def connect(self):
+        """Opens the connection and subscribes. The sidecar replies with a snapshot."""
+        if self.sock is not None:
+            return
+        super().connect()
+        self.buffer = bytearray()
+        self.book.in_sync = False
+        self.send({'type': 'subscribe'})
+
+    def send(self, request: dict):
+        self.sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+
+    def poll(self) -> LocalDLOB:
+        """
+        Applies every pending feed message to the local book.
+
+        Blocks until the book is in sync (at most `timeout` seconds) but
+        otherwise only consumes what has already arrived. Safe to call from
+        a worker thread (see main.fetch_dlob); concurrent calls are serialized.
+
+        Returns:
+            LocalDLOB: The updated local book.
+
+        Raises:
+            Exception: If the book cannot be brought back in sync in time.
+        """
+        with self._lock:
+            deadline = time.monotonic() + self.timeout
+            while True:
+                try:
+                    self.connect()
+                    self._drain(block=not self.book.in_sync)
+                except OSError:
+                    self.close()
+                    if time.monotonic() > deadline:
+                        raise Exception("APICallError: Lost connection to DLOB sidecar")
+                    continue
+                if self.book.in_sync:
+                    return self.book
+                if time.monotonic() > deadline:
+                    raise Exception("APICallError: DLOB feed could not resync")
+
+    def _drain(self, block: bool):
+        self.sock.settimeout(self.timeout if block else 0.0)
+        try:
+            while True:
+                chunk = self.sock.recv(1 << 16)
+                if not chunk:
+                    raise ConnectionError("DLOB sidecar closed the connection")
+                # Only the new bytes can complete a line
+                start = len(self.buffer)
+                self.buffer += chunk
+                end = self.buffer.rfind(b'\n', start)
+                if end >= 0:
+                    lines = self.buffer[:end].split(b'\n')
+                    del self.buffer[:end + 1]
+                    for line in lines:
+                        self._handle(json.loads(line))
+                if block and self.book.in_sync:
+                    break
+                self.sock.setblocking(False)
+        except BlockingIOError:
+            pass
+        finally:
+            self.sock.settimeout(self.timeout)
+
+    def _handle(self, message: dict):
+        if message.get('type') not in ('snapshot', 'delta'):
+            return
+        if not self.book.apply(message):
+            self.send({'type': 'snapshot'})
+
+dlob_feed = DLOBDeltaFeed()
+"""DLOBDeltaFeed: Shared delta feed subscription used by main.fetch when USE_DLOB_DELTAS is set."""
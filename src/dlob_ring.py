@@ -0,0 +1,138 @@
+"""Shared-memory DLOB ring.
+
+Reads the binary snapshots that js_src/handle_dlob.js publishes to
+data/dlob.ring in sidecar mode (--ring). The file is memory-mapped once, so
+each read is a single copy of the order records out of shared memory, with
+no socket round trip and no file read.
+
+Layout (little-endian):
+- header (64 bytes): magic 'DRNG', u16 version, u16 reserved, u32 slot count,
+  u32 slot size, u64 write seq, reserved
+- slot (slot size bytes): u64 slot seq, u32 length, u32 reserved, binary snapshot (see dlob_binary)
+
+Snapshot n is written to slot (n - 1) % slot count. Each slot is a seqlock:
+its seq is 2n - 1 while the writer is filling it and 2n once complete, and the
+header write seq is advanced to n only afterwards.
+"""
+import mmap
+import os
+import struct
+import time
+
+import sys
+from pathlib import Path
+base_path = Path(__file__).resolve().parent
+sys.path.append(str(base_path.parent))
+from src import *
+from dlob_binary import DLOBSnapshot, decode_dlob_snapshot
+from utils import data_dir_path, dlob_sidecar
+
+RING_MAGIC = b'DRNG'
+RING_VERSION = 1
+RING_HEADER = struct.Struct('<4sHHIIQ')
+RING_HEADER_SIZE = 64
+SLOT_HEADER = struct.Struct('<QI')
+SLOT_HEADER_SIZE = 16
+WRITE_SEQ_OFFSET = 16
+
+
+class DLOBRingReader:
+    """
+    Reader side of the snapshot ring. Always returns the newest complete
+    snapshot: a reader that falls behind skips straight to it.
+
+    The records are copied out of the slot before its seq is checked again, so
+    a returned snapshot is exactly what the writer published and stays valid
+    however far the writer moves on.
+
+    Attributes:
+        path (str): Path of the ring file.
+        timeout (float): Seconds to wait for the ring to be created and receive its first snapshot.
+        seq (int): Ring sequence number of the last snapshot returned, 0 before the first read.
+    """
+
+    def __init__(self, path: str = None, timeout: float = DLOB_SIDECAR_TIMEOUT):
+        self.path = path or os.path.join(data_dir_path(), DLOB_RING_NAME)
+        self.timeout = timeout
+        self.seq = 0
+        self.map = None
+        self.view = None
+        self.slot_count = 0
+        self.slot_size = 0
+
+    def open(self):
+        """Maps the ring file, starting the sidecar first if the ring does not exist yet."""
+        if self.map is not None:
+            return
+        deadline = time.monotonic() + self.timeout
+        while not self._ready():
+            if not os.path.exists(self.path):
+                # Make sure a sidecar is running; it creates the ring on startup
+                dlob_sidecar.request('ping')
+            if time.monotonic() > deadline:
+                raise Exception("APICallError: DLOB ring was not created in time")
+            time.sleep(0.1)
+        with open(self.path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _, version, _, self.slot_count, self.slot_size, _ = RING_HEADER.unpack_from(self.map, 0)
+        if version != RING_VERSION:
+            self.close()
+            raise ValueError("Invalid DLOB ring: unknown version")
+        self.view = memoryview(self.map)
+
+    def read_latest(self, retries: int = 1000) -> DLOBSnapshot:
+        """
+        Returns the newest complete snapshot in the ring.
+
+        Args:
+            retries (int): Attempts before giving up when every read races the writer.
+
+        Returns:
+            DLOBSnapshot: The snapshot, with records copied out of the ring.
+
+        Raises:
+            Exception: If no snapshot is published in time, or no consistent read succeeds.
+        """
+        self.open()
+        deadline = time.monotonic() + self.timeout
+        attempts = 0
+        while attempts < retries:
+            n = struct.unpack_from('<Q', self.map, WRITE_SEQ_OFFSET)[0]
+            if n == 0:
+                if time.monotonic() > deadline:
+                    raise Exception("APICallError: DLOB ring has no snapshot yet")
+                time.sleep(0.1)
+                continue
+            attempts += 1
+            offset = RING_HEADER_SIZE + ((n - 1) % self.slot_count) * self.slot_size
+            seq, length = SLOT_HEADER.unpack_from(self.map, offset)
+            if seq != 2 * n or length > self.slot_size - SLOT_HEADER_SIZE:
+                # The writer lapped this slot since we read the write seq
+                continue
+            start = offset + SLOT_HEADER_SIZE
+            try:
+                snapshot = decode_dlob_snapshot(self.view[start:start + length])
+            except ValueError:
+                continue
+            # Copy before the recheck, so the seqlock covers every byte we keep
+            snapshot.records = snapshot.records.copy()
+            if struct.unpack_from('<Q', self.map, offset)[0] == seq:
+                self.seq = n
+                return snapshot
+        raise Exception("APICallError: Could not read a consistent DLOB snapshot from the ring")
+
+    def close(self):
+        """Drops the mapping."""
+        self.view = None
+        self.map = None
+
+    def _ready(self) -> bool:
+        # The writer sizes the file before writing the header, so wait for the magic
+        try:
+            with open(self.path, 'rb') as f:
+                return f.read(len(RING_MAGIC)) == RING_MAGIC
+        except OSError:
+            return False
+
+dlob_ring = DLOBRingReader()
+"""DLOBRingReader: Shared ring reader used by main.fetch when USE_DLOB_RING is set."""
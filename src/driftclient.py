@@ -3,10 +3,12 @@ import json
 import copy
 import re
 import asyncio
-from typing import Dict, Any, Union
+import time
+from typing import Dict, Any, Optional, Union
 
 from anchorpy import Wallet
 from anchorpy import Provider
+from anchorpy import Context
 from solana.keypair import Keypair
 from solana.publickey import PublicKey
 from solana.rpc.async_api import AsyncClient
@@ -25,6 +27,16 @@ from driftpy.addresses import *
 from driftpy.accounts import *
 
 from utils import extractKey, console_line
+from account_subscriber import AccountSubscriber, BatchAccountLoader
+from rpc_pool import RPCPool
+from margin_calculator import MarginCalculator
+from market_registry import MARKETS
+from quote_reconciler import Quote, QuoteReconciler
+from tx_packer import BatchResult, TransactionPacker
+from tx_pipeline import TransactionPipeline
+from confirmation_tracker import ConfirmationTracker
+from order_manager import OrderManager
+from dlob_builder import DLOBBuilder
 import sys
 from pathlib import Path
 base_path = Path(__file__).resolve().parent
@@ -49,7 +61,15 @@ class DriftClient:
         chu (ClearingHouseUser): An object representing a user of the Drift Protocol.
         default_order (OrderParams): The default order parameters for the client.
         orders (Orders): An object for managing orders on the exchange.
+        market (MarketInfo): Index, type and order constraints of the market being traded.
         market_index (int): The index of the market being traded.
+        account_subscriber (AccountSubscriber): Keeps chu's cache current over websocket, if USE_WEBSOCKET_FEEDS is set.
+        account_loader (BatchAccountLoader): Loads chu's cache in one RPC call per cycle, if USE_BATCHED_ACCOUNT_FETCH is set without websockets.
+        margin (MarginCalculator): Computes collateral, liability and PnL from the websocket or batched cache.
+        pipeline (TransactionPipeline): Cached blockhash and instruction templates for sending orders, if USE_TX_PIPELINE is set.
+        tracker (ConfirmationTracker): Sends orders in the background and tracks their confirmations, if USE_ASYNC_SUBMISSION is set.
+        oms (OrderManager): Our orders in the traded market, reconciled with the user account each fetch, if USE_ORDER_MANAGER is set.
+        dlob_builder (DLOBBuilder): Native Python DLOB builder for the traded market (DLOB_ENGINE = 'python').
     """
 
     def __init__(self, keypath: str):
@@ -72,14 +92,23 @@ class DriftClient:
         config = configs[ENV]
         wallet = Wallet(kp)
         connection = AsyncClient(URL)
+        # Route every RPC call through the endpoint pool (latency routing and hedged reads)
+        connection._provider = RPCPool(RPC_URLS)
         provider = Provider(connection, wallet)
         drift_acct = ClearingHouse.from_config(config, provider)
         self.drift_acct = drift_acct
         self.chu = ClearingHouseUser(drift_acct, use_cache=True)
+        self.account_subscriber = AccountSubscriber(self.chu) if USE_WEBSOCKET_FEEDS else None
+        self.account_loader = BatchAccountLoader(self.chu) if USE_BATCHED_ACCOUNT_FETCH and not USE_WEBSOCKET_FEEDS else None
+        self.margin = MarginCalculator()
+        self.pipeline = TransactionPipeline(drift_acct) if USE_TX_PIPELINE else None
+        self.tracker = ConfirmationTracker(connection._provider) if USE_ASYNC_SUBMISSION else None
         self.default_order = MMOrder().orderparams
-        self.orders = Orders(self.drift_acct)
-        params = get_market_parameters(MARKET_NAME)
-        self.market_index = params['market_index']
+        self.orders = Orders(self.drift_acct, pipeline=self.pipeline)
+        self.market = MARKETS[MARKET_NAME]
+        self.market_index = self.market.market_index
+        self.oms = OrderManager(self.market_index) if USE_ORDER_MANAGER else None
+        self.dlob_builder = DLOBBuilder(connection, drift_acct.program_id, self.market_index)
         print("Initializing Drift client...")
 
     def get_accounts(self, return_obj: bool = False, printkeys: bool = True) -> dict:
@@ -114,21 +143,53 @@ class DriftClient:
         return accountkeys
 
     async def fetch_chu_data(self):
-        """Fetches all required Drift data.
+        """Fetches all required Drift data. Both dictionaries are stamped with
+        the 'slot' they reflect and the time.monotonic() they were 'received_at'.
         Returns:
             list[dict]: 2 dictionaries containing user data and market data.
         """        
-        await self.chu.set_cache()
-        # Batch asyncronous tasks (Reduce execution time)
-        coroutines = [self.chu.get_total_collateral(), self.chu.get_total_perp_liability(),
-        self.chu.get_unrealized_pnl(), self.chu.get_user_position(self.market_index),
-        get_perp_market_account(self.chu.program, self.market_index)
-        ]
-        total_collateral, liability, unrealized_pnl, user_position, perp_market = await asyncio.gather(*coroutines)
-        oracle_data = await get_oracle_data(self.drift_acct.program.provider.connection, perp_market.amm.oracle)
+        if self.account_subscriber is not None:
+            # Accounts are kept current by websocket notifications: read them from memory
+            await self.account_subscriber.subscribe()
+            cache = self.account_subscriber.cache
+            slot, received_at = self.account_subscriber.slot, self.account_subscriber.last_update
+        elif self.account_loader is not None:
+            # One getMultipleAccounts round trip
+            slot = await self.account_loader.load()
+            cache = self.account_loader.cache
+            received_at = time.monotonic()
+        if self.account_subscriber is not None or self.account_loader is not None:
+            # Every figure is computed locally from the cached accounts
+            await self.chu.set_cache(cache)
+            perp_market = cache["perp_markets"][self.market_index]
+            oracle_data = cache["perp_market_oracles"][self.market_index]
+            self.margin.update(cache)
+            total_collateral, liability = self.margin.total_collateral, self.margin.perp_liability
+            unrealized_pnl, user_position = self.margin.unrealized_pnl(), self.margin.position(self.market_index)
+        else:
+            _, slot_response = await asyncio.gather(self.chu.set_cache(),
+                self.drift_acct.program.provider.connection.get_slot("confirmed"))
+            slot = slot_response.get('result')
+            # Batch asyncronous tasks (Reduce execution time)
+            coroutines = [self.chu.get_total_collateral(), self.chu.get_total_perp_liability(),
+            self.chu.get_unrealized_pnl(), self.chu.get_user_position(self.market_index),
+            get_perp_market_account(self.chu.program, self.market_index)
+            ]
+            total_collateral, liability, unrealized_pnl, user_position, perp_market = await asyncio.gather(*coroutines)
+            oracle_data = await get_oracle_data(self.drift_acct.program.provider.connection, perp_market.amm.oracle)
+            received_at = time.monotonic()
+        if self.oms is not None:
+            # Pending orders become open, fills and cancels are picked up from the order slots
+            self.oms.reconcile_user(self.chu.CACHE["user"], slot)
+        if self.market.tick_size == 0:
+            # Order constraints are only in the market accounts
+            MARKETS.load_accounts(self.chu.CACHE["perp_markets"], self.chu.CACHE["spot_markets"])
         # Extract data from fetch calls to desires format for processing
         user_data = self.extract_user_data(total_collateral, liability, unrealized_pnl, user_position)
         market_data = self.extract_market_data(perp_market, oracle_data)
+        for data in (user_data, market_data):
+            data['slot'] = slot
+            data['received_at'] = received_at
         return user_data, market_data
 
     def extract_user_data(self, total_collateral, liability, unrealized_pnl, user_position: Union[PerpMarket, None]) -> dict:
@@ -241,13 +302,13 @@ class MMOrder:
     """Represents an order that has been placed on the exchange.
 
     Attributes:
-        order_size (float): Number of contracts to purchase
+        order_size (float): Number of contracts to purchase, rounded down to the market's step size
         price (float): The price at which the order is being placed.
         order_type (str): The type of order (limit, market, etc.).
         direction (str): The direction of the order (buy or sell).
         market_name (str): The market_name for the asset being traded.
         price (float): The price at which the order is being placed.
-        oracle_price_offset (float) : Purchase price offset from oracle
+        oracle_price_offset (float) : Purchase price offset from oracle, rounded to the market's tick size like price
         spread (float): Price spread from oracle price
         offset (float): Price offset from oracle price
     """
@@ -261,22 +322,22 @@ class MMOrder:
         market_name: str = MARKET_NAME,
         oracle_price_offset: float = 0,
     ):
-        params = get_market_parameters(MARKET_NAME)
+        market = MARKETS[market_name]
 
         self.orderparams = OrderParams(
             order_type,
-            market_type=params['market_type'],
+            market_type=market.market_type,
             direction=direction,
             user_order_id=0,
-            base_asset_amount= int(order_size* BASE_PRECISION),
-            price= int(price*PRICE_PRECISION),
-            market_index=params['market_index'],
+            base_asset_amount= int(round(market.round_size(order_size) * BASE_PRECISION)),
+            price= int(round(market.round_price(price) * PRICE_PRECISION)),
+            market_index=market.market_index,
             reduce_only=False,
             post_only= PostOnlyParams.TRY_POST_ONLY(),
             immediate_or_cancel=False,
             trigger_price=0,
             trigger_condition=OrderTriggerCondition.ABOVE(),
-            oracle_price_offset= int(oracle_price_offset * PRICE_PRECISION),
+            oracle_price_offset= int(round(market.round_price(oracle_price_offset) * PRICE_PRECISION)),
             auction_duration=None,
             max_ts=None,
             auction_start_price=None,
@@ -289,23 +350,164 @@ class Orders:
     Attributes:
         drift_acct (ClearingHouse): The API object for interacting with the exchange.
         orders (List[MMOrder]): The list of orders to send in a transaction
+        live_orders (Optional[list[LiveOrder]]): Our resting orders, set by reconcile(). When set,
+            orders is the whole wanted ladder and only the differences are sent.
+        diff (Optional[QuoteDiff]): The changes reconcile() worked out.
+        results (Optional[list[BatchResult]]): The transactions send_orders() sent.
+        pipeline (Optional[TransactionPipeline]): Templates and cached blockhash of drift_acct, if it has a pipeline.
+        ix_changes (dict[int, tuple]): The (order id, OrderParams) each instruction sent changes, by id() of the
+            instruction: no order id for places, no OrderParams for cancels, neither for a cancel-all in ixs.
     """
 
-    def __init__(self, drift_acct: ClearingHouse, oracle_price: float=20.0):
+    def __init__(self, drift_acct: ClearingHouse, oracle_price: float=20.0, pipeline: TransactionPipeline = None):
         self.drift_acct = drift_acct
         self.orders = []
         self.oracle_price = oracle_price
         self.ixs = []
+        self.live_orders = None
+        self.diff = None
+        self._quotes = {}
+        self.results = None
+        self.pipeline = pipeline
+        self.ix_changes = {}
         
     def add_order(self, order: MMOrder):
         self.orders.append(order)
 
-    async def send_orders(self):
-        """ Places perp orders to market from list of orders stored in Orders object"""
+    def reconcile(self, live_orders: list, reconciler: QuoteReconciler = None):
+        """Diffs the wanted ladder in orders against our resting orders, so
+        send_orders only cancels, modifies or places what changed.
+
+        Args:
+            live_orders (list[LiveOrder]): Our resting orders in the market.
+            reconciler (QuoteReconciler): Tolerances to use. Defaults to QUOTE_PRICE_TOLERANCE and QUOTE_SIZE_TOLERANCE,
+                modifying orders only if the program has a modify_order instruction.
+
+        Returns:
+            QuoteDiff: The changes to send.
+        """
+        # Older program versions (e.g. the one driftpy 0.6 targets) have no modify_order
+        reconciler = reconciler or QuoteReconciler(modify='modify_order' in self.drift_acct.program.instruction)
+        self.live_orders = live_orders
+        self._quotes = {}
         for order in self.orders:
-            ix = await self.drift_acct.get_place_perp_order_ix(order.orderparams)
-            self.ixs.append(ix)
-        await self.drift_acct.send_ixs(self.ixs)
+            params = order.orderparams
+            side = 'long' if 'LONG' in str(params.direction).upper() else 'short'
+            quote = Quote(side, params.base_asset_amount / BASE_PRECISION, params.oracle_price_offset / PRICE_PRECISION)
+            self._quotes[id(quote)] = (quote, params)
+        self.diff = reconciler.reconcile([quote for quote, _ in self._quotes.values()], live_orders)
+        return self.diff
+
+    async def send_orders(self, opts=None) -> Optional[list[BatchResult]]:
+        """Places perp orders to market from list of orders stored in Orders object.
+        The instructions are packed into as few transactions as fit, cancels
+        (with any instruction added to ixs) sent before the rest.
+
+        Args:
+            opts (Optional[TxOpts]): Send options, e.g. skip_confirmation. Defaults to the provider's.
+
+        Returns:
+            Optional[list[BatchResult]]: One result per transaction sent, None if there was nothing to send.
+        """
+        cancels, places = await self.get_order_ix_phases()
+        self.ix_changes.update({id(ix): (None, None) for ix in self.ixs})
+        cancels = self.ixs + cancels
+        if not (cancels or places):
+            return None
+        self.results = await TransactionPacker(self.drift_acct, sender=self.pipeline, opts=opts).send([cancels, places])
+        return self.results
+
+    def changes(self) -> tuple[list, list, list]:
+        """Returns what send_orders sends: every order, or after reconcile() only the changes.
+
+        Returns:
+            tuple: The OrderParams to place, the order ids to cancel, and (order id, OrderParams) to modify.
+        """
+        if self.diff is None:
+            return [order.orderparams for order in self.orders], [], []
+        return ([self._quotes[id(quote)][1] for quote in self.diff.place],
+                [order.order_id for order in self.diff.cancel],
+                [(order.order_id, self._quotes[id(quote)][1]) for order, quote in self.diff.modify])
+
+    async def get_cancel_orders_ix(self):
+        """Returns the instruction cancelling every order, from the pipeline's templates if there is one."""
+        if self.pipeline is not None:
+            return await self.pipeline.get_cancel_orders_ix()
+        return await self.drift_acct.get_cancel_orders_ix()
+
+    async def get_place_orders_ixs(self) -> list:
+        """Builds the instructions of every order at once.
+
+        Returns:
+            list[TransactionInstruction]: Cancels, then modifies, then places.
+        """
+        cancels, places = await self.get_order_ix_phases()
+        return cancels + places
+
+    async def get_context(self, market_index: int = None) -> Context:
+        """Returns the accounts of an order instruction writing to a perp market,
+        from the pipeline's templates if there is one.
+
+        Args:
+            market_index (int): The perp market written to, None for cancels.
+
+        Returns:
+            Context: For place_perp_order, modify_order and cancel_order.
+        """
+        if self.pipeline is not None:
+            return await self.pipeline.context(market_index)
+        remaining_accounts = await self.drift_acct.get_remaining_accounts(writable_market_index=market_index)
+        return Context(
+            accounts={
+                "state": self.drift_acct.get_state_public_key(),
+                "user": self.drift_acct.get_user_account_public_key(),
+                "authority": self.drift_acct.authority,
+            },
+            remaining_accounts=remaining_accounts,
+        )
+
+    async def get_order_ix_phases(self) -> list[list]:
+        """Builds the instructions of every order at once: place_perp_order for
+        each order, or after reconcile() only the cancel_order, modify_order
+        and place_perp_order instructions of the changes.
+
+        ClearingHouse.get_place_perp_order_ix fetches the user and market
+        accounts again for each order to list its remaining accounts. Orders
+        of one market share them, so they are fetched once per market (once
+        for the ladder) and every instruction is built from them without
+        further awaits. The program takes one order per place_perp_order, so
+        the ladder is one instruction per order.
+
+        Returns:
+            list[list[TransactionInstruction]]: The cancels, and the modifies and places.
+        """
+        order_params, cancels, modifies = self.changes()
+        if not (order_params or cancels or modifies):
+            return [[], []]
+        market_indexes = sorted({params.market_index for params in order_params + [p for _, p in modifies]})
+        contexts = {market_index: await self.get_context(market_index) for market_index in market_indexes}
+        # Cancels write to no market: any market's accounts will do
+        cancel_ctx = contexts[market_indexes[0]] if market_indexes else await self.get_context()
+        instruction = self.drift_acct.program.instruction
+        # Cancels first, so freed order slots and margin are available to the rest
+        cancel_ixs = []
+        for order_id in cancels:
+            cancel_ixs.append(instruction["cancel_order"](order_id, ctx=cancel_ctx))
+            self.ix_changes[id(cancel_ixs[-1])] = (order_id, None)
+        ixs = []
+        for order_id, params in modifies:
+            # Only the size and oracle offset change; None keeps the order's current value
+            changes = self.drift_acct.program.type["ModifyOrderParams"](
+                direction=None, base_asset_amount=params.base_asset_amount, price=None, reduce_only=None,
+                post_only=None, immediate_or_cancel=None, max_ts=None, trigger_price=None, trigger_condition=None,
+                oracle_price_offset=params.oracle_price_offset, auction_duration=None, auction_start_price=None,
+                auction_end_price=None, policy=None)
+            ixs.append(instruction["modify_order"](order_id, changes, ctx=contexts[params.market_index]))
+            self.ix_changes[id(ixs[-1])] = (order_id, params)
+        for params in order_params:
+            ixs.append(instruction["place_perp_order"](params, ctx=contexts[params.market_index]))
+            self.ix_changes[id(ixs[-1])] = (None, params)
+        return [cancel_ixs, ixs]
 
     def order_print(self):
         """ Print orders to console  """
@@ -332,18 +534,8 @@ class Orders:
         return user.is_margin_trading_enabled
 
 def get_market_parameters(market_name: str):
-    """ Return market_index and market_type (perp or spot)""" 
-    config = configs[ENV]
-    market_index = -1
-    is_perp  = 'PERP' in market_name.upper()
-    market_type = MarketType.PERP() if is_perp else MarketType.SPOT()
-    
-    for perp_market_config in config.markets:
-        if perp_market_config.symbol == market_name:
-            market_index = perp_market_config.market_index
-    for spot_market_config in config.banks:
-        if spot_market_config.symbol == market_name:
-            market_index = spot_market_config.bank_index
-    return    {'market_index': market_index, 'market_type': market_type}
+    """ Return market_index and market_type (perp or spot), from the market registry""" 
+    market = MARKETS[market_name]
+    return    {'market_index': market.market_index, 'market_type': market.market_type}
 
 
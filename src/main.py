@@ -24,6 +24,11 @@ from graph_trade import generate_graph
 
 from driftclient import DriftClient, MMOrder, Orders
 from utils import *
+from dlob_feed import LocalDLOB, dlob_feed
+from dlob_ring import dlob_ring
+from snapshot import SnapshotAssembler, SNAPSHOT_OK, SNAPSHOT_STALE
+from confirmation_tracker import ConfirmationTracker
+from order_manager import OrderManager
 import importlib
 
 from strategies import *
@@ -71,26 +76,53 @@ async def main(keypath, consolePrint):
     user_acc_key = driftclient.get_accounts(True,consolePrint)['user_account']
     # Initialize Market Maker Algorithm
     strategyClass = choose_strategy()
+    # Blockhash and instruction templates are kept fresh in the background
+    if driftclient.pipeline is not None:
+        await driftclient.pipeline.start()
+    if driftclient.tracker is not None:
+        await driftclient.tracker.start()
     #2 Market Maker Loop Begins
     while on:
 
         dlob_data, user_data, market_data = await fetch_and_format_data(driftclient, consolePrint)
+        if driftclient.oms is not None:
+            # The user account slots were reconciled in fetch_chu_data
+            if USE_DLOB_SIDECAR or DLOB_ENGINE == 'python':
+                # Our orders as seen in the DLOB just fetched
+                driftclient.oms.reconcile_snapshot(dlob_data.user_orders(user_acc_key))
+            else:
+                # Written by the one-shot Javascript fetch
+                driftclient.oms.reconcile_snapshot_file(os.path.join(data_dir_path(), 'userorders.json'))
+            if consolePrint:
+                print(driftclient.oms)
+        if market_data.get('snapshot_status') == SNAPSHOT_STALE:
+            # Datasets too far apart or too old to quote on: wait for the next cycle
+            print("Skipping trade: market snapshot is stale")
+            continue
         storage = handle_archives(dlob_data, user_data, market_data, storage)
         # Load fetched data to Strategy algorithm
         strategy = strategyClass(dlob_data,user_data,market_data,
             driftclient.drift_acct,
-            driftclient.drift_acct.get_user_account_public_key()
+            driftclient.drift_acct.get_user_account_public_key(),
+            tracker=driftclient.tracker, oms=driftclient.oms, pipeline=driftclient.pipeline
         )
-        on = await make_trade(strategy, consolePrint)
+        on = await make_trade(strategy, consolePrint, driftclient.tracker, driftclient.oms)
         if DEV_MODE or not on:
             break
+    if driftclient.tracker is not None:
+        await driftclient.tracker.stop()
+        print(f"Transactions: {driftclient.tracker.stats()}")
+    if driftclient.pipeline is not None:
+        await driftclient.pipeline.stop()
     print("Market Making activity has reached completion")
 
-async def make_trade(strategy, consolePrint) -> bool:
+async def make_trade(strategy, consolePrint, tracker: ConfirmationTracker = None, oms: OrderManager = None) -> bool:
     """Execute a trade using the specified strategy.
 
     Args:
         strategy: The strategy object to use for trading.
+        tracker: Sends the orders in the background if given, instead of awaiting them.
+        oms: Records the orders sent, if given.
 
     """
     if consolePrint: 
@@ -104,7 +136,17 @@ async def make_trade(strategy, consolePrint) -> bool:
         marketMakerOrders = await strategy.post_orders()
         if marketMakerOrders != None:
             print(marketMakerOrders.order_print())
-            await marketMakerOrders.send_orders()
+            pending = oms.record_submission(marketMakerOrders) if oms is not None else []
+            def on_sent(results):
+                strategy.report_batches(results)
+                if oms is not None:
+                    oms.on_sent(pending, results, marketMakerOrders)
+            if tracker is not None:
+                # Returns at once: the next cycle's data fetch starts while the orders are sent and confirmed
+                tracker.submit(marketMakerOrders, on_sent=on_sent)
+                return True
+            results = await marketMakerOrders.send_orders()
+            on_sent(results or [])
             return True
         else:
             print("No new trades to be made.")
@@ -127,7 +169,8 @@ async def fetch_and_format_data(driftclient: DriftClient, consolePrint: bool, tr
     """
     # Fetch Data
     if DEV_MODE: 
-        dlob_data, user_data, market_data = read_archived_dataset()
+        _, user_data, market_data = read_archived_dataset()
+        dlob_data = read_javascript_data('dlob')
     if not DEV_MODE: 
         dlob_data, user_data, market_data = await fetch(driftclient)
     
@@ -141,7 +184,8 @@ async def fetch_and_format_data(driftclient: DriftClient, consolePrint: bool, tr
 
 async def fetch(driftclient: DriftClient, trade_freq: int = TRADE_FREQUENCY):
     """ 
-    Fetches Decentralized-Limit Order Book (DLOB), user, and market data dictionaries from Driftpy and the Drift Javascript SDK. Data is formatted and prepared for trading operations. Asyncronous retrieval times are batched with trade_freq to optimize wait time and increase possible trading frequency.
+    Fetches Decentralized-Limit Order Book (DLOB), user, and market data dictionaries from Driftpy and the Drift Javascript SDK. Data is formatted and prepared for trading operations. The trade_freq wait comes first, so the strategy trades on data just fetched. The DLOB and driftpy fetches then run concurrently, so fetching takes as long as the slowest of them.
+    The three datasets are then lined up by slot and receive time, and market_data['snapshot_status'] is set to 'ok', 'degraded' or 'stale' (see src/snapshot.py).
 
     
     Args:
@@ -154,14 +198,61 @@ async def fetch(driftclient: DriftClient, trade_freq: int = TRADE_FREQUENCY):
             - user_data (dict): The user account data.
             - market_data (dict): The market data.
     """
-    # Fetch from driftpy
-    coroutines = [driftclient.fetch_chu_data(), asyncio.sleep(trade_freq)]
-    data = await asyncio.gather(*coroutines)
-    user_data, market_data = data[0]
-    # Fetch from Javascript SDK
-    dlob_data = fetch_javascript_json('dlob')
+    # Wait first: data fetched alongside the wait would be trade_freq old by the time it is traded on
+    await asyncio.sleep(trade_freq)
+    # Fetch from driftpy and the DLOB source concurrently.
+    # If either fetch fails or FETCH_TIMEOUT passes, the other is cancelled.
+    (user_data, market_data), (dlob_data, dlob_received_at) = await gather_or_cancel(
+        driftclient.fetch_chu_data(), fetch_dlob_stamped(driftclient), timeout=FETCH_TIMEOUT)
+    if DLOB_ENGINE == 'python':
+        # The native builder runs alongside fetch_chu_data, so the oracle is attached afterwards
+        dlob_data.oracle_price = market_data['oracle_price'] / PRICE_PRECISION
+        dlob_data.oracle_twap = market_data['last_oracle_price_twap'] / PRICE_PRECISION
+    # JSON snapshots carry no slot: only their receive time is checked
+    snapshot = snapshot_assembler.assemble(dlob_data, getattr(dlob_data, 'slot', None), dlob_received_at,
+        user_data, market_data)
+    if snapshot.status != SNAPSHOT_OK:
+        print(snapshot)
+    market_data['snapshot_status'] = snapshot.status
     return (dlob_data, user_data, market_data)
 
+async def fetch_dlob_stamped(driftclient: DriftClient):
+    """
+    Retrieves the DLOB with fetch_dlob and records when it arrived.
+
+    Returns:
+        tuple: The DLOB and the time.monotonic() it was received at.
+    """
+    dlob_data = await fetch_dlob(driftclient)
+    return dlob_data, time.monotonic()
+
+async def fetch_dlob(driftclient: DriftClient):
+    """
+    Retrieves the DLOB from the source selected in src/__init__.py without
+    blocking the event loop, so it can run alongside fetch_chu_data.
+
+    Args:
+        driftclient (DriftClient): Provides the native DLOB builder.
+
+    Returns:
+        DLOBSnapshot | LocalDLOB | list[dict]: The DLOB, in the form produced by the selected source.
+    """
+    if DLOB_ENGINE == 'python':
+        return await driftclient.dlob_builder.fetch()
+    # Fetch from Javascript SDK
+    if USE_DLOB_RING:
+        # Only reads shared memory once the sidecar has published its first snapshot. Until then
+        # read_latest waits on the sidecar, so it runs in a thread like dlob_feed.poll
+        return await asyncio.to_thread(dlob_ring.read_latest)
+    if USE_DLOB_DELTAS:
+        return await asyncio.to_thread(dlob_feed.poll)
+    if USE_BINARY_DLOB:
+        return await fetch_binary_dlob_async()
+    return await fetch_javascript_json_async('dlob')
+
+snapshot_assembler = SnapshotAssembler()
+"""SnapshotAssembler: Grades each cycle's datasets against the SNAPSHOT_* limits in src/__init__.py."""
+
 def format(dlob_data: dict, user_data: dict, market_data: dict):
     """
     Fetches DLOB, user, and market data.
@@ -177,8 +268,14 @@ def format(dlob_data: dict, user_data: dict, market_data: dict):
             - user_data (dict): The user account data.
             - market_data (dict): The market data.
     """
-    dlob_data = format_dlob(dlob_data)
+    if isinstance(dlob_data, LocalDLOB):
+        dlob_data = dlob_data.format()
+    else:
+        dlob_data = format_dlob(dlob_data)
     user_data, market_data = make_data_readable([user_data, market_data])
+    # Price pegged orders at the oracle read with the market data, which may be newer than the DLOB's
+    if market_data.get('oracle_price'):
+        dlob_data.set_oracle_price(market_data['oracle_price'])
     return (dlob_data, user_data, market_data)
 
 def handle_archives(dlob_data, user_data, market_data, storage, storage_frequency: int = COLLECTION_FREQUENCY) -> None:
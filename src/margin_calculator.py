@@ -0,0 +1,156 @@
+"""Local margin and PnL computation.
+
+Computes the figures DriftClient reads from ClearingHouseUser (total
+collateral, perp liability, unrealized PnL and the user's position) directly
+from a ClearingHouseUser cache, with the same formulas as driftpy, and without
+awaiting one coroutine per figure. Everything that does not depend on a perp
+oracle price (spot collateral, each position's quote amount and funding) is
+kept between updates, so when only oracle prices move a refresh is a few
+multiplications per open position.
+
+Classes:
+- MarginCalculator: Margin and PnL of one user from cached accounts.
+"""
+from typing import Optional
+
+from driftpy.constants.numeric_constants import *
+from driftpy.math.positions import (calculate_position_funding_pnl, get_worst_case_token_amounts,
+                                    is_available, is_spot_position_available)
+from driftpy.math.spot_market import get_token_amount
+from driftpy.math.margin import get_spot_asset_value
+
+
+class MarginCalculator:
+    """
+    Margin and PnL of one user, from a ClearingHouseUser cache (see
+    ClearingHouseUser.set_cache). Figures keep driftpy's precision: quote
+    amounts in QUOTE_PRECISION, as returned by ClearingHouseUser.
+
+    Attributes:
+        spot_value (float): Value of the spot positions, open orders included (get_spot_market_asset_value).
+        positions (dict[int, PerpPosition]): Perp positions in use, by market index.
+        funding (dict[int, float]): Unsettled funding PnL per market.
+        prices (dict[int, int]): Oracle price per market, in PRICE_PRECISION.
+    """
+
+    def __init__(self):
+        self.spot_value = 0.0
+        self.positions = {}
+        self.funding = {}
+        self.prices = {}
+        self._sources = None
+
+    def update(self, cache: dict) -> bool:
+        """
+        Brings the figures up to date with a cache. Accounts are compared by
+        identity: if the user, a market or a spot oracle was replaced
+        everything is recomputed, otherwise only the perp oracle prices are
+        read again.
+
+        Args:
+            cache (dict): A ClearingHouseUser cache.
+
+        Returns:
+            bool: Whether a full recompute was needed.
+        """
+        sources = [id(cache["user"])] + [id(account) for key in ("spot_markets", "spot_market_oracles", "perp_markets")
+                                          for account in cache[key]]
+        rebuild = sources != self._sources
+        if rebuild:
+            self._sources = sources
+            self._rebuild(cache)
+        for market_index in self.positions:
+            self.prices[market_index] = cache["perp_market_oracles"][market_index].price
+        return rebuild
+
+    def _rebuild(self, cache: dict):
+        """Recomputes everything that does not depend on perp oracle prices."""
+        user = cache["user"]
+        self.prices = {}
+        self.spot_value = self._spot_asset_value(user, cache["spot_markets"], cache["spot_market_oracles"])
+        self.positions = {position.market_index: position for position in user.perp_positions
+                          if not is_available(position)}
+        self.funding = {market_index: calculate_position_funding_pnl(cache["perp_markets"][market_index], position)
+                        for market_index, position in self.positions.items()}
+
+    @staticmethod
+    def _spot_asset_value(user, spot_markets: list, spot_oracles: list) -> float:
+        """ClearingHouseUser.get_spot_market_asset_value(include_open_orders=True) without margin weights."""
+        total_value = 0
+        for position in user.spot_positions:
+            if is_spot_position_available(position):
+                continue
+            spot_market = spot_markets[position.market_index]
+            if position.market_index == QUOTE_ASSET_BANK_INDEX:
+                token_amount = get_token_amount(position.scaled_balance, spot_market, position.balance_type)
+                if str(position.balance_type) == "SpotBalanceType.Borrow()":
+                    token_amount *= -1
+                total_value += token_amount
+                continue
+            oracle_data = spot_oracles[position.market_index]
+            token_amount, quote_amount = get_worst_case_token_amounts(position, spot_market, oracle_data)
+            if token_amount > 0:
+                total_value += get_spot_asset_value(token_amount, oracle_data, spot_market, None)
+            if quote_amount > 0:
+                total_value += quote_amount
+        return total_value
+
+    def set_oracle_price(self, market_index: int, price: int):
+        """
+        Re-marks one perp market, e.g. on an oracle tick, without a cache.
+
+        Args:
+            market_index (int): The perp market.
+            price (int): The oracle price, in PRICE_PRECISION.
+        """
+        if market_index in self.positions:
+            self.prices[market_index] = price
+
+    def base_value(self, market_index: int) -> float:
+        """Signed value of a position's base amount at the oracle price, in QUOTE_PRECISION."""
+        return (self.positions[market_index].base_asset_amount * self.prices[market_index]
+                / (AMM_TO_QUOTE_PRECISION_RATIO * PRICE_PRECISION))
+
+    def unrealized_pnl(self, with_funding: bool = False) -> float:
+        """
+        Returns the unrealized PnL of every perp position (ClearingHouseUser.get_unrealized_pnl).
+
+        Args:
+            with_funding (bool): Whether to include unsettled funding.
+
+        Returns:
+            float: The PnL, in QUOTE_PRECISION.
+        """
+        pnl = 0
+        for market_index, position in self.positions.items():
+            pnl += position.quote_asset_amount
+            if position.base_asset_amount != 0:
+                pnl += self.base_value(market_index)
+                if with_funding:
+                    pnl += self.funding[market_index]
+        return pnl
+
+    @property
+    def total_collateral(self) -> float:
+        """float: Spot value plus PnL with funding (ClearingHouseUser.get_total_collateral)."""
+        return self.spot_value + self.unrealized_pnl(with_funding=True)
+
+    @property
+    def perp_liability(self) -> float:
+        """float: Absolute value of every perp position at the oracle price (ClearingHouseUser.get_total_perp_liability)."""
+        return sum(abs(self.base_value(market_index)) for market_index in self.positions)
+
+    @property
+    def free_collateral(self) -> float:
+        """float: Total collateral minus perp liability."""
+        return self.total_collateral - self.perp_liability
+
+    @property
+    def leverage(self) -> float:
+        """float: Perp liability over total collateral, 0 without collateral."""
+        total_collateral = self.total_collateral
+        return self.perp_liability / total_collateral if total_collateral != 0 else 0
+
+    def position(self, market_index: int) -> Optional["PerpPosition"]:
+        """Returns the user's position in a perp market, None if unused (ClearingHouseUser.get_user_position)."""
+        return self.positions.get(market_index)
@@ -0,0 +1,148 @@
+"""Market registry.
+
+Maps every Drift market symbol of an environment to its index, type and
+order constraints. The registry is built once from the driftpy config, so
+code that needs a market's index (every MMOrder) does a dict lookup instead
+of scanning config.markets and config.banks. Tick size, step size and min
+order size live in the market accounts, not in the config: they are filled
+in from the first ClearingHouseUser cache loaded and keep their defaults
+until then.
+
+Classes:
+- MarketInfo: Index, type and order constraints of one market.
+- MarketRegistry: Every market of an environment, by symbol and by index.
+
+Attributes:
+- MARKETS (MarketRegistry): The markets of ENV, shared by the client, orders and strategies.
+"""
+import math
+from collections.abc import Mapping
+from typing import Iterator, Optional
+
+from driftpy.constants.config import configs
+from driftpy.constants.numeric_constants import BASE_PRECISION, PRICE_PRECISION
+from driftpy.types import MarketType
+
+import sys
+from pathlib import Path
+base_path = Path(__file__).resolve().parent
+sys.path.append(str(base_path.parent))
+from src import *
+
+
+class MarketInfo:
+    """
+    Index, type and order constraints of one market.
+
+    Attributes:
+        symbol (str): The market symbol, e.g. SOL-PERP.
+        market_index (int): The perp market index or spot market (bank) index.
+        market_type (MarketType): MarketType.PERP() or MarketType.SPOT().
+        is_perp (bool): Whether the market is a perp market.
+        tick_size (float): Price increment, 0 while unknown.
+        step_size (float): Base amount increment, 0 while unknown.
+        min_order_size (float): Smallest base amount of an order.
+    """
+
+    def __init__(self, symbol: str, market_index: int, is_perp: bool, tick_size: float = 0.0,
+                 step_size: float = 0.0, min_order_size: float = MIN_ORDER_SIZE):
+        self.symbol = symbol
+        self.market_index = market_index
+        self.is_perp = is_perp
+        self.market_type = MarketType.PERP() if is_perp else MarketType.SPOT()
+        self.tick_size = tick_size
+        self.step_size = step_size
+        self.min_order_size = min_order_size
+
+    def round_price(self, price: float) -> float:
+        """Rounds a price (or oracle offset) to the nearest tick."""
+        if self.tick_size <= 0:
+            return price
+        return round(price / self.tick_size) * self.tick_size
+
+    def round_size(self, size: float) -> float:
+        """Rounds a base amount down to a whole number of steps."""
+        if self.step_size <= 0:
+            return size
+        # The epsilon keeps sizes that are already whole steps from losing one to float error
+        return math.floor(size / self.step_size + 1e-9) * self.step_size
+
+    def __repr__(self):
+        return (f"MarketInfo({self.symbol}, index={self.market_index}, tick={self.tick_size}, "
+                f"step={self.step_size}, min={self.min_order_size})")
+
+
+class MarketRegistry(Mapping):
+    """
+    Every perp and spot market of an environment, by symbol. Read it like a
+    dict: MARKETS['SOL-PERP'].market_index.
+
+    Attributes:
+        perp_markets (dict[int, MarketInfo]): Perp markets by index.
+        spot_markets (dict[int, MarketInfo]): Spot markets by index.
+    """
+
+    def __init__(self, markets: list[MarketInfo]):
+        self._markets = {market.symbol: market for market in markets}
+        self.perp_markets = {market.market_index: market for market in markets if market.is_perp}
+        self.spot_markets = {market.market_index: market for market in markets if not market.is_perp}
+
+    @classmethod
+    def from_config(cls, config) -> 'MarketRegistry':
+        """
+        Builds the registry of a driftpy config.
+
+        Args:
+            config (Config): e.g. driftpy.constants.config.configs['devnet'].
+
+        Returns:
+            MarketRegistry: Every market of config.markets and config.banks, without order constraints.
+        """
+        return cls([MarketInfo(market.symbol, market.market_index, True) for market in config.markets] +
+                   [MarketInfo(bank.symbol, bank.bank_index, False) for bank in config.banks])
+
+    def __getitem__(self, symbol: str) -> MarketInfo:
+        try:
+            return self._markets[symbol]
+        except KeyError:
+            raise KeyError(f"Unknown market {symbol} in {ENV}") from None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._markets)
+
+    def __len__(self) -> int:
+        return len(self._markets)
+
+    def perp(self, market_index: int) -> Optional[MarketInfo]:
+        """Returns a perp market by index."""
+        return self.perp_markets.get(market_index)
+
+    def spot(self, market_index: int) -> Optional[MarketInfo]:
+        """Returns a spot market by index."""
+        return self.spot_markets.get(market_index)
+
+    def load_accounts(self, perp_markets: list = (), spot_markets: list = ()):
+        """
+        Fills in tick size, step size and min order size from market accounts,
+        e.g. the 'perp_markets' and 'spot_markets' of a ClearingHouseUser cache.
+
+        Args:
+            perp_markets (list[PerpMarket]): Perp market accounts.
+            spot_markets (list[SpotMarket]): Spot market accounts.
+        """
+        for account in perp_markets:
+            market = self.perp(account.market_index)
+            if market is not None:
+                market.tick_size = account.amm.order_tick_size / PRICE_PRECISION
+                market.step_size = account.amm.order_step_size / BASE_PRECISION
+                market.min_order_size = account.amm.min_order_size / BASE_PRECISION
+        for account in spot_markets:
+            market = self.spot(account.market_index)
+            if market is not None:
+                market.tick_size = account.order_tick_size / PRICE_PRECISION
+                market.step_size = account.order_step_size / 10 ** account.decimals
+                market.min_order_size = account.min_order_size / 10 ** account.decimals
+
+
+MARKETS = MarketRegistry.from_config(configs[ENV])
+"""MarketRegistry: The markets of ENV, shared by the client, orders and strategies."""
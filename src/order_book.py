@@ -0,0 +1,711 @@
+"""Array-backed L2 order book.
+
+Keeps each side of the book as NumPy price and size arrays sorted best price
+first, so the best price is an index, price levels are aggregated with one
+vectorized pass and cumulative depth is a np.cumsum. The dictionary returned
+by utils.format_dlob ('best_bid', 'long_orderbook', 'long_orders', ...) is
+still available by key, built lazily on first access, so existing strategies
+keep working unchanged.
+
+Oracle-pegged orders are kept as offsets and priced against the current
+oracle when a side is read, so OrderBook.set_oracle_price re-marks the book
+as soon as a newer oracle price is known.
+
+Levels are cached per side and resolution: the exact price levels are
+aggregated once, and every tick size in ORDERBOOK_TICK_SIZES is derived from
+them in one pass the first time any of them is read.
+
+Orders are also indexed by user and by order id (L3) on first use, so a
+market maker's own orders, their total size and the size queued ahead of
+each of them are lookups rather than scans of the order lists.
+
+Classes:
+- BookSide: One side of the book (bids or asks).
+- OrderBook: Both sides, with the legacy format_dlob dictionary view, the L3 index and cached analytics.
+"""
+from collections.abc import Mapping
+from typing import Any, Callable, Optional, Union
+
+import numpy as np
+import base58
+
+import sys
+from pathlib import Path
+base_path = Path(__file__).resolve().parent
+sys.path.append(str(base_path.parent))
+from src import *
+from dlob_binary import DLOBSnapshot, ORDER_TYPES
+from book_analytics import BookAnalytics
+
+LIMIT = ORDER_TYPES.index('limit')
+LONG = 0
+
+
+class BookSide:
+    """
+    One side of the book, as arrays sorted best price first
+    (descending for bids, ascending for asks).
+
+    Oracle-pegged orders are stored by their offset, with fixed-price orders
+    and pegged orders each kept in their own sorted run. Reading the side
+    resolves the pegged prices against oracle_price and merges the two runs
+    with one vectorized search, so set_oracle_price re-marks the side without
+    copying or re-sorting any order.
+
+    Attributes:
+        side (str): 'long' or 'short'.
+        oracle_price (float): Oracle price the pegged orders are resolved against.
+        prices (np.ndarray): Order prices, best first.
+        sizes (np.ndarray): Order sizes (baseAssetAmount), aligned with prices.
+        order_ids (np.ndarray): Order ids, aligned with prices.
+        pegged (np.ndarray): Whether each order is oracle-pegged, aligned with prices.
+        offsets (np.ndarray): Oracle offset of each order (0 for fixed prices), aligned with prices.
+    """
+
+    def __init__(self, side: str, prices: np.ndarray, sizes: np.ndarray,
+                 orders: Union[list, Callable, None] = None, users: Union[list, Callable, None] = None,
+                 order_ids: np.ndarray = None, offsets: np.ndarray = None, pegged: np.ndarray = None,
+                 oracle_price: float = 0.0):
+        """
+        Args:
+            side (str): 'long' or 'short'.
+            prices (np.ndarray): Order prices, already sorted best first. With `pegged`, the
+                fixed-price orders sorted best first, then the pegged orders sorted by offset,
+                best first (their price entries are ignored).
+            sizes (np.ndarray): Order sizes, aligned with prices.
+            orders (list[dict] | Callable): The orders as dictionaries in the same order, or a
+                function (positions, prices, oracle_price) -> list[dict] building the dictionaries
+                of the given stored positions, with their current prices, on first use.
+            users (list | Callable): The user account of each order (a key understood by the
+                owning OrderBook), or a function (positions) -> list building them on first use.
+            order_ids (np.ndarray): Order ids, aligned with prices.
+            offsets (np.ndarray): oraclePriceOffset of each order, aligned with prices.
+            pegged (np.ndarray): Boolean mask of the oracle-pegged orders, aligned with prices.
+            oracle_price (float): Oracle price the pegged orders are resolved against.
+        """
+        self.side = side
+        self.oracle_price = oracle_price
+        self._prices = np.asarray(prices, dtype=np.float64)
+        self._sizes = np.asarray(sizes, dtype=np.float64)
+        self._order_ids = np.asarray(order_ids if order_ids is not None else np.zeros(len(self._prices)), dtype=np.int64)
+        self._offsets = offsets
+        self._pegged = pegged if pegged is not None and pegged.any() else None
+        self._orders_source = orders
+        self._users_source = users
+        self._reset()
+
+    def _reset(self):
+        self._index = None
+        self._resolved = {}
+        self._orders = None
+        self._users = None
+        self._depth = None
+        self._finest = None
+        self._levels = {}
+        self._exports = {}
+
+    def set_oracle_price(self, oracle_price: float) -> bool:
+        """
+        Re-marks the pegged orders at a new oracle price.
+
+        Args:
+            oracle_price (float): The new oracle price.
+
+        Returns:
+            bool: True if the side has pegged orders and its prices changed.
+        """
+        if oracle_price == self.oracle_price:
+            return False
+        self.oracle_price = oracle_price
+        if self._pegged is None:
+            return False
+        self._reset()
+        return True
+
+    @property
+    def index(self) -> np.ndarray:
+        """np.ndarray: Stored position of each order, best price first."""
+        if self._index is None:
+            if self._pegged is None:
+                self._index = np.arange(len(self._prices))
+            else:
+                # Merge the two sorted runs; fixed prices go first on ties
+                sign = -1 if self.side == 'long' else 1
+                fixed = np.flatnonzero(~self._pegged)
+                pegged = np.flatnonzero(self._pegged)
+                fixed_keys = sign * self._prices[fixed]
+                pegged_keys = sign * (self.oracle_price + self._offsets[pegged])
+                index = np.empty(len(self._prices), dtype=np.int64)
+                index[np.arange(len(fixed)) + np.searchsorted(pegged_keys, fixed_keys, side='left')] = fixed
+                index[np.arange(len(pegged)) + np.searchsorted(fixed_keys, pegged_keys, side='right')] = pegged
+                self._index = index
+        return self._index
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    @property
+    def prices(self) -> np.ndarray:
+        """np.ndarray: Order prices, best first, with pegged orders at oracle_price + offset."""
+        if 'prices' not in self._resolved:
+            prices = self._prices
+            if self._pegged is not None:
+                prices = np.where(self._pegged, self.oracle_price + self._offsets, prices)
+            self._resolved['prices'] = prices[self.index]
+        return self._resolved['prices']
+
+    @property
+    def sizes(self) -> np.ndarray:
+        """np.ndarray: Order sizes, aligned with prices."""
+        if 'sizes' not in self._resolved:
+            self._resolved['sizes'] = self._sizes if self._pegged is None else self._sizes[self.index]
+        return self._resolved['sizes']
+
+    @property
+    def order_ids(self) -> np.ndarray:
+        """np.ndarray: Order ids, aligned with prices."""
+        if 'order_ids' not in self._resolved:
+            self._resolved['order_ids'] = self._order_ids if self._pegged is None else self._order_ids[self.index]
+        return self._resolved['order_ids']
+
+    @property
+    def pegged(self) -> np.ndarray:
+        """np.ndarray: Whether each order is oracle-pegged, aligned with prices."""
+        if 'pegged' not in self._resolved:
+            pegged = self._pegged if self._pegged is not None else np.zeros(len(self._prices), dtype=bool)
+            self._resolved['pegged'] = pegged[self.index]
+        return self._resolved['pegged']
+
+    @property
+    def offsets(self) -> np.ndarray:
+        """np.ndarray: oraclePriceOffset of each order (0 for fixed prices), aligned with prices."""
+        if 'offsets' not in self._resolved:
+            if self._pegged is None:
+                self._resolved['offsets'] = np.zeros(len(self._prices))
+            else:
+                self._resolved['offsets'] = np.where(self.pegged, self._offsets[self.index], 0.0)
+        return self._resolved['offsets']
+
+    @property
+    def best(self) -> Optional[float]:
+        """Optional[float]: Best price on this side, None if empty."""
+        return float(self.prices[0]) if len(self._prices) > 0 else None
+
+    @property
+    def orders(self) -> list[dict]:
+        """list[dict]: The orders as dictionaries, best price first."""
+        if self._orders is None:
+            if callable(self._orders_source):
+                self._orders = self._orders_source(self.index, self.prices, self.oracle_price)
+            else:
+                self._orders = self._orders_source if self._orders_source is not None else []
+        return self._orders
+
+    def orders_at(self, positions: np.ndarray) -> list[dict]:
+        """
+        Returns some of the orders as dictionaries, without building the others.
+
+        Args:
+            positions (np.ndarray): Positions on the side, as returned by OrderBook.user_positions.
+
+        Returns:
+            list[dict]: The orders at those positions, in the same order.
+        """
+        if callable(self._orders_source) and self._orders is None:
+            return self._orders_source(self.index[positions], self.prices[positions], self.oracle_price)
+        orders = self.orders
+        return [orders[position] for position in positions.tolist()]
+
+    @property
+    def users(self) -> list:
+        """list: The user account of each order, best price first."""
+        if self._users is None:
+            if callable(self._users_source):
+                self._users = self._users_source(self.index)
+            elif self._users_source is not None:
+                self._users = [self._users_source[i] for i in self.index.tolist()]
+            else:
+                self._users = []
+        return self._users
+
+    @property
+    def depth(self) -> np.ndarray:
+        """np.ndarray: Cumulative size up to and including each order."""
+        if self._depth is None:
+            self._depth = np.cumsum(self.sizes)
+        return self._depth
+
+    def level_prices(self, tick_size: float, prices: np.ndarray = None) -> np.ndarray:
+        """
+        Returns the price level of every order at a tick size, with the
+        rounding of utils.create_order_book: asks round up, bids round down.
+
+        Args:
+            tick_size (float): Width of a price level.
+            prices (np.ndarray, optional): Prices to round instead of the order prices.
+
+        Returns:
+            np.ndarray: Level price of each order, aligned with prices.
+        """
+        prices = self.prices if prices is None else prices
+        if self.side == 'short':
+            return ((prices + tick_size) // tick_size) * tick_size
+        return ((prices + tick_size / 100) // tick_size) * tick_size
+
+    def levels(self, tick_size: float = 0.1) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Aggregates the orders into price levels. Results are cached per tick size.
+
+        Args:
+            tick_size (float): Width of a price level.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Level prices (best first) and the total size at each level.
+        """
+        key = round(tick_size, 12)
+        if key not in self._levels:
+            if key in ORDERBOOK_TICK_SIZES:
+                for tick in ORDERBOOK_TICK_SIZES:
+                    self._levels.setdefault(tick, self._aggregate(tick))
+            else:
+                self._levels[key] = self._aggregate(tick_size)
+        return self._levels[key]
+
+    def finest_levels(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the exact price levels: one per distinct order price.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Distinct prices (best first) and the total size at each.
+        """
+        if self._finest is None:
+            self._finest = self._runs(self.prices, self.sizes)
+        return self._finest
+
+    def _aggregate(self, tick_size: float) -> tuple[np.ndarray, np.ndarray]:
+        prices, sizes = self.finest_levels()
+        return self._runs(self.level_prices(tick_size, prices), sizes)
+
+    @staticmethod
+    def _runs(groups: np.ndarray, sizes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        if len(groups) == 0:
+            return np.empty(0), np.empty(0)
+        # Prices are sorted, so each level is a contiguous run
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        return groups[starts], np.add.reduceat(sizes, starts)
+
+    def depth_at(self, price: float) -> float:
+        """
+        Returns the size resting at the given price or better.
+
+        Args:
+            price (float): Limit price.
+
+        Returns:
+            float: Total size of the orders priced at or better than `price`.
+        """
+        if self.side == 'long':
+            count = np.searchsorted(-self.prices, -price, side='right')
+        else:
+            count = np.searchsorted(self.prices, price, side='right')
+        return float(self.depth[count - 1]) if count > 0 else 0.0
+
+    def price_for_depth(self, size: float) -> Optional[float]:
+        """
+        Returns the worst price reached when taking `size` from this side.
+
+        Args:
+            size (float): Size to take.
+
+        Returns:
+            Optional[float]: The price of the order that completes `size`, None if the side is too thin.
+        """
+        index = np.searchsorted(self.depth, size, side='left')
+        return float(self.prices[index]) if index < len(self.prices) else None
+
+    def size_ahead(self, position: int) -> tuple[float, float]:
+        """
+        Returns the size queued ahead of an order: at better prices, and at
+        its own price with earlier time priority.
+
+        Args:
+            position (int): Position of the order on this side.
+
+        Returns:
+            tuple[float, float]: Size at better prices, size ahead at the same price.
+        """
+        price = self.prices[position]
+        if self.side == 'long':
+            level_start = np.searchsorted(-self.prices, -price, side='left')
+        else:
+            level_start = np.searchsorted(self.prices, price, side='left')
+        better = float(self.depth[level_start - 1]) if level_start > 0 else 0.0
+        ahead = float(self.depth[position - 1]) - better if position > level_start else 0.0
+        return better, ahead
+
+    def to_order_book(self, tick_size: float = 0.1) -> dict:
+        """
+        Exports the levels in the dictionary format of utils.create_order_book.
+        The export is cached per tick size like the levels.
+
+        Args:
+            tick_size (float): Width of a price level.
+
+        Returns:
+            dict: Levels keyed by str(price), each with 'price', 'quantity' and 'cumulative_quantity'.
+        """
+        key = round(tick_size, 12)
+        if key not in self._exports:
+            prices, sizes = self.levels(tick_size)
+            self._exports[key] = {str(price): {'price': price, 'quantity': size, 'cumulative_quantity': cumulative}
+                for price, size, cumulative in zip(prices.tolist(), sizes.tolist(), np.cumsum(sizes).tolist())}
+        return self._exports[key]
+
+
+class OrderBook(Mapping):
+    """
+    L2 order book of one market, backed by sorted NumPy arrays.
+
+    Reading it as a dictionary gives the keys returned by utils.format_dlob
+    ('best_bid', 'best_ask', 'long_orderbook', 'short_orderbook',
+    'long_orders', 'short_orders'); each is built on first access.
+
+    Users are given as base58 account addresses to the L3 queries
+    (user_positions, open_orders, open_sizes, user_orders, find_order, queue_ahead).
+
+    Attributes:
+        bids (BookSide): Long orders, highest price first.
+        asks (BookSide): Short orders, lowest price first.
+        tick_size (float): Level width of the 'long_orderbook' and 'short_orderbook' views.
+    """
+
+    def __init__(self, bids: BookSide, asks: BookSide, tick_size: float = 0.1,
+                 user_key: Callable[[str], Any] = str):
+        """
+        Args:
+            bids (BookSide): Long orders, highest price first.
+            asks (BookSide): Short orders, lowest price first.
+            tick_size (float): Level width of the dictionary views.
+            user_key (Callable): Converts a user address to the keys stored in the sides' users.
+        """
+        self.bids = bids
+        self.asks = asks
+        self.tick_size = tick_size
+        self._user_key = user_key
+        self._views = {}
+        self._by_user = None
+        self._by_order = None
+        self._analytics = None
+
+    @classmethod
+    def from_orders(cls, orders: list[dict], tick_size: float = 0.1) -> 'OrderBook':
+        """
+        Builds the book from order dictionaries as written by handle_dlob.js.
+        Only limit orders are kept, as in utils.format_dlob. Oracle-pegged
+        orders (price 0) keep their offset and are priced at
+        oracle_price + oraclePriceOffset when read.
+
+        Args:
+            orders (list[dict]): The orders, in any order.
+            tick_size (float): Level width of the dictionary views.
+
+        Returns:
+            OrderBook: The book.
+        """
+        limits = [order for order in orders if order['orderType'] == 'limit']
+        count = len(limits)
+        prices = np.fromiter((order['price'] for order in limits), dtype=np.float64, count=count)
+        offsets = np.fromiter((order['oraclePriceOffset'] for order in limits), dtype=np.float64, count=count)
+        sizes = np.fromiter((order['baseAssetAmount'] for order in limits), dtype=np.float64, count=count)
+        is_long = np.fromiter((order['direction'] == 'long' for order in limits), dtype=bool, count=count)
+        order_ids = np.fromiter((order.get('orderId', 0) for order in limits), dtype=np.int64, count=count)
+        oracle_price = limits[0]['oracle_price'] if count > 0 else 0.0
+
+        def side(name: str, mask: np.ndarray) -> BookSide:
+            source = cls._storage_order(name, mask, prices, offsets)
+            export = lambda positions, side_prices, oracle: [
+                {**limits[i], 'price': price, 'oracle_price': oracle}
+                for i, price in zip(source[positions].tolist(), side_prices.tolist())]
+            users = lambda positions: [limits[i]['user'] for i in source[positions].tolist()]
+            return BookSide(name, prices[source], sizes[source], export, users, order_ids[source],
+                            offsets[source], prices[source] == 0, oracle_price)
+
+        return cls(side('long', is_long), side('short', ~is_long), tick_size)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: DLOBSnapshot, tick_size: float = 0.1) -> 'OrderBook':
+        """
+        Builds the book straight from a binary snapshot's records, without
+        converting them to dictionaries first.
+
+        Args:
+            snapshot (DLOBSnapshot): The snapshot.
+            tick_size (float): Level width of the dictionary views.
+
+        Returns:
+            OrderBook: The book.
+        """
+        records = snapshot.records
+        prices = records['price']
+        offsets = records['oraclePriceOffset']
+        limit = records['orderType'] == LIMIT
+        is_long = records['direction'] == LONG
+
+        def side(name: str, mask: np.ndarray) -> BookSide:
+            source = cls._storage_order(name, mask, prices, offsets)
+
+            def export(positions: np.ndarray, side_prices: np.ndarray, oracle: float) -> list[dict]:
+                orders = snapshot.to_dicts(source[positions])
+                for order, price in zip(orders, side_prices.tolist()):
+                    order['price'] = price
+                    order['oracle_price'] = oracle
+                return orders
+
+            def users(positions: np.ndarray) -> list[bytes]:
+                # Raw 32 byte pubkeys: cheaper to hash than base58 strings
+                blob = np.ascontiguousarray(records['user'][source[positions]]).tobytes()
+                return [blob[i:i + 32] for i in range(0, len(blob), 32)]
+            return BookSide(name, prices[source], records['baseAssetAmount'][source], export, users,
+                            records['orderId'][source], offsets[source], prices[source] == 0, snapshot.oracle_price)
+
+        return cls(side('long', limit & is_long), side('short', limit & ~is_long), tick_size,
+                   lambda address: base58.b58decode(str(address)))
+
+    @staticmethod
+    def _storage_order(side: str, mask: np.ndarray, prices: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        # Fixed-price orders by price then pegged orders by offset, each best first and stable
+        sign = -1 if side == 'long' else 1
+        fixed = np.flatnonzero(mask & (prices != 0))
+        pegged = np.flatnonzero(mask & (prices == 0))
+        return np.concatenate((fixed[np.argsort(sign * prices[fixed], kind='stable')],
+                               pegged[np.argsort(sign * offsets[pegged], kind='stable')]))
+
+    def set_oracle_price(self, oracle_price: float):
+        """
+        Re-marks the oracle-pegged orders of both sides at a new oracle price,
+        without refetching or copying any order.
+
+        Args:
+            oracle_price (float): The new oracle price.
+        """
+        if oracle_price != self.oracle_price:
+            # Oracle-relative analytics change even when no order moves
+            self._analytics = None
+        changed = self.bids.set_oracle_price(oracle_price)
+        changed = self.asks.set_oracle_price(oracle_price) or changed
+        if changed:
+            self._views.clear()
+            self._by_user = None
+            self._by_order = None
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        """Optional[float]: Highest bid, None if there are no bids."""
+        return self.bids.best
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        """Optional[float]: Lowest ask, None if there are no asks."""
+        return self.asks.best
+
+    @property
+    def oracle_price(self) -> float:
+        """float: Oracle price the pegged orders are priced at."""
+        return self.bids.oracle_price
+
+    @property
+    def analytics(self) -> BookAnalytics:
+        """BookAnalytics: Microprice, imbalance, depth and VWAP of this book, cached until it is re-marked."""
+        if self._analytics is None:
+            self._analytics = BookAnalytics(self)
+        return self._analytics
+
+    @property
+    def mid_price(self) -> Optional[float]:
+        """Optional[float]: Midpoint of the best bid and ask, or the only best price if one side is empty."""
+        if self.best_bid is None or self.best_ask is None:
+            return self.best_bid if self.best_ask is None else self.best_ask
+        return (self.best_bid + self.best_ask) / 2
+
+    def side(self, side: str) -> BookSide:
+        """Returns the bids for 'long' and the asks for 'short'."""
+        return self.bids if side == 'long' else self.asks
+
+    def tick_size_of(self, resolution: Union[float, str, None]) -> float:
+        """
+        Resolves a resolution to a level width.
+
+        Args:
+            resolution (float | str | None): A tick size, 'bps' for ORDERBOOK_BPS_BUCKET
+                basis points of the mid price, or None for the book's tick_size.
+
+        Returns:
+            float: The level width.
+        """
+        if resolution is None:
+            return self.tick_size
+        if resolution == 'bps':
+            mid = self.mid_price
+            return mid * ORDERBOOK_BPS_BUCKET / 10000 if mid else self.tick_size
+        return float(resolution)
+
+    def levels(self, side: str, resolution: Union[float, str, None] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the cached price levels of one side at a resolution.
+
+        Args:
+            side (str): 'long' or 'short'.
+            resolution (float | str | None): See tick_size_of.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Level prices (best first) and the total size at each level.
+        """
+        return self.side(side).levels(self.tick_size_of(resolution))
+
+    def order_book(self, side: str, resolution: Union[float, str, None] = None) -> dict:
+        """
+        Returns one side's levels at a resolution in the dictionary format of utils.create_order_book.
+
+        Args:
+            side (str): 'long' or 'short'.
+            resolution (float | str | None): See tick_size_of.
+
+        Returns:
+            dict: Levels keyed by str(price), each with 'price', 'quantity' and 'cumulative_quantity'.
+        """
+        return self.side(side).to_order_book(self.tick_size_of(resolution))
+
+    def user_positions(self, user: str, side: str) -> np.ndarray:
+        """
+        Returns where a user's orders sit on one side of the book.
+
+        Args:
+            user (str): User account address.
+            side (str): 'long' or 'short'.
+
+        Returns:
+            np.ndarray: Positions of the user's orders on that side, best price first.
+        """
+        self._build_index()
+        positions = self._by_user.get(self._user_key(user))
+        return positions[side] if positions is not None else np.empty(0, dtype=np.int64)
+
+    def open_orders(self, user: str) -> tuple[int, int]:
+        """
+        Returns how many orders a user has on each side.
+
+        Args:
+            user (str): User account address.
+
+        Returns:
+            tuple[int, int]: Number of bids, number of asks.
+        """
+        return len(self.user_positions(user, 'long')), len(self.user_positions(user, 'short'))
+
+    def open_sizes(self, user: str) -> tuple[float, float]:
+        """
+        Returns the total size of a user's orders on each side.
+
+        Args:
+            user (str): User account address.
+
+        Returns:
+            tuple[float, float]: Total bid size, total ask size.
+        """
+        return (float(self.bids.sizes[self.user_positions(user, 'long')].sum()),
+                float(self.asks.sizes[self.user_positions(user, 'short')].sum()))
+
+    def user_orders(self, user: str) -> list[dict]:
+        """
+        Returns a user's orders in the userorders format of handle_dlob.js,
+        where oracle-pegged orders keep price 0, e.g. for
+        OrderManager.reconcile_snapshot.
+
+        Args:
+            user (str): User account address.
+
+        Returns:
+            list[dict]: The user's bids then asks, best price first.
+        """
+        records = []
+        for book_side in (self.bids, self.asks):
+            positions = self.user_positions(user, book_side.side)
+            pegged = book_side.pegged[positions].tolist()
+            records += [{**order, 'price': 0.0} if is_pegged else order
+                        for order, is_pegged in zip(book_side.orders_at(positions), pegged)]
+        return records
+
+    def find_order(self, user: str, order_id: int) -> Optional[tuple[str, int]]:
+        """
+        Looks up an order by user and order id.
+
+        Args:
+            user (str): User account address.
+            order_id (int): The user's order id.
+
+        Returns:
+            Optional[tuple[str, int]]: The order's side and position on that side, None if not on the book.
+        """
+        self._build_index()
+        return self._by_order.get((self._user_key(user), int(order_id)))
+
+    def queue_ahead(self, user: str, order_id: int) -> Optional[tuple[float, float]]:
+        """
+        Returns the size that trades before an order: at better prices, and
+        at the same price ahead of it, for queue position estimates.
+
+        Args:
+            user (str): User account address.
+            order_id (int): The user's order id.
+
+        Returns:
+            Optional[tuple[float, float]]: Size at better prices and size ahead at the
+            same price, None if the order is not on the book.
+        """
+        found = self.find_order(user, order_id)
+        if found is None:
+            return None
+        side, position = found
+        return self.side(side).size_ahead(position)
+
+    def _build_index(self):
+        if self._by_user is not None:
+            return
+        by_user, by_order = {}, {}
+        for book_side in (self.bids, self.asks):
+            for position, (user, order_id) in enumerate(zip(book_side.users, book_side.order_ids.tolist())):
+                by_user.setdefault(user, {'long': [], 'short': []})[book_side.side].append(position)
+                by_order[(user, order_id)] = (book_side.side, position)
+        self._by_user = {user: {side: np.array(positions, dtype=np.int64) for side, positions in sides.items()}
+                         for user, sides in by_user.items()}
+        self._by_order = by_order
+
+    def to_dict(self) -> dict:
+        """
+        Exports the book in the format returned by utils.format_dlob, e.g. for archiving.
+
+        Returns:
+            dict: A plain dictionary with every key of the view.
+        """
+        return {key: self[key] for key in self}
+
+    def __getitem__(self, key: str):
+        if key not in self._views:
+            if key == 'best_bid':
+                value = self.best_bid
+            elif key == 'best_ask':
+                value = self.best_ask
+            elif key in ('long_orderbook', 'short_orderbook'):
+                value = self.side(key[:-len('_orderbook')]).to_order_book(self.tick_size)
+            elif key in ('long_orders', 'short_orders'):
+                value = self.side(key[:-len('_orders')]).orders
+            else:
+                raise KeyError(key)
+            self._views[key] = value
+        return self._views[key]
+
+    def __iter__(self):
+        return iter(('best_bid', 'best_ask', 'long_orderbook', 'short_orderbook', 'long_orders', 'short_orders'))
+
+    def __len__(self) -> int:
+        return 6
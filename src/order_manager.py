@@ -0,0 +1,358 @@
+"""Local order management.
+
+Keeps a record of every order we submit in the traded market and follows it
+from pending to open, partially filled, filled, cancelled or expired, so
+strategies read exact per-order state instead of scanning the DLOB.
+
+Orders are reconciled against two sources:
+
+- the order slots of our user account, the authority: orders are matched by
+  order id once known, and a pending order is matched to its slot by the
+  user_order_id it was placed with. An order we knew that is no longer open
+  was cancelled if we asked for it, otherwise filled. A pending order that
+  never shows up within OMS_PENDING_TIMEOUT expired (e.g. a post-only order
+  that would have crossed, or a transaction that never landed);
+- userorders snapshots: our orders in the DLOB just fetched
+  (OrderBook.user_orders), or data/userorders.json written by the one-shot
+  Javascript SDK fetch. They carry no slot, so they only ever advance fills
+  and add orders we did not know about; they never close one. Files older
+  than the OrderManager are left from an earlier run and ignored.
+
+Drift's modify_order re-places an order under a new order id, keeping its
+user_order_id: a modify is recorded as the old order cancelled and a new
+pending one.
+
+Classes:
+- ManagedOrder: One order and its state.
+- OrderManager: Every order of ours in one market.
+"""
+import os
+import json
+import time
+from collections import deque
+from typing import Optional
+
+from driftpy.constants.numeric_constants import BASE_PRECISION, PRICE_PRECISION
+
+import sys
+from pathlib import Path
+base_path = Path(__file__).resolve().parent
+sys.path.append(str(base_path.parent))
+from src import *
+from quote_reconciler import LiveOrder
+
+PENDING, OPEN, PARTIALLY_FILLED = 'pending', 'open', 'partially_filled'
+FILLED, CANCELLED, EXPIRED = 'filled', 'cancelled', 'expired'
+ACTIVE_STATES = (PENDING, OPEN, PARTIALLY_FILLED)
+# user_order_id is a u8, and 0 means none
+MAX_USER_ORDER_ID = 255
+
+
+def _side(direction) -> str:
+    """'long' or 'short' of a PositionDirection or a DLOB direction string."""
+    return 'long' if 'LONG' in str(direction).upper() else 'short'
+
+
+class ManagedOrder:
+    """
+    One order of ours and its state.
+
+    Attributes:
+        side (str): 'long' or 'short'.
+        size (float): Base asset amount.
+        price (float): Limit price, 0 for oracle-pegged orders.
+        offset (float): Oracle price offset.
+        user_order_id (int): The id we placed it with, 0 for orders we did not place.
+        order_id (Optional[int]): The id in our user account, None while pending.
+        filled (float): Base asset amount filled.
+        status (str): 'pending', 'open', 'partially_filled', 'filled', 'cancelled' or 'expired'.
+        cancel_requested (bool): Whether we sent a cancel for it.
+        created_at (float): time.monotonic() it was submitted, or first seen.
+        updated_at (float): time.monotonic() of its last change.
+    """
+
+    def __init__(self, side: str, size: float, price: float = 0.0, offset: float = 0.0,
+                 user_order_id: int = 0, order_id: Optional[int] = None, status: str = PENDING):
+        self.side = side
+        self.size = size
+        self.price = price
+        self.offset = offset
+        self.user_order_id = user_order_id
+        self.order_id = order_id
+        self.filled = 0.0
+        self.status = status
+        self.cancel_requested = False
+        self.created_at = self.updated_at = time.monotonic()
+
+    @property
+    def remaining(self) -> float:
+        """float: Base asset amount left to fill."""
+        return max(self.size - self.filled, 0.0)
+
+    @property
+    def active(self) -> bool:
+        """bool: Whether it is pending or resting."""
+        return self.status in ACTIVE_STATES
+
+    def as_live_order(self) -> LiveOrder:
+        """Returns it as the reconciler sees it: unfilled size, no order id while pending."""
+        return LiveOrder(self.order_id, self.side, self.remaining, self.offset, self.price == 0)
+
+    def __repr__(self):
+        return (f"ManagedOrder(#{self.order_id}, uid {self.user_order_id}, {self.side}, "
+                f"{self.filled}/{self.size}, {self.status})")
+
+
+class OrderManager:
+    """
+    Every order of ours in one market, reconciled against the user account
+    and the userorders snapshots.
+
+    Attributes:
+        market_index (int): The perp market.
+        pending_timeout (float): Seconds a submitted order may go unseen before it is expired.
+        orders (list[ManagedOrder]): Pending and resting orders.
+        history (deque[ManagedOrder]): The last OMS_HISTORY orders that were filled, cancelled or expired.
+        fills (deque[tuple[ManagedOrder, float]]): The last OMS_HISTORY fills, with the amount each filled.
+        slot (int): Slot of the last user account reconciled.
+        started_at (float): time.time() it was created; older userorders files are ignored.
+    """
+
+    def __init__(self, market_index: int, pending_timeout: float = OMS_PENDING_TIMEOUT):
+        self.market_index = market_index
+        self.pending_timeout = pending_timeout
+        self.orders = []
+        self.history = deque(maxlen=OMS_HISTORY)
+        self.fills = deque(maxlen=OMS_HISTORY)
+        self.slot = 0
+        self._closed_ids = deque(maxlen=OMS_HISTORY)
+        self._next_user_order_id = 1
+        self._snapshot_mtime = None
+        self.started_at = time.time()
+        # Orders each unsent submission's cancel-all is to cancel, by id() of the submission
+        self._cancel_all_targets = {}
+
+    # QUERIES
+    def open_orders(self, side: str = None) -> list[ManagedOrder]:
+        """Returns the pending and resting orders we have not asked to cancel, of one side or both."""
+        return [order for order in self.orders
+                if not order.cancel_requested and (side is None or order.side == side)]
+
+    def open_counts(self) -> list[int]:
+        """Returns the number of open bids and asks, pending ones included."""
+        return [len(self.open_orders('long')), len(self.open_orders('short'))]
+
+    def open_size(self, side: str) -> float:
+        """Returns the unfilled base amount of one side's open orders."""
+        return sum(order.remaining for order in self.open_orders(side))
+
+    def live_orders(self) -> list[LiveOrder]:
+        """Returns the open orders for the QuoteReconciler."""
+        return [order.as_live_order() for order in self.open_orders()]
+
+    def get(self, order_id: int) -> Optional[ManagedOrder]:
+        """Returns an active order by order id."""
+        return next((order for order in self.orders if order.order_id == order_id), None)
+
+    # SUBMISSIONS
+    def _allocate_user_order_id(self) -> int:
+        in_use = {order.user_order_id for order in self.orders}
+        for _ in range(MAX_USER_ORDER_ID):
+            user_order_id = self._next_user_order_id
+            self._next_user_order_id = user_order_id % MAX_USER_ORDER_ID + 1
+            if user_order_id not in in_use:
+                return user_order_id
+        raise Exception("OrderManagerError: every user_order_id is in use")
+
+    def _add_pending(self, params, user_order_id: int = None) -> ManagedOrder:
+        if user_order_id is None:
+            user_order_id = self._allocate_user_order_id()
+        params.user_order_id = user_order_id
+        order = ManagedOrder(_side(params.direction), params.base_asset_amount / BASE_PRECISION,
+                             params.price / PRICE_PRECISION, params.oracle_price_offset / PRICE_PRECISION,
+                             user_order_id)
+        self.orders.append(order)
+        return order
+
+    def record_submission(self, orders) -> list[ManagedOrder]:
+        """
+        Records the orders about to be sent. Must be called before they are
+        sent: placed orders are given the user_order_id they are matched by.
+
+        Args:
+            orders (Orders): The orders. An instruction in orders.ixs is the strategy's cancel-all.
+
+        Returns:
+            list[ManagedOrder]: The new pending orders.
+        """
+        if orders.ixs:
+            targets = [order for order in self.orders if not order.cancel_requested]
+            for order in targets:
+                order.cancel_requested = True
+            self._cancel_all_targets[id(orders)] = targets
+        placements, cancels, modifies = orders.changes()
+        for order_id in cancels:
+            order = self.get(order_id)
+            if order is not None:
+                order.cancel_requested = True
+        pending = [self._add_pending(params) for params in placements]
+        for order_id, params in modifies:
+            order = self.get(order_id)
+            if order is None:
+                continue
+            order.cancel_requested = True
+            replacement = self._add_pending(params, order.user_order_id)
+            replacement.filled = order.filled
+            replacement.size = max(replacement.size, order.filled)
+            pending.append(replacement)
+        return pending
+
+    def on_sent(self, pending: list[ManagedOrder], results: list, orders):
+        """
+        Undoes the changes of the transactions that failed to be sent, or of
+        every transaction if none was: their placements are expired, and the
+        orders they were to cancel or modify are open again.
+
+        Args:
+            pending (list[ManagedOrder]): The orders record_submission returned.
+            results (list[BatchResult]): The transactions they were sent in.
+            orders (Orders): The orders sent, with the change each instruction carries.
+        """
+        cancel_all_targets = self._cancel_all_targets.pop(id(orders), [])
+        if results:
+            changes = [orders.ix_changes.get(id(ix)) for result in results if not result.ok for ix in result.ixs]
+        else:
+            # Nothing was sent, e.g. building the instructions failed: every change is undone
+            placements, cancels, modifies = orders.changes()
+            changes = ([(None, None)] if orders.ixs else []) + [(order_id, None) for order_id in cancels]
+            changes += list(modifies) + [(None, params) for params in placements]
+        for change in changes:
+            if change is None:
+                continue
+            order_id, params = change
+            if params is not None:
+                placed = next((o for o in pending if o.status == PENDING
+                               and o.user_order_id == params.user_order_id), None)
+                if placed is not None:
+                    self._close(placed, EXPIRED)
+            if order_id is not None:
+                order = self.get(order_id)
+                if order is not None:
+                    order.cancel_requested = False
+            elif params is None:
+                # The cancel-all
+                for order in cancel_all_targets:
+                    order.cancel_requested = False
+
+    # RECONCILIATION
+    def _update(self, order: ManagedOrder, size: float, filled: float, price: float, offset: float,
+                order_id: int = None):
+        if order_id is not None:
+            order.order_id = order_id
+        if filled > order.filled + 1e-9:
+            self.fills.append((order, filled - order.filled))
+            order.filled = filled
+        order.size, order.price, order.offset = size, price, offset
+        order.status = PARTIALLY_FILLED if order.filled > 0 else OPEN
+        order.updated_at = time.monotonic()
+
+    def _close(self, order: ManagedOrder, status: str):
+        if status == FILLED and order.remaining > 0:
+            self.fills.append((order, order.remaining))
+            order.filled = order.size
+        order.status = status
+        order.updated_at = time.monotonic()
+        self.orders.remove(order)
+        self.history.append(order)
+        if order.order_id is not None:
+            self._closed_ids.append(order.order_id)
+
+    def _match(self, order_id: int, user_order_id: int, side: str) -> Optional[ManagedOrder]:
+        order = self.get(order_id)
+        if order is None and user_order_id:
+            order = next((o for o in self.orders if o.status == PENDING and o.user_order_id == user_order_id
+                          and o.side == side), None)
+        return order
+
+    def _adopt(self, side: str, order_id: int, user_order_id: int = 0) -> ManagedOrder:
+        """Starts tracking an open order we did not submit, e.g. one placed before a restart."""
+        order = ManagedOrder(side, 0.0, user_order_id=user_order_id, order_id=order_id, status=OPEN)
+        self.orders.append(order)
+        return order
+
+    def reconcile_user(self, user, slot: int = None):
+        """
+        Reconciles with the order slots of our user account. Accounts older
+        than the last one reconciled are ignored.
+
+        Args:
+            user (User): The decoded user account.
+            slot (int): The slot it was read at.
+        """
+        if slot is not None:
+            if slot < self.slot:
+                return
+            self.slot = slot
+        seen = set()
+        for account_order in user.orders:
+            if 'Open' not in str(account_order.status) or account_order.market_index != self.market_index:
+                continue
+            side = _side(account_order.direction)
+            order = self._match(account_order.order_id, account_order.user_order_id, side)
+            if order is None:
+                order = self._adopt(side, account_order.order_id, account_order.user_order_id)
+            self._update(order, account_order.base_asset_amount / BASE_PRECISION,
+                         account_order.base_asset_amount_filled / BASE_PRECISION,
+                         account_order.price / PRICE_PRECISION, account_order.oracle_price_offset / PRICE_PRECISION,
+                         account_order.order_id)
+            seen.add(account_order.order_id)
+        now = time.monotonic()
+        for order in list(self.orders):
+            if order.order_id is not None and order.order_id not in seen:
+                # Gone from the account: cancelled if we asked, otherwise filled
+                self._close(order, CANCELLED if order.cancel_requested else FILLED)
+            elif order.status == PENDING and now - order.created_at > self.pending_timeout:
+                self._close(order, EXPIRED)
+
+    def reconcile_snapshot(self, records: list[dict]):
+        """
+        Reconciles with a userorders snapshot of the Javascript SDK (DLOB order
+        format, in readable units). Only advances fills and adopts unknown
+        orders: without a slot the snapshot may be older than the account.
+
+        Args:
+            records (list[dict]): The snapshot, e.g. OrderBook.user_orders or read_javascript_data('userorders').
+        """
+        for record in records:
+            order_id = record['orderId']
+            if order_id in self._closed_ids:
+                continue
+            side = _side(record['direction'])
+            order = self.get(order_id)
+            if order is None:
+                # No user_order_id in the snapshot: a pending order is recognised by its terms
+                order = next((o for o in self.orders if o.status == PENDING and o.side == side
+                              and abs(o.size - record['baseAssetAmount']) < 1e-9
+                              and abs(o.offset - record['oraclePriceOffset']) < 1e-9
+                              and abs(o.price - record['price']) < 1e-9), None)
+            if order is None:
+                order = self._adopt(side, order_id)
+            self._update(order, record['baseAssetAmount'], max(order.filled, record['baseAssetAmountFilled']),
+                         record['price'], record['oraclePriceOffset'], order_id)
+
+    def reconcile_snapshot_file(self, path: str):
+        """Reconciles with a userorders JSON file if it was rewritten since the last call and since we started."""
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return
+        if mtime == self._snapshot_mtime or mtime < self.started_at:
+            return
+        self._snapshot_mtime = mtime
+        with open(path, 'r') as f:
+            self.reconcile_snapshot(json.load(f))
+
+    def __str__(self):
+        bids, asks = self.open_counts()
+        return (f"OMS: {bids} bids ({self.open_size('long'):.2f}), {asks} asks ({self.open_size('short'):.2f}), "
+                f"{len(self.fills)} fills")
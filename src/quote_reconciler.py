@@ -0,0 +1,202 @@
+"""Quote reconciliation.
+
+Compares the ladder a strategy wants (side, size and oracle offset of each
+quote) with the orders already resting, and works out the smallest set of
+changes to get from one to the other:
+
+- a resting order within tolerance of a wanted quote is kept untouched, so
+  it keeps its queue priority;
+- otherwise a resting oracle-pegged order is modified into a wanted quote,
+  one instruction instead of a cancel and a place;
+- resting orders left over are cancelled by id, and wanted quotes left over
+  are placed.
+
+Classes:
+- Quote: A wanted order.
+- LiveOrder: A resting order of ours.
+- QuoteDiff: The changes that turn the live orders into the wanted ladder.
+- QuoteReconciler: Works out a QuoteDiff within price and size tolerances.
+
+Functions:
+- live_orders_from_book(book: OrderBook, user: str) -> list[LiveOrder]: Our resting orders, from the DLOB.
+- live_orders_from_user(user, market_index: int) -> list[LiveOrder]: Our open orders, from the user account.
+"""
+from typing import Optional
+
+from driftpy.constants.numeric_constants import BASE_PRECISION, PRICE_PRECISION
+
+import sys
+from pathlib import Path
+base_path = Path(__file__).resolve().parent
+sys.path.append(str(base_path.parent))
+from src import *
+
+
+class Quote:
+    """
+    A wanted order, pegged to the oracle.
+
+    Attributes:
+        side (str): 'long' or 'short'.
+        size (float): Base asset amount.
+        offset (float): Oracle price offset, negative below the oracle.
+    """
+
+    def __init__(self, side: str, size: float, offset: float):
+        self.side = side
+        self.size = size
+        self.offset = offset
+
+    def __eq__(self, other):
+        return (isinstance(other, Quote) and (self.side, self.size, self.offset) ==
+                (other.side, other.size, other.offset))
+
+    def __repr__(self):
+        return f"Quote({self.side}, {self.size}, {self.offset:+})"
+
+
+class LiveOrder(Quote):
+    """
+    A resting order of ours.
+
+    Attributes:
+        order_id (Optional[int]): The order id in our user account, None while its placement is in flight.
+        pegged (bool): Whether the order is oracle-pegged. Fixed-price orders are never kept or modified.
+    """
+
+    def __init__(self, order_id: Optional[int], side: str, size: float, offset: float, pegged: bool = True):
+        super().__init__(side, size, offset)
+        self.order_id = order_id
+        self.pegged = pegged
+
+    def __repr__(self):
+        return f"LiveOrder(#{self.order_id}, {self.side}, {self.size}, {self.offset:+})"
+
+
+class QuoteDiff:
+    """
+    The changes that turn the live orders into the wanted ladder.
+
+    Attributes:
+        keep (list[LiveOrder]): Live orders left as they are.
+        modify (list[tuple[LiveOrder, Quote]]): Live orders to modify, with what they become.
+        cancel (list[LiveOrder]): Live orders to cancel.
+        place (list[Quote]): New orders to place.
+    """
+
+    def __init__(self):
+        self.keep = []
+        self.modify = []
+        self.cancel = []
+        self.place = []
+
+    def __len__(self) -> int:
+        """Number of instructions the changes take."""
+        return len(self.modify) + len(self.cancel) + len(self.place)
+
+    def __str__(self):
+        return (f"Quotes: {len(self.keep)} kept, {len(self.modify)} modified, "
+                f"{len(self.cancel)} cancelled, {len(self.place)} placed")
+
+
+class QuoteReconciler:
+    """
+    Works out the smallest set of changes between a wanted ladder and the live orders.
+
+    Attributes:
+        price_tolerance (float): Largest offset difference for a live order to stand for a wanted quote.
+        size_tolerance (float): Largest size difference, as a fraction of the wanted size, for the same.
+        modify (bool): Whether live orders may be modified. Without it they are cancelled and replaced.
+    """
+
+    def __init__(self, price_tolerance: float = QUOTE_PRICE_TOLERANCE,
+                 size_tolerance: float = QUOTE_SIZE_TOLERANCE, modify: bool = True):
+        self.price_tolerance = price_tolerance
+        self.size_tolerance = size_tolerance
+        self.modify = modify
+
+    def matches(self, live: LiveOrder, quote: Quote) -> bool:
+        """Returns whether a live order is close enough to a wanted quote to be kept."""
+        return (live.pegged and live.side == quote.side
+                and abs(live.offset - quote.offset) <= self.price_tolerance + 1e-9
+                and abs(live.size - quote.size) <= self.size_tolerance * quote.size + 1e-9)
+
+    def reconcile(self, desired: list[Quote], live: list[LiveOrder]) -> QuoteDiff:
+        """
+        Works out the changes that turn `live` into `desired`.
+
+        Args:
+            desired (list[Quote]): The wanted ladder.
+            live (list[LiveOrder]): Our resting orders in the market.
+
+        Returns:
+            QuoteDiff: The changes.
+        """
+        diff = QuoteDiff()
+        for side in ('long', 'short'):
+            # Best first, so leftover quotes and orders pair up level by level
+            sign = -1 if side == 'long' else 1
+            wanted = sorted((q for q in desired if q.side == side), key=lambda q: sign * q.offset)
+            resting = sorted((o for o in live if o.side == side), key=lambda o: sign * o.offset)
+            # Orders are tracked by position: equal orders are still distinct orders
+            kept = set()
+            unmatched = []
+            for quote in wanted:
+                candidates = [i for i, o in enumerate(resting) if i not in kept and self.matches(o, quote)]
+                if candidates:
+                    best = min(candidates, key=lambda i: abs(resting[i].offset - quote.offset))
+                    kept.add(best)
+                    diff.keep.append(resting[best])
+                else:
+                    unmatched.append(quote)
+            # Orders still being placed have no id to modify or cancel: they are left to land
+            leftover = [i for i in range(len(resting)) if i not in kept and resting[i].order_id is not None]
+            modifiable = [i for i in leftover if resting[i].pegged] if self.modify else []
+            modified = set(modifiable[:len(unmatched)])
+            for i, quote in zip(modifiable, unmatched):
+                diff.modify.append((resting[i], quote))
+            diff.place.extend(unmatched[len(modifiable):])
+            diff.cancel.extend(resting[i] for i in leftover if i not in modified)
+        return diff
+
+
+def live_orders_from_book(book: 'OrderBook', user: str) -> list[LiveOrder]:
+    """
+    Returns our resting orders as seen in the DLOB.
+
+    Args:
+        book (OrderBook): The order book.
+        user (str): Our user account address.
+
+    Returns:
+        list[LiveOrder]: Our orders on both sides.
+    """
+    live = []
+    for side in ('long', 'short'):
+        book_side = book.side(side)
+        for position in book.user_positions(user, side).tolist():
+            live.append(LiveOrder(int(book_side.order_ids[position]), side, float(book_side.sizes[position]),
+                                  float(book_side.offsets[position]), bool(book_side.pegged[position])))
+    return live
+
+
+def live_orders_from_user(user, market_index: int) -> list[LiveOrder]:
+    """
+    Returns our open orders in one market from the user account.
+
+    Args:
+        user (User): The decoded user account.
+        market_index (int): The market.
+
+    Returns:
+        list[LiveOrder]: Our open orders, sized by what is left to fill.
+    """
+    live = []
+    for order in user.orders:
+        if 'Open' not in str(order.status) or order.market_index != market_index:
+            continue
+        side = 'long' if 'LONG' in str(order.direction).upper() else 'short'
+        size = (order.base_asset_amount - order.base_asset_amount_filled) / BASE_PRECISION
+        live.append(LiveOrder(order.order_id, side, size, order.oracle_price_offset / PRICE_PRECISION,
+                              order.price == 0))
+    return live
@@ -0,0 +1,229 @@
+"""Pooled RPC access over several endpoints.
+
+Spreads JSON-RPC calls over a list of endpoints instead of a single node, so
+one slow or rate limited node does not stall the trading loop. Every request
+is timed and each endpoint keeps an exponentially weighted moving average
+(EWMA) of its latency. Calls go to the fastest healthy endpoint. A read that
+has not been answered by the time that endpoint usually answers (a percentile
+of its recent latencies) is duplicated to the next fastest endpoint, and the
+first answer wins. Failing endpoints are benched for a cooldown.
+
+RPCPool implements the provider interface of solana.rpc.async_api.AsyncClient
+(make_request, is_connected, close), so it can replace an AsyncClient's provider.
+
+Classes:
+- RPCEndpoint: One RPC node and its latency statistics.
+- RPCPool: Latency-routed, hedged JSON-RPC requests over several endpoints.
+"""
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import Any
+
+import aiohttp
+import numpy as np
+
+import sys
+from pathlib import Path
+base_path = Path(__file__).resolve().parent
+sys.path.append(str(base_path.parent))
+from src import *
+
+WRITE_METHODS = frozenset({"sendTransaction", "requestAirdrop"})
+"""frozenset[str]: Methods with side effects, which fail over to the next endpoint but are never hedged."""
+
+
+class RPCEndpoint:
+    """
+    One RPC node and its latency statistics.
+
+    Attributes:
+        url (str): The HTTP endpoint.
+        ewma (Optional[float]): Moving average of the request latency in seconds, None before the first answer.
+        latencies (deque[float]): The most recent request latencies in seconds.
+        failures (int): Consecutive failed requests.
+        unhealthy_until (float): time.monotonic() until which the endpoint is benched.
+    """
+
+    WINDOW = 100
+    """int: Number of recent latencies kept for percentiles."""
+
+    def __init__(self, url: str, alpha: float = RPC_EWMA_ALPHA):
+        self.url = url
+        self.alpha = alpha
+        self.ewma = None
+        self.latencies = deque(maxlen=self.WINDOW)
+        self.failures = 0
+        self.unhealthy_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        """bool: Whether the endpoint is not benched."""
+        return time.monotonic() >= self.unhealthy_until
+
+    def record(self, latency: float):
+        """Records the latency of an answered (or abandoned) request."""
+        self.latencies.append(latency)
+        self.ewma = latency if self.ewma is None else self.alpha * latency + (1 - self.alpha) * self.ewma
+
+    def succeed(self, latency: float):
+        """Records an answered request."""
+        self.record(latency)
+        self.failures = 0
+
+    def fail(self, cooldown: float, max_failures: int):
+        """Records a failed request and benches the endpoint after `max_failures` in a row."""
+        self.failures += 1
+        if self.failures >= max_failures:
+            self.unhealthy_until = time.monotonic() + cooldown
+
+    def hedge_delay(self, percentile: float, default: float) -> float:
+        """
+        Returns how long to wait for this endpoint before hedging a read.
+
+        Args:
+            percentile (float): Percentile of the recent latencies, from 0 to 100.
+            default (float): Delay used until enough latencies are recorded.
+
+        Returns:
+            float: Seconds.
+        """
+        if len(self.latencies) < 10:
+            return default
+        return float(np.percentile(self.latencies, percentile))
+
+    def __str__(self):
+        ewma = f"{self.ewma * 1000:.0f}ms" if self.ewma is not None else "-"
+        return f"{self.url} (ewma {ewma}, {'healthy' if self.healthy else 'benched'})"
+
+
+class RPCPool:
+    """
+    Latency-routed, hedged JSON-RPC requests over several endpoints.
+
+    Attributes:
+        endpoints (list[RPCEndpoint]): The pooled endpoints, in configuration order.
+        hedge_percentile (float): Latency percentile of the serving endpoint after which a read is duplicated.
+        hedge_delay (float): Hedge delay used until an endpoint has enough latency samples.
+        timeout (float): Seconds before a single request is abandoned.
+        cooldown (float): Seconds a failing endpoint is benched.
+        max_failures (int): Consecutive failures that bench an endpoint.
+    """
+
+    def __init__(self, urls: list[str], hedge_percentile: float = RPC_HEDGE_PERCENTILE,
+                 hedge_delay: float = RPC_HEDGE_DELAY, timeout: float = RPC_TIMEOUT,
+                 cooldown: float = RPC_COOLDOWN, max_failures: int = RPC_MAX_FAILURES,
+                 alpha: float = RPC_EWMA_ALPHA):
+        if not urls:
+            raise Exception("APICallError: RPCPool needs at least one endpoint")
+        self.endpoints = [RPCEndpoint(url, alpha) for url in urls]
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay = hedge_delay
+        self.timeout = timeout
+        self.cooldown = cooldown
+        self.max_failures = max_failures
+        self._ids = itertools.count(1)
+        self._session = None
+
+    @property
+    def endpoint_uri(self) -> str:
+        """str: URL of the endpoint currently preferred."""
+        return self.ranked()[0].url
+
+    def ranked(self) -> list[RPCEndpoint]:
+        """
+        Returns the endpoints in the order requests try them: healthy before
+        benched, then fastest first. Endpoints not yet measured come first so
+        every endpoint gets a latency estimate.
+
+        Returns:
+            list[RPCEndpoint]: Every endpoint.
+        """
+        return sorted(self.endpoints, key=lambda e: (not e.healthy, e.ewma is not None, e.ewma or 0.0))
+
+    async def make_request(self, method: str, *params: Any) -> dict:
+        """
+        Sends a JSON-RPC request. Reads are hedged, writes only fail over.
+
+        Args:
+            method (str): The RPC method.
+            *params (Any): Its JSON serializable parameters.
+
+        Returns:
+            dict: The JSON-RPC response of the first endpoint to answer.
+
+        Raises:
+            Exception: If every endpoint failed.
+        """
+        ranked = self.ranked()
+        hedged = method not in WRITE_METHODS
+        pending = {asyncio.ensure_future(self._request(ranked[0], method, params))}
+        delay = ranked[0].hedge_delay(self.hedge_percentile, self.hedge_delay) if hedged else None
+        candidates = ranked[1:]
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=delay if candidates else None,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                failed = False
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                    failed = True
+                if candidates and (failed or not done):
+                    # A request failed, or nothing answered within the hedge delay: ask the next endpoint too
+                    endpoint = candidates.pop(0)
+                    pending.add(asyncio.ensure_future(self._request(endpoint, method, params)))
+                    if hedged:
+                        delay = endpoint.hedge_delay(self.hedge_percentile, self.hedge_delay)
+        finally:
+            for task in pending:
+                task.cancel()
+            # Let the losers record their latency before returning
+            await asyncio.gather(*pending, return_exceptions=True)
+        raise Exception(f"APICallError: {method} failed on every RPC endpoint: {error!r}")
+
+    async def _request(self, endpoint: RPCEndpoint, method: str, params: tuple) -> dict:
+        """Sends one request to one endpoint and records how it went."""
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        body = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": list(params)}
+        start = time.monotonic()
+        try:
+            async with self._session.post(endpoint.url, json=body) as response:
+                response.raise_for_status()
+                result = await response.json(content_type=None)
+        except asyncio.CancelledError:
+            # Lost the race to a hedged request: its latency is at least this long
+            endpoint.record(time.monotonic() - start)
+            raise
+        except Exception:
+            endpoint.fail(self.cooldown, self.max_failures)
+            raise
+        endpoint.succeed(time.monotonic() - start)
+        return result
+
+    async def is_connected(self) -> bool:
+        """Returns whether any endpoint answers getHealth."""
+        try:
+            response = await self.make_request("getHealth")
+        except Exception:
+            return False
+        return response.get("result") == "ok"
+
+    async def close(self):
+        """Closes the HTTP session."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> "RPCPool":
+        return self
+
+    async def __aexit__(self, _exc_type, _exc, _tb):
+        await self.close()
+
+    def __str__(self):
+        return "RPC pool:\n" + "\n".join(f"  {endpoint}" for endpoint in self.ranked())
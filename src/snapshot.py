@@ -0,0 +1,114 @@
+"""Slot-consistent market snapshots.
+
+The DLOB, user and market data of a cycle come from different sources
+(sidecar, websocket cache, RPC) that can each lag behind the chain. Every
+fetch is stamped with the slot it reflects and the time.monotonic() it was
+received at; the assembler lines the three up and decides whether the cycle
+may trade normally, should trade defensively, or must be skipped.
+
+Classes:
+- MarketSnapshot: The datasets of one cycle with their slot skew, age and status.
+- SnapshotAssembler: Builds a MarketSnapshot and checks it against the configured limits.
+"""
+import time
+from typing import Any, Optional
+
+import sys
+from pathlib import Path
+base_path = Path(__file__).resolve().parent
+sys.path.append(str(base_path.parent))
+from src import *
+
+SNAPSHOT_OK = 'ok'
+SNAPSHOT_DEGRADED = 'degraded'
+SNAPSHOT_STALE = 'stale'
+
+
+class MarketSnapshot:
+    """
+    The DLOB, user and market data of one cycle.
+
+    Attributes:
+        dlob_data (Any): The DLOB, in the form returned by main.fetch_dlob.
+        user_data (dict): The user data from DriftClient.fetch_chu_data.
+        market_data (dict): The market data from DriftClient.fetch_chu_data.
+        slots (dict[str, Optional[int]]): Slot of each dataset, None if the source does not report one.
+        received_at (dict[str, float]): time.monotonic() each dataset was received at.
+        slot_skew (int): Difference between the newest and oldest known slots.
+        age (float): Seconds since the oldest dataset was received, when assembled.
+        status (str): 'ok', 'degraded' or 'stale'.
+        reason (str): Why the snapshot is not 'ok', empty otherwise.
+    """
+
+    def __init__(self, dlob_data: Any, user_data: dict, market_data: dict,
+                 slots: dict, received_at: dict, now: float):
+        self.dlob_data = dlob_data
+        self.user_data = user_data
+        self.market_data = market_data
+        self.slots = slots
+        self.received_at = received_at
+        known = [slot for slot in slots.values() if slot]
+        self.slot_skew = max(known) - min(known) if known else 0
+        self.age = now - min(received_at.values())
+        self.status = SNAPSHOT_OK
+        self.reason = ''
+
+    @property
+    def tradeable(self) -> bool:
+        """bool: Whether the cycle may place orders."""
+        return self.status != SNAPSHOT_STALE
+
+    def __str__(self) -> str:
+        slots = ", ".join(f"{name} {slot}" for name, slot in self.slots.items())
+        return f"Snapshot {self.status}: slots {slots}, skew {self.slot_skew}, age {self.age:.1f}s {self.reason}".rstrip()
+
+
+class SnapshotAssembler:
+    """
+    Lines up the datasets of a cycle and grades them against skew and age limits.
+
+    Attributes:
+        degrade_slot_skew (int): Slot skew above which the snapshot is degraded.
+        max_slot_skew (int): Slot skew above which the snapshot is stale.
+        degrade_age (float): Age in seconds above which the snapshot is degraded.
+        max_age (float): Age in seconds above which the snapshot is stale.
+    """
+
+    def __init__(self, degrade_slot_skew: int = SNAPSHOT_DEGRADE_SLOT_SKEW, max_slot_skew: int = SNAPSHOT_MAX_SLOT_SKEW,
+                 degrade_age: float = SNAPSHOT_DEGRADE_AGE, max_age: float = SNAPSHOT_MAX_AGE):
+        self.degrade_slot_skew = degrade_slot_skew
+        self.max_slot_skew = max_slot_skew
+        self.degrade_age = degrade_age
+        self.max_age = max_age
+
+    def assemble(self, dlob_data: Any, dlob_slot: Optional[int], dlob_received_at: float,
+                 user_data: dict, market_data: dict, now: float = None) -> MarketSnapshot:
+        """
+        Builds the snapshot of a cycle and sets its status.
+
+        Args:
+            dlob_data (Any): The DLOB.
+            dlob_slot (Optional[int]): Slot of the DLOB, None if unknown (JSON snapshots).
+            dlob_received_at (float): time.monotonic() the DLOB was received at.
+            user_data (dict): User data, with 'slot' and 'received_at' set by fetch_chu_data.
+            market_data (dict): Market data, with 'slot' and 'received_at' set by fetch_chu_data.
+            now (float, optional): Current time.monotonic(). Defaults to now.
+
+        Returns:
+            MarketSnapshot: The snapshot, with status 'ok', 'degraded' or 'stale'.
+        """
+        if now is None:
+            now = time.monotonic()
+        slots = {'dlob': dlob_slot, 'user': user_data.get('slot'), 'market': market_data.get('slot')}
+        received_at = {'dlob': dlob_received_at, 'user': user_data.get('received_at', now),
+                       'market': market_data.get('received_at', now)}
+        snapshot = MarketSnapshot(dlob_data, user_data, market_data, slots, received_at, now)
+        if snapshot.slot_skew > self.max_slot_skew:
+            snapshot.status, snapshot.reason = SNAPSHOT_STALE, f"(slot skew above {self.max_slot_skew})"
+        elif snapshot.age > self.max_age:
+            snapshot.status, snapshot.reason = SNAPSHOT_STALE, f"(older than {self.max_age}s)"
+        elif snapshot.slot_skew > self.degrade_slot_skew:
+            snapshot.status, snapshot.reason = SNAPSHOT_DEGRADED, f"(slot skew above {self.degrade_slot_skew})"
+        elif snapshot.age > self.degrade_age:
+            snapshot.status, snapshot.reason = SNAPSHOT_DEGRADED, f"(older than {self.degrade_age}s)"
+        return snapshot
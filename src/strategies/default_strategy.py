@@ -10,6 +10,12 @@ sys.path.append(str(base_path.parent))
 # Import the constants module from the 'src' directory
 from src import *
 from driftclient import Orders, MMOrder, DriftClient
+from market_registry import MARKETS
+from quote_reconciler import live_orders_from_book
+from tx_packer import BatchResult
+from confirmation_tracker import ConfirmationTracker
+from order_manager import OrderManager
+from tx_pipeline import TransactionPipeline
 from driftpy.types import *
 from driftpy.constants.numeric_constants import BASE_PRECISION,PRICE_PRECISION, QUOTE_PRECISION,PEG_PRECISION, FUNDING_RATE_PRECISION
 
@@ -23,6 +29,8 @@ AGGRESSION  = 0.001
 MAX_ORDERS = 3
 AGG_SKEW = [0.8, 1.01]
 TARGET_SKEW = 0.1
+# Aggression multiplier when the market snapshot is degraded (quote wider on lagging data)
+DEGRADED_AGGRESSION = 2.0
 # BASE DERISK/UPRISK THRESHOLDS (% OF LIMIT)
 DERISK_TARGET = 0.8
 DERISK_LEVERAGE = 0.8
@@ -42,6 +50,8 @@ class DefaultStrategy():
         drift_acct(DriftClient): A DriftClient Object for interacting with the driftpy client for posting trades.
         accaddress(str): User account public address.
         custom_signals(Any): Any custom signal parameters for optional extendible market making data.
+        tracker(ConfirmationTracker): Orders submitted and not confirmed yet, if submission is asynchronous.
+        oms(OrderManager): Our orders and their state, if they are tracked locally.
 
     Attributes:
         dlob_data (list[dict]): A dictionary containing the Decentralized Limit Order Book (DLOB) data.
@@ -50,6 +60,10 @@ class DefaultStrategy():
         drift_acct(DriftClient): A DriftClient object for interacting with the Drift API.
         custom_signals(Any): Any custom signal parameters for optional extendible market making data.
         strat_complexity (int): The complexity of the strategy.
+        tracker (ConfirmationTracker): Orders submitted and not confirmed yet, None if submission is awaited.
+        oms (OrderManager): Our orders and their state, None if they are read from the DLOB.
+        batch_results (list[BatchResult]): The transactions the last orders were sent in.
+        failed_batches (list[BatchResult]): Those that failed.
 
     Methods:
         open_quantity_orders: Get user's long and short position sizes.
@@ -60,6 +74,7 @@ class DefaultStrategy():
         calculate_ordersize: Calculate the order size.
         calculate_order_params: Calculate the order parameters.
         post_orders: Post orders on the market.
+        report_batches: Record the outcome of each transaction the orders were sent in.
         emergency_market_order_condition: Check if an emergency market order condition is met.
     """
 
@@ -71,6 +86,9 @@ class DefaultStrategy():
     drift_acct: DriftClient,
     accaddress: str,
     custom_signals: Any = None,
+    tracker: ConfirmationTracker = None,
+    oms: OrderManager = None,
+    pipeline: TransactionPipeline = None,
     ):
         """Initializes a new instance of DefaultStrategy with the given parameters.
         
@@ -81,10 +99,16 @@ class DefaultStrategy():
             drift_acct (DriftClient): A DriftClient object for interacting with the driftpy client for posting trades.
             accaddress (str): User account public address.
             custom_signals (Any): Any custom signal parameters for optional extendible market making data.
+            tracker (ConfirmationTracker): Orders submitted and not confirmed yet, if submission is asynchronous.
+            oms (OrderManager): Our orders and their state, if they are tracked locally.
+            pipeline (TransactionPipeline): Sends the orders with cached templates and blockhash, if enabled.
         """
 
         self.drift_acct = drift_acct
         self.custom_signals = custom_signals
+        self.tracker = tracker
+        self.oms = oms
+        self.pipeline = pipeline
         self.strat_complexity: int = 1
 
         # RISK VARS
@@ -99,8 +123,12 @@ class DefaultStrategy():
         self.target_skew = TARGET_SKEW
         self.target_skew = TARGET_SKEW
         self.max_orders = MAX_ORDERS
+        self.snapshot_status = market_data.get('snapshot_status', 'ok')
+        if self.snapshot_status == 'degraded':
+            self.agg *= DEGRADED_AGGRESSION
 
         # MARKET VARS
+        self.market = MARKETS[MARKET_NAME]
         self.oracle_price = market_data['oracle_price']
         self.best_bid = dlob_data['best_bid']
         self.best_ask = dlob_data['best_ask']
@@ -108,8 +136,9 @@ class DefaultStrategy():
             self.mark_price = (dlob_data['best_bid'] + dlob_data['best_ask'])/2
         except:
             self.mark_price = market_data['oracle_price']
-        self.long_orders = dlob_data['long_orders']
-        self.short_orders = dlob_data['short_orders']
+        self.order_book = dlob_data
+        # Cached per book: microprice, imbalance, depth near the oracle, VWAP
+        self.analytics = dlob_data.analytics
 
         # USER VARS
         self.active_position = user_data['user_position']
@@ -135,6 +164,11 @@ class DefaultStrategy():
             self.open_bids_sum = 0
             self.open_asks_sum = 0
             self.realized_pnl = 0
+        if self.oms is not None:
+            # Orders rest without a position too
+            self.open_bids, self.open_asks = self.oms.open_counts()
+        self.batch_results = []
+        self.failed_batches = []
 
     def __str__(self) -> str:
         """
@@ -151,6 +185,7 @@ class DefaultStrategy():
             f"Max Leverage:                {self.levcap}\n"
             f"Max Target Size:             {self.targetcap} USD\n"
             f"Aggression:                  {self.agg*100:.2f} %\n"
+            f"Snapshot Status:             {self.snapshot_status}\n"
             f"Funding Rate:                {self.funding_rate*100:.2f} %\n"
             f"Derisk Factor:               {self.derisk}\n"
             f"Uprisk Factor:               {self.uprisk}\n"
@@ -175,26 +210,24 @@ class DefaultStrategy():
             f"Market Conditions:\n"
             f"Oracle Price:                {self.oracle_price:.2f} USD\n"
             f"DLOB Mark Price:             {self.mark_price:.2f} USD\n"
+            f"DLOB Microprice:             {self.analytics.microprice() or float('nan'):.2f} USD\n"
+            f"Top 5 Level Imbalance:       {self.analytics.imbalance(5):.2f}\n"
             f"{console_line(False)}"
         )
 
     def open_quantity_orders(self) -> list[float]:
-        """Get user's long and short open order sizes
+        """Get user's long and short open order counts from the order manager,
+        or the book's L3 index without one
         
         Returns:
-            list[float]: Long and short open order sizes
+            list[float]: Long and short open order counts
         """
+        if self.oms is not None:
+            return self.oms.open_counts()
         if self.active_position == False:
             return [0,0]
         else:
-            user_order_quantity = [0,0]
-            for order in self.long_orders:
-                if self.address == order["user"]:
-                    user_order_quantity[0] += 1
-            for order in self.short_orders:
-                if self.address == order["user"]:
-                    user_order_quantity[1] += 1
-            return user_order_quantity  
+            return list(self.order_book.open_orders(self.address))
 
     def calculate_risk(self) -> float:
         """Calculate current position's risk level based on risk management parameters
@@ -276,9 +309,12 @@ class DefaultStrategy():
                 aggression_factor = [self.agg, self.agg * (1.0 + self.risk)*2]
         return aggression_factor   
 
-    def calculate_ordersize(self) -> list[float,float]:
+    def calculate_ordersize(self, net_open_orders: bool = True) -> list[float,float]:
         """Calculate bid and ask order sizes factoring in skew
         and converting Target size in USD to asset size
+
+        Args:
+            net_open_orders (bool): Subtract the size of our open orders, which stay on the book.
         
         Returns:
             list[float, float]: Sizes for long and short orders.
@@ -289,21 +325,30 @@ class DefaultStrategy():
         # Convert target cap from USD to asset quantity
         target_cap_asset = float(self.targetcap)/self.oracle_price        
         skew = self.calculate_skew_factor() 
+        open_bids_sum = self.open_bids_sum if net_open_orders else 0
+        open_asks_sum = self.open_asks_sum if net_open_orders else 0
 
-        base_target_long = (target_cap_asset - self.open_bids_sum -
+        base_target_long = (target_cap_asset - open_bids_sum -
             self.user_position)*(1.0 + skew * self.target_skew)
-        base_target_short = (target_cap_asset + self.open_asks_sum + 
+        base_target_short = (target_cap_asset + open_asks_sum + 
             self.user_position)*(1.0 - skew * self.target_skew)
         return [base_target_long, base_target_short]
 
-    def calculate_order_params(self, bids: int = 0, asks: int = 0) -> list[list[float]]:
+    def calculate_order_params(self, bids: int = 0, asks: int = 0, full_ladder: bool = False) -> list[list[float]]:
         """Calculate order sizes, quantity and offset.
             Spacing between the orders and sizes use quadratic spacing.
+
+        Args:
+            bids (int): Minimum number of bids.
+            asks (int): Minimum number of asks.
+            full_ladder (bool): Size the whole ladder of max_orders per side, as if no order was open.
         
         Returns:
             list[list[float]]: Order sizes and offsets for bid and ask orders.
         """        
         bid_agg, ask_agg = self.calculate_aggression_factor()
+        if full_ladder:
+            bids, asks = self.max_orders, self.max_orders
         bidnum = max(bids,self.max_orders - self.open_bids)
         asknum = max(asks,self.max_orders - self.open_asks)
         bid_sizes = []
@@ -315,7 +360,7 @@ class DefaultStrategy():
         bid_divider = 1
         ask_divider = 1
         counter = 1
-        base_target_long, base_target_short = self.calculate_ordersize()
+        base_target_long, base_target_short = self.calculate_ordersize(net_open_orders=not full_ladder)
         denominator = 0
         for i in range(1, bidnum+1):
             denominator += i        
@@ -343,8 +388,14 @@ class DefaultStrategy():
         Returns:
             Orders: An instance of the Orders class representing the orders to be placed.
         """        
+        if USE_QUOTE_RECONCILIATION:
+            return self.reconcile_orders()
+        if self.tracker is not None and self.tracker.in_flight:
+            # The book does not show the orders in flight yet: adding to it would double them
+            print("Orders still in flight, waiting for confirmation.")
+            return None
         buy_order_params, sell_order_params = self.calculate_order_params()
-        orders = Orders(self.drift_acct, self.oracle_price)
+        orders = Orders(self.drift_acct, self.oracle_price, self.pipeline)
 
         # Handle accidental case where max orders made:
         if self.open_bids > self.max_orders or self.open_asks > self.max_orders:
@@ -375,18 +426,52 @@ class DefaultStrategy():
                 else:
                     pass
             """
-            ix = await self.drift_acct.get_cancel_orders_ix()
+            ix = await orders.get_cancel_orders_ix()
             orders.ixs.append(ix)
             #Cancel and recalculate positions
             buy_order_params, sell_order_params = self.calculate_order_params(3,3)
 
         print(f"Number of long Orders: = {len(buy_order_params[0])},Number of Short Orders: = {len(sell_order_params[0])}")
+        self.add_ladder(orders, buy_order_params, sell_order_params)
+        return orders
+
+    def reconcile_orders(self) -> Orders:
+        """Build the whole wanted ladder and diff it against our orders resting
+        in the book, so only the orders that changed are cancelled, modified
+        or placed: unchanged orders keep their queue priority.
+
+        Returns:
+            Orders: The ladder with its changes, None if nothing changed.
+        """
+        buy_order_params, sell_order_params = self.calculate_order_params(full_ladder=True)
+        orders = Orders(self.drift_acct, self.oracle_price, self.pipeline)
+        self.add_ladder(orders, buy_order_params, sell_order_params)
+        if self.oms is not None:
+            # Exact per-order state, pending orders and requested cancels included
+            live_orders = self.oms.live_orders()
+        else:
+            live_orders = live_orders_from_book(self.order_book, self.address)
+        if self.oms is None and self.tracker is not None:
+            # Count the orders in flight as if they had landed
+            live_orders = self.tracker.overlay(live_orders)
+        diff = orders.reconcile(live_orders)
+        print(diff)
+        return orders if len(diff) > 0 else None
+
+    def add_ladder(self, orders: Orders, buy_order_params: list[list[float]], sell_order_params: list[list[float]]):
+        """Add the bid and ask orders of calculate_order_params to orders.
+
+        Args:
+            orders (Orders): The orders to add to.
+            buy_order_params (list[list[float]]): Bid sizes and offsets.
+            sell_order_params (list[list[float]]): Ask sizes and offsets.
+        """
         """Order class initialized with instance of ClearingHouse"""
         for i in range(len(buy_order_params[0])):
             base_amt = buy_order_params[0][i]
             offset = buy_order_params[1][i]
-            if base_amt < 0.1:
-                base_amt = 0.1
+            if base_amt < self.market.min_order_size:
+                base_amt = self.market.min_order_size
                 offset = buy_order_params[1][i]
                 continue
             order = MMOrder(direction=PositionDirection.LONG(),
@@ -396,15 +481,26 @@ class DefaultStrategy():
         for i in range(len(sell_order_params[0])):
             base_amt = sell_order_params[0][i]
             offset = sell_order_params[1][i]
-            if base_amt < 0.1:
-                base_amt = 0.1
+            if base_amt < self.market.min_order_size:
+                base_amt = self.market.min_order_size
                 offset = sell_order_params[1][i]
             order = MMOrder(direction=PositionDirection.SHORT(),
             order_size=base_amt, oracle_price_offset = offset
             )
             orders.add_order(order)
-        return orders
         
+    def report_batches(self, results: list[BatchResult]):
+        """Record the outcome of each transaction the orders were sent in.
+
+        Args:
+            results (list[BatchResult]): One result per transaction, from Orders.send_orders.
+        """
+        self.batch_results = results
+        self.failed_batches = [result for result in results if not result.ok]
+        print(f"Transactions sent: {len(results) - len(self.failed_batches)}/{len(results)}")
+        for result in self.failed_batches:
+            print(f"Transaction of {len(result.ixs)} instructions failed: {result.error}")
+
     async def emergency_market_order_condition(self) -> bool:
         """Check if an emergency market order condition is met.
         
@@ -0,0 +1,253 @@
+import unittest
+import asyncio
+import base64
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import websockets
+
+import src.account_subscriber as account_subscriber
+from src.account_subscriber import AccountSubscriber, BatchAccountLoader, websocket_url
+
+# Notifications recorded from accountSubscribe, with the account data replaced by short payloads
+RECORDED_NOTIFICATIONS = [
+    {"jsonrpc": "2.0", "method": "accountNotification", "params": {"result": {
+        "context": {"slot": 101}, "value": {"data": [base64.b64encode(b"perp-0-v2").decode(), "base64"],
+        "executable": False, "lamports": 1, "owner": "drift", "rentEpoch": 0}}, "subscription": 1000}},
+    {"jsonrpc": "2.0", "method": "accountNotification", "params": {"result": {
+        "context": {"slot": 102}, "value": {"data": [base64.b64encode(b"user-v2").decode(), "base64"],
+        "executable": False, "lamports": 1, "owner": "drift", "rentEpoch": 0}}, "subscription": 1001}},
+    {"jsonrpc": "2.0", "method": "accountNotification", "params": {"result": {
+        "context": {"slot": 103}, "value": {"data": [base64.b64encode(b"oracle-0-v2").decode(), "base64"],
+        "executable": False, "lamports": 1, "owner": "pyth", "rentEpoch": 0}}, "subscription": 1002}},
+    # Older than the perp market update above: must be ignored
+    {"jsonrpc": "2.0", "method": "accountNotification", "params": {"result": {
+        "context": {"slot": 100}, "value": {"data": [base64.b64encode(b"perp-0-v1").decode(), "base64"],
+        "executable": False, "lamports": 1, "owner": "drift", "rentEpoch": 0}}, "subscription": 1000}},
+]
+
+# Which recorded subscription id the stand-in assigns to each account
+SUBSCRIPTION_IDS = {"perp-0": 1000, "user": 1001, "oracle-0": 1002}
+
+
+class ReplayServer:
+    """Local websocket stand-in: confirms every accountSubscribe, then replays the recorded notifications."""
+
+    def __init__(self, notifications, expected_subscriptions):
+        self.notifications = notifications
+        self.expected_subscriptions = expected_subscriptions
+        self.subscribed = []
+        self.next_id = 2000
+
+    async def handler(self, ws, *args):
+        for _ in range(self.expected_subscriptions):
+            request = json.loads(await ws.recv())
+            pubkey = request["params"][0]
+            self.subscribed.append(pubkey)
+            subscription = SUBSCRIPTION_IDS.get(pubkey, self.next_id)
+            self.next_id += 1
+            await ws.send(json.dumps({"jsonrpc": "2.0", "result": subscription, "id": request["id"]}))
+        for notification in self.notifications:
+            await ws.send(json.dumps(notification))
+        await ws.wait_closed()
+
+
+def make_chu():
+    chu = MagicMock()
+    chu.authority = "authority"
+    chu.subaccount_id = 0
+
+    async def set_cache(CACHE=None):
+        chu.CACHE = CACHE if CACHE is not None else {
+            "state": "state-v1",
+            "spot_markets": [MagicMock(oracle="quote-oracle")],
+            "spot_market_oracles": ["quote-oracle-data"],
+            "perp_markets": [MagicMock(amm=MagicMock(oracle="oracle-0"))],
+            "perp_market_oracles": ["oracle-0-v1"],
+            "user": "user-v1",
+        }
+    chu.set_cache = set_cache
+
+    async def get_slot(commitment=None):
+        return {"jsonrpc": "2.0", "result": 99, "id": 1}
+    chu.program.provider.connection.get_slot = get_slot
+    chu.program.coder.accounts.decode = lambda data: data.decode()
+    return chu
+
+
+@patch.object(account_subscriber, 'decode_oracle_data',
+              lambda address, value, slot: base64.b64decode(value["data"][0]).decode())
+@patch.object(account_subscriber, 'get_state_public_key', lambda program_id: "state")
+@patch.object(account_subscriber, 'get_user_account_public_key', lambda program_id, authority, subaccount_id: "user")
+@patch.object(account_subscriber, 'get_spot_market_public_key', lambda program_id, i: f"spot-{i}")
+@patch.object(account_subscriber, 'get_perp_market_public_key', lambda program_id, i: f"perp-{i}")
+class TestAccountSubscriber(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.replay = ReplayServer(RECORDED_NOTIFICATIONS, expected_subscriptions=5)
+        self.server = await websockets.serve(self.replay.handler, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.chu = make_chu()
+        self.subscriber = AccountSubscriber(self.chu, url=f"ws://127.0.0.1:{port}", timeout=5)
+
+    async def asyncTearDown(self):
+        await self.subscriber.unsubscribe()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def wait_for_slot(self, pubkey, slot):
+        for _ in range(100):
+            if self.subscriber.slots.get(pubkey, 0) >= slot:
+                return
+            await asyncio.sleep(0.01)
+        self.fail(f"{pubkey} did not reach slot {slot}")
+
+    async def test_subscribes_to_every_cached_account(self):
+        await self.subscriber.subscribe()
+        # The quote spot market oracle is constant and is not subscribed
+        self.assertCountEqual(self.replay.subscribed, ["state", "user", "spot-0", "perp-0", "oracle-0"])
+
+    async def test_notifications_update_cache_in_place(self):
+        await self.subscriber.subscribe()
+        await self.wait_for_slot("oracle-0", 103)
+        cache = self.subscriber.cache
+        self.assertEqual(cache["perp_markets"][0], "perp-0-v2")
+        self.assertEqual(cache["user"], "user-v2")
+        self.assertEqual(cache["perp_market_oracles"][0], "oracle-0-v2")
+        self.assertEqual(cache["state"], "state-v1")
+
+    async def test_stale_notification_is_ignored(self):
+        await self.subscriber.subscribe()
+        await self.wait_for_slot("oracle-0", 103)
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.subscriber.cache["perp_markets"][0], "perp-0-v2")
+        self.assertEqual(self.subscriber.slots["perp-0"], 101)
+        self.assertEqual(self.subscriber.slot, 103)
+
+    async def test_reconnect_refreshes_and_drops_older_notifications(self):
+        connections = []
+
+        async def drop_first_connection(ws, *args):
+            connections.append(ws)
+            for _ in range(5):
+                request = json.loads(await ws.recv())
+                subscription = SUBSCRIPTION_IDS.get(request["params"][0], 2000 + request["id"])
+                await ws.send(json.dumps({"jsonrpc": "2.0", "result": subscription, "id": request["id"]}))
+            if len(connections) == 1:
+                return
+            # Queued while refreshing at slot 150: the user update is older than the snapshot
+            for subscription, slot, data in [(1001, 120, b"user-v0"), (1000, 160, b"perp-0-v3")]:
+                await ws.send(json.dumps({"jsonrpc": "2.0", "method": "accountNotification", "params": {
+                    "result": {"context": {"slot": slot}, "value": account_value(data)},
+                    "subscription": subscription}}))
+            await ws.wait_closed()
+        server = await websockets.serve(drop_first_connection, "127.0.0.1", 0)
+        self.addAsyncCleanup(server.wait_closed)
+        self.addCleanup(server.close)
+        subscriber = AccountSubscriber(self.chu, url=f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}",
+                                       timeout=5, reconnect_delay=0)
+        self.addAsyncCleanup(subscriber.unsubscribe)
+        refreshes = []
+        refresh = subscriber.refresh
+
+        async def record_refresh():
+            refreshes.append(subscriber.subscribed.is_set())
+            slot = 99 if len(refreshes) == 1 else 150
+            self.chu.program.provider.connection.get_slot = AsyncMock(return_value={"result": slot})
+            await refresh()
+        subscriber.refresh = record_refresh
+        await subscriber.subscribe()
+        for _ in range(100):
+            if subscriber.slots.get("perp-0", 0) >= 160:
+                break
+            await asyncio.sleep(0.01)
+        # Not subscribed while reconnecting, and the snapshot is not rolled back
+        self.assertEqual(refreshes, [False, False])
+        self.assertTrue(subscriber.subscribed.is_set())
+        self.assertEqual(subscriber.cache["perp_markets"][0], "perp-0-v3")
+        self.assertEqual(subscriber.cache["user"], "user-v1")
+        self.assertEqual(subscriber.slots["user"], 150)
+
+    async def test_subscribe_is_idempotent(self):
+        await self.subscriber.subscribe()
+        task = self.subscriber.task
+        await self.subscriber.subscribe()
+        self.assertIs(self.subscriber.task, task)
+
+
+def account_value(data):
+    return {"data": [base64.b64encode(data).decode(), "base64"], "executable": False,
+            "lamports": 1, "owner": "drift", "rentEpoch": 0}
+
+
+@patch.object(account_subscriber, 'decode_oracle_data',
+              lambda address, value, slot: base64.b64decode(value["data"][0]).decode())
+@patch.object(account_subscriber, 'get_state_public_key', lambda program_id: "state")
+@patch.object(account_subscriber, 'get_user_account_public_key', lambda program_id, authority, subaccount_id: "user")
+@patch.object(account_subscriber, 'get_spot_market_public_key', lambda program_id, i: f"spot-{i}")
+@patch.object(account_subscriber, 'get_perp_market_public_key', lambda program_id, i: f"perp-{i}")
+class TestBatchAccountLoader(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.chu = make_chu()
+        self.requests = []
+
+        async def make_request(method, pubkeys, config):
+            self.requests.append((method, list(pubkeys)))
+            return {"jsonrpc": "2.0", "id": 1, "result": {"context": {"slot": 120}, "value": [
+                None if pubkey == "state" else account_value(f"{pubkey}-v2".encode()) for pubkey in pubkeys]}}
+        self.chu.program.provider.connection._provider.make_request = make_request
+        self.loader = BatchAccountLoader(self.chu)
+
+    async def test_first_load_sets_cache(self):
+        self.assertEqual(await self.loader.load(), 99)
+        self.assertEqual(self.requests, [])
+        self.assertEqual(self.loader.accounts["oracle-0"], [("perp_market_oracles", 0)])
+
+    async def test_later_loads_use_one_request(self):
+        await self.loader.load()
+        first_market = self.loader.cache["perp_markets"][0]
+        self.assertEqual(await self.loader.load(), 120)
+        self.assertEqual(len(self.requests), 1)
+        method, pubkeys = self.requests[0]
+        self.assertEqual(method, "getMultipleAccounts")
+        self.assertCountEqual(pubkeys, ["state", "user", "spot-0", "perp-0", "oracle-0"])
+        cache = self.loader.cache
+        self.assertEqual(cache["user"], "user-v2")
+        self.assertEqual(cache["perp_markets"][0], "perp-0-v2")
+        self.assertEqual(cache["perp_market_oracles"][0], "oracle-0-v2")
+        # Missing accounts keep their last value, and the previous cache is left untouched
+        self.assertEqual(cache["state"], "state-v1")
+        self.assertIs(self.chu.CACHE["perp_markets"][0], first_market)
+
+    async def test_shared_oracle_updates_both_markets(self):
+        set_cache = self.chu.set_cache
+
+        async def set_cache_with_shared_oracle():
+            await set_cache()
+            # A spot market priced by the same oracle as perp market 0, as SOL and BTC are
+            self.chu.CACHE["spot_markets"].append(MagicMock(oracle="oracle-0"))
+            self.chu.CACHE["spot_market_oracles"].append("oracle-0-v1")
+        self.chu.set_cache = set_cache_with_shared_oracle
+        await self.loader.load()
+        self.assertEqual(self.loader.accounts["oracle-0"], [("spot_market_oracles", 1), ("perp_market_oracles", 0)])
+        await self.loader.load()
+        cache = self.loader.cache
+        self.assertEqual(cache["spot_market_oracles"][1], "oracle-0-v2")
+        self.assertIs(cache["spot_market_oracles"][1], cache["perp_market_oracles"][0])
+        self.assertEqual(self.requests[0][1].count("oracle-0"), 1)
+
+    async def test_unchanged_accounts_keep_their_object(self):
+        await self.loader.load()
+        await self.loader.load()
+        user = self.loader.cache["user"]
+        await self.loader.load()
+        self.assertIs(self.loader.cache["user"], user)
+
+
+class TestWebsocketUrl(unittest.TestCase):
+    def test_websocket_url(self):
+        self.assertEqual(websocket_url("https://api.devnet.solana.com"), "wss://api.devnet.solana.com")
+        self.assertEqual(websocket_url("http://127.0.0.1:8899"), "ws://127.0.0.1:8899")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+from src.order_book import OrderBook, BookSide
+
+
+def side(name, prices, sizes):
+    return BookSide(name, prices, sizes)
+
+
+class TestBookAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.book = OrderBook(side('long', [19.9, 19.9, 19.8, 19.0], [1.0, 2.0, 3.0, 10.0]),
+                              side('short', [20.1, 20.3, 21.0], [1.0, 1.0, 5.0]))
+        self.book.set_oracle_price(20.0)
+        self.analytics = self.book.analytics
+
+    def test_microprice_leans_towards_thinner_side(self):
+        # 3 bid vs 1 ask at the top: fair price sits near the ask
+        self.assertAlmostEqual(self.analytics.microprice(), (19.9 * 1.0 + 20.1 * 3.0) / 4.0)
+
+    def test_imbalance(self):
+        self.assertAlmostEqual(self.analytics.imbalance(1), (3.0 - 1.0) / 4.0)
+        self.assertAlmostEqual(self.analytics.imbalance(2), (6.0 - 2.0) / 8.0)
+
+    def test_depth_within_bps(self):
+        self.assertEqual(self.analytics.depth_within_bps(100), (6.0, 1.0))
+        self.assertEqual(self.analytics.depth_within_bps(1), (0.0, 0.0))
+
+    def test_vwap(self):
+        self.assertAlmostEqual(self.analytics.vwap(1.5, 'short'), (20.1 * 1.0 + 20.3 * 0.5) / 1.5)
+        self.assertAlmostEqual(self.analytics.vwap(3.0, 'long'), 19.9)
+        self.assertIsNone(self.analytics.vwap(100.0, 'short'))
+
+    def test_spread_to_oracle(self):
+        bid, ask = self.analytics.spread_to_oracle()
+        self.assertAlmostEqual(bid, 0.1)
+        self.assertAlmostEqual(ask, 0.1)
+
+    def test_results_are_cached_per_book(self):
+        self.assertIs(self.book.analytics, self.analytics)
+        self.assertIs(self.analytics.depth_within_bps(100), self.analytics.depth_within_bps(100))
+        self.book.set_oracle_price(20.5)
+        self.assertIsNot(self.book.analytics, self.analytics)
+        self.assertEqual(self.book.analytics.depth_within_bps(100), (0.0, 2.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
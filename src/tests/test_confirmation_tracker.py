@@ -0,0 +1,120 @@
+import unittest
+import asyncio
+import time
+
+from aiohttp import web
+
+from src.confirmation_tracker import ConfirmationTracker
+from src.quote_reconciler import LiveOrder, Quote, QuoteDiff, QuoteReconciler
+from src.rpc_pool import RPCPool
+from src.tx_packer import BatchResult
+
+
+class StatusRPC:
+    """Local JSON-RPC stand-in answering getSignatureStatuses from a dict of statuses."""
+
+    def __init__(self):
+        self.statuses = {}
+
+    async def handle(self, request):
+        body = await request.json()
+        value = [self.statuses.get(signature) for signature in body["params"][0]]
+        return web.json_response({"jsonrpc": "2.0", "id": body["id"],
+                                  "result": {"context": {"slot": 10}, "value": value}})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+class SlowOrders:
+    """Orders stand-in whose send_orders takes a while."""
+
+    def __init__(self, results, diff=None, delay=0.05):
+        self.results = results
+        self.diff = diff
+        self.delay = delay
+        self.opts = None
+
+    async def send_orders(self, opts=None):
+        self.opts = opts
+        await asyncio.sleep(self.delay)
+        return self.results
+
+
+class TestConfirmationTracker(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.rpc = StatusRPC()
+        await self.rpc.start()
+        self.addAsyncCleanup(self.rpc.stop)
+        pool = RPCPool([self.rpc.url])
+        self.addAsyncCleanup(pool.close)
+        self.tracker = ConfirmationTracker(pool, poll_interval=0.01, timeout=0.2)
+
+    async def test_submit_returns_before_sending_and_tracks_landing(self):
+        sent = []
+        submission = self.tracker.submit(SlowOrders([BatchResult(0, ['ix'] * 3, signature='a')]), on_sent=sent.append)
+        self.assertFalse(submission.sent)
+        self.assertTrue(self.tracker.in_flight)
+        await submission
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(submission.transactions[0].status, 'pending')
+        self.rpc.statuses['a'] = {"slot": 12, "err": None, "confirmationStatus": "confirmed"}
+        await self.tracker.poll()
+        self.assertTrue(submission.landed)
+        self.assertEqual(submission.transactions[0].slot, 12)
+        self.assertFalse(self.tracker.in_flight)
+        self.assertEqual(self.tracker.stats()['landed'], 1)
+        self.assertGreater(self.tracker.stats()['latency_p50'], 0)
+
+    async def test_sends_without_waiting_for_confirmation(self):
+        orders = SlowOrders([BatchResult(0, ['ix'], signature='a', sent_at=time.monotonic() - 1.0)], delay=0)
+        submission = self.tracker.submit(orders)
+        await submission
+        self.assertTrue(orders.opts.skip_confirmation)
+        self.rpc.statuses['a'] = {"slot": 12, "err": None, "confirmationStatus": "confirmed"}
+        await self.tracker.poll()
+        # Latency runs from just before the send, not from when sending returned
+        self.assertGreaterEqual(submission.transactions[0].latency, 1.0)
+
+    async def test_failed_and_expired_transactions(self):
+        results = [BatchResult(0, ['ix'], signature='bad'), BatchResult(1, ['ix'], signature='lost'),
+                   BatchResult(1, ['ix'], error=Exception("blockhash not found"))]
+        self.rpc.statuses['bad'] = {"slot": 11, "err": {"InstructionError": [0, "Custom"]},
+                                    "confirmationStatus": "processed"}
+        await self.tracker.start()
+        self.addAsyncCleanup(self.tracker.stop)
+        submission = self.tracker.submit(SlowOrders(results, delay=0))
+        await asyncio.sleep(0.4)
+        self.assertEqual([tx.status for tx in submission.transactions], ['failed', 'expired', 'failed'])
+        self.assertTrue(submission.settled)
+        self.assertFalse(submission.landed)
+        self.assertEqual(self.tracker.counts, {'landed': 0, 'failed': 2, 'expired': 1})
+
+    async def test_orders_in_flight_are_overlaid_on_the_book(self):
+        diff = QuoteDiff()
+        diff.cancel = [LiveOrder(1, 'long', 1.0, -0.1)]
+        diff.modify = [(LiveOrder(2, 'short', 1.0, 0.1), Quote('short', 2.0, 0.2))]
+        diff.place = [Quote('long', 1.0, -0.3)]
+        self.tracker.submit(SlowOrders([], diff=diff))
+        book = [LiveOrder(1, 'long', 1.0, -0.1), LiveOrder(2, 'short', 1.0, 0.1)]
+        live = self.tracker.overlay(book)
+        self.assertEqual([(o.order_id, o.side, o.size, o.offset) for o in live],
+                         [(2, 'short', 2.0, 0.2), (None, 'long', 1.0, -0.3)])
+        # The same ladder again changes nothing, and an order in flight is never cancelled
+        reconciler = QuoteReconciler()
+        self.assertEqual(len(reconciler.reconcile([Quote('short', 2.0, 0.2), Quote('long', 1.0, -0.3)], live)), 0)
+        self.assertEqual(reconciler.reconcile([], live).cancel, [live[0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+import numpy as np
+
+from src.dlob_builder import (ORDER_DTYPE, USER_MAX_ORDERS, ORDER_STATUS_OPEN, MARKET_TYPE_PERP,
+                              decode_market_orders)
+
+BASE_PRECISION = 10**9
+PRICE_PRECISION = 10**6
+
+
+def order_slots(users: int) -> np.ndarray:
+    """Empty order slots of `users` users, as in their accounts."""
+    return np.zeros((users, USER_MAX_ORDERS), dtype=ORDER_DTYPE)
+
+
+def set_order(slots, user, i, order_id, market_index=0, status=ORDER_STATUS_OPEN, market_type=MARKET_TYPE_PERP,
+              direction=0, price=0.0, size=1.0, filled=0.0, offset=0.0):
+    slot = slots[user, i]
+    slot['orderId'], slot['marketIndex'] = order_id, market_index
+    slot['status'], slot['marketType'], slot['direction'] = status, market_type, direction
+    slot['price'] = int(price * PRICE_PRECISION)
+    slot['baseAssetAmount'], slot['baseAssetAmountFilled'] = int(size * BASE_PRECISION), int(filled * BASE_PRECISION)
+    slot['oraclePriceOffset'] = int(offset * PRICE_PRECISION)
+
+
+class TestDecodeMarketOrders(unittest.TestCase):
+    def setUp(self):
+        self.users = np.arange(2 * 32, dtype=np.uint8).reshape(2, 32)
+        self.slots = order_slots(2)
+
+    def decode(self, market_index=0):
+        return decode_market_orders(self.slots.tobytes(), self.users, market_index, 20.5, 20.4, slot=1234)
+
+    def test_order_layout(self):
+        self.assertEqual(ORDER_DTYPE.itemsize, 96)
+
+    def test_only_open_perp_orders_of_the_market(self):
+        set_order(self.slots, 0, 0, 1)
+        set_order(self.slots, 0, 1, 2, status=2)
+        set_order(self.slots, 0, 2, 3, market_type=0)
+        set_order(self.slots, 1, 5, 4, market_index=1)
+        set_order(self.slots, 1, 31, 5)
+        snapshot = self.decode()
+        self.assertEqual(snapshot.records['orderId'].tolist(), [1, 5])
+        self.assertEqual(self.decode(market_index=1).records['orderId'].tolist(), [4])
+        self.assertEqual((snapshot.slot, snapshot.oracle_price, snapshot.oracle_twap), (1234, 20.5, 20.4))
+        self.assertEqual(len(self.decode(market_index=2)), 0)
+
+    def test_scaling_and_user_rows(self):
+        set_order(self.slots, 1, 3, 7, direction=1, price=19.25, size=2.5, filled=0.5, offset=-0.125)
+        set_order(self.slots, 0, 9, 8, offset=0.3)
+        records = self.decode().records
+        self.assertEqual(records['orderId'].tolist(), [8, 7])
+        # Each order carries the pubkey of the user whose slots it came from
+        self.assertEqual(records['user'].tolist(), [self.users[0].tolist(), self.users[1].tolist()])
+        ask = records[1]
+        self.assertEqual((ask['direction'], ask['price'], ask['baseAssetAmount'], ask['baseAssetAmountFilled']),
+                         (1, 19.25, 2.5, 0.5))
+        self.assertAlmostEqual(float(ask['oraclePriceOffset']), -0.125)
+        self.assertAlmostEqual(float(records[0]['oraclePriceOffset']), 0.3)
+
+
+if __name__ == '__main__':
+    unittest.main()
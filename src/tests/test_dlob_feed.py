@@ -0,0 +1,60 @@
+import json
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from src.dlob_feed import DLOBDeltaFeed, LocalDLOB
+from src.order_book import OrderBook
+from src.tests.test_order_book import ORACLE_PRICE, ORDERS, order
+
+
+def message(seq, oracle_price=ORACLE_PRICE, **fields):
+    return {'seq': seq, 'slot': seq, 'oracle_price': oracle_price, 'oracle_twap': ORACLE_PRICE, **fields}
+
+
+class TestLocalDLOB(unittest.TestCase):
+    def setUp(self):
+        self.dlob = LocalDLOB()
+        entries = [{'key': f"{o['user']}:{o['orderId']}", 'order': o} for o in ORDERS]
+        self.dlob.apply(message(1, type='snapshot', orders=entries))
+
+    def test_format_matches_from_orders(self):
+        book, expected = self.dlob.format(), OrderBook.from_orders(ORDERS)
+        for side in ('bids', 'asks'):
+            np.testing.assert_allclose(getattr(book, side).prices, getattr(expected, side).prices)
+            np.testing.assert_allclose(getattr(book, side).offsets, getattr(expected, side).offsets)
+        self.assertEqual([o['price'] for o in self.dlob.sorted_orders('long')], [19.98, 19.95, 19.81])
+
+    def test_oracle_moves_reprice_pegged_orders_in_place(self):
+        bids = self.dlob.format().bids
+        self.dlob.apply(message(2, oracle_price=19.80, type='delta', changes=[]))
+        book = self.dlob.format()
+        # Same side, re-marked: the pegged bid now sits below the fixed ones
+        self.assertIs(book.bids, bids)
+        np.testing.assert_allclose(book.bids.prices, [19.95, 19.81, 19.78])
+        self.assertEqual(self.dlob.sorted_orders('long')[2]['price'], 19.78)
+        # An order change rebuilds the side
+        insert = {'op': 'insert', 'key': 'new:9', 'order': order('long', 19.90, 1.0, order_id=9)}
+        self.dlob.apply(message(3, oracle_price=19.80, type='delta', changes=[insert]))
+        self.assertIsNot(self.dlob.format().bids, bids)
+        np.testing.assert_allclose(self.dlob.format().bids.prices, [19.95, 19.90, 19.81, 19.78])
+
+
+class TestDLOBDeltaFeed(unittest.TestCase):
+    def test_messages_split_across_reads(self):
+        entries = [{'key': f"{o['user']}:{o['orderId']}", 'order': o} for o in ORDERS]
+        lines = b''.join(json.dumps(m).encode() + b'\n' for m in [
+            message(1, type='snapshot', orders=entries), message(2, oracle_price=19.80, type='delta', changes=[])])
+        chunks = [lines[:100], lines[100:-10], lines[-10:-1], lines[-1:]]
+        feed = DLOBDeltaFeed(spawn=False)
+        feed.sock = MagicMock()
+        feed.sock.recv.side_effect = chunks + [BlockingIOError()]
+        feed._drain(block=False)
+        self.assertEqual(feed.book.seq, 2)
+        self.assertEqual(len(feed.book.orders), len(ORDERS))
+        self.assertEqual(feed.buffer, bytearray())
+
+
+if __name__ == '__main__':
+    unittest.main()
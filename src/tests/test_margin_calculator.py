@@ -0,0 +1,77 @@
+import unittest
+from types import SimpleNamespace
+
+from src.margin_calculator import MarginCalculator
+
+PRICE_PRECISION = 10**6
+BASE_PRECISION = 10**9
+QUOTE_PRECISION = 10**6
+
+
+class Deposit:
+    def __str__(self):
+        return "SpotBalanceType.Deposit()"
+
+
+def perp_position(market_index, base, quote, last_funding=0):
+    return SimpleNamespace(market_index=market_index, base_asset_amount=base, quote_asset_amount=quote,
+                           last_cumulative_funding_rate=last_funding, open_orders=0, lp_shares=0)
+
+
+def make_cache(positions, oracle_prices, funding_rate=0):
+    # 1000 USDC deposited in the quote spot market
+    quote_market = SimpleNamespace(decimals=6, cumulative_deposit_interest=10**10, cumulative_borrow_interest=10**10)
+    usdc = SimpleNamespace(market_index=0, scaled_balance=1000 * 10**9, open_orders=0, balance_type=Deposit())
+    empty = perp_position(0, 0, 0)
+    user = SimpleNamespace(spot_positions=[usdc], perp_positions=positions + [empty] * (8 - len(positions)))
+    perp_markets = [SimpleNamespace(amm=SimpleNamespace(cumulative_funding_rate_long=funding_rate,
+                                                        cumulative_funding_rate_short=funding_rate))
+                    for _ in oracle_prices]
+    return {"state": None, "user": user, "spot_markets": [quote_market], "spot_market_oracles": [None],
+            "perp_markets": perp_markets,
+            "perp_market_oracles": [SimpleNamespace(price=int(p * PRICE_PRECISION)) for p in oracle_prices]}
+
+
+class TestMarginCalculator(unittest.TestCase):
+    def setUp(self):
+        # Long 2 SOL bought for 40 USDC, short 0.5 of market 1 sold for 50 USDC
+        self.cache = make_cache([perp_position(0, 2 * BASE_PRECISION, -40 * QUOTE_PRECISION),
+                                 perp_position(1, -BASE_PRECISION // 2, 50 * QUOTE_PRECISION)], [21.0, 100.0])
+        self.margin = MarginCalculator()
+        self.assertTrue(self.margin.update(self.cache))
+
+    def test_figures_match_driftpy_formulas(self):
+        self.assertAlmostEqual(self.margin.spot_value, 1000 * QUOTE_PRECISION)
+        # (42 - 40) + (50 - 50)
+        self.assertAlmostEqual(self.margin.unrealized_pnl(), 2 * QUOTE_PRECISION)
+        self.assertAlmostEqual(self.margin.perp_liability, 92 * QUOTE_PRECISION)
+        self.assertAlmostEqual(self.margin.total_collateral, 1002 * QUOTE_PRECISION)
+        self.assertAlmostEqual(self.margin.leverage, 92 / 1002)
+        self.assertEqual(self.margin.position(1).quote_asset_amount, 50 * QUOTE_PRECISION)
+        self.assertIsNone(self.margin.position(2))
+
+    def test_oracle_only_move_is_incremental(self):
+        self.cache["perp_market_oracles"][0] = SimpleNamespace(price=22 * PRICE_PRECISION)
+        self.assertFalse(self.margin.update(self.cache))
+        self.assertAlmostEqual(self.margin.unrealized_pnl(), 4 * QUOTE_PRECISION)
+        self.assertAlmostEqual(self.margin.perp_liability, 94 * QUOTE_PRECISION)
+        self.margin.set_oracle_price(1, 90 * PRICE_PRECISION)
+        self.assertAlmostEqual(self.margin.unrealized_pnl(), 9 * QUOTE_PRECISION)
+
+    def test_new_user_account_rebuilds(self):
+        self.cache["user"] = make_cache([], [21.0, 100.0])["user"]
+        self.assertTrue(self.margin.update(self.cache))
+        self.assertEqual(self.margin.perp_liability, 0)
+        self.assertAlmostEqual(self.margin.total_collateral, 1000 * QUOTE_PRECISION)
+
+    def test_funding_counts_towards_collateral_only(self):
+        cache = make_cache([perp_position(0, BASE_PRECISION, -20 * QUOTE_PRECISION)], [20.0],
+                           funding_rate=-1000 * QUOTE_PRECISION)
+        margin = MarginCalculator()
+        margin.update(cache)
+        self.assertAlmostEqual(margin.unrealized_pnl(), 0)
+        self.assertAlmostEqual(margin.total_collateral, 1001 * QUOTE_PRECISION)
+
+
+if __name__ == '__main__':
+    unittest.main()
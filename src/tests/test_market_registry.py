@@ -0,0 +1,43 @@
+import unittest
+from types import SimpleNamespace
+
+from src.market_registry import MarketRegistry
+
+CONFIG = SimpleNamespace(
+    markets=[SimpleNamespace(symbol="SOL-PERP", market_index=0), SimpleNamespace(symbol="BTC-PERP", market_index=1)],
+    banks=[SimpleNamespace(symbol="USDC", bank_index=0), SimpleNamespace(symbol="SOL", bank_index=1)],
+)
+
+
+class TestMarketRegistry(unittest.TestCase):
+    def setUp(self):
+        self.markets = MarketRegistry.from_config(CONFIG)
+
+    def test_lookup_by_symbol_and_index(self):
+        self.assertEqual(len(self.markets), 4)
+        self.assertEqual(self.markets["BTC-PERP"].market_index, 1)
+        self.assertTrue(self.markets["BTC-PERP"].is_perp)
+        self.assertFalse(self.markets["SOL"].is_perp)
+        self.assertIs(self.markets.perp(0), self.markets["SOL-PERP"])
+        self.assertIs(self.markets.spot(1), self.markets["SOL"])
+        with self.assertRaises(KeyError):
+            self.markets["DOGE-PERP"]
+
+    def test_order_constraints_from_accounts(self):
+        sol = self.markets["SOL-PERP"]
+        # Unknown until the market accounts are loaded: nothing is rounded
+        self.assertEqual(sol.round_size(0.123), 0.123)
+        perp = SimpleNamespace(market_index=0, amm=SimpleNamespace(
+            order_tick_size=100, order_step_size=10**7, min_order_size=10**7))
+        spot = SimpleNamespace(market_index=1, decimals=9, order_tick_size=100,
+                               order_step_size=10**8, min_order_size=10**8)
+        self.markets.load_accounts([perp], [spot])
+        self.assertEqual((sol.tick_size, sol.step_size, sol.min_order_size), (0.0001, 0.01, 0.01))
+        self.assertEqual(self.markets["SOL"].step_size, 0.1)
+        self.assertAlmostEqual(sol.round_size(0.129), 0.12)
+        self.assertAlmostEqual(sol.round_size(0.3), 0.3)
+        self.assertAlmostEqual(sol.round_price(20.12347), 20.1235)
+
+
+if __name__ == '__main__':
+    unittest.main()
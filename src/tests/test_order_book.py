@@ -0,0 +1,148 @@
+import unittest
+
+import numpy as np
+import base58
+
+from src.dlob_binary import DLOB_HEADER_DTYPE, DLOB_RECORD_DTYPE, DLOBSnapshot
+from src.order_book import OrderBook
+from src.utils import create_order_book
+
+ORACLE_PRICE = 20.0
+
+
+MAKER = '98KhSxy5fhyWBgSZeqyLj5TAovPNReDYbb13dQ7FJwF4'
+OTHER = 'Av3gNoe5Q4L9MSMs9MQvxgnATsWbt1TaL9ZAmM48ZK7p'
+
+
+def order(direction, price, size, order_type='limit', offset=0.0, order_id=1, user=OTHER):
+    return {'user': user, 'orderType': order_type, 'price': price, 'oracle_price': ORACLE_PRICE,
+            'oracle_twap': ORACLE_PRICE, 'baseAssetAmount': size, 'baseAssetAmountFilled': 0.0,
+            'direction': direction, 'existingPositionDirection': direction, 'postOnly': 'true',
+            'oraclePriceOffset': offset, 'orderId': order_id}
+
+
+ORDERS = [
+    order('long', 19.95, 1.0, order_id=1),
+    order('long', 19.81, 2.0, order_id=2, user=MAKER),
+    order('long', 0, 0.5, offset=-0.02, order_id=3),
+    order('long', 19.99, 4.0, order_type='market', order_id=4),
+    order('short', 20.04, 1.5, order_id=5),
+    order('short', 20.21, 3.0, order_id=6, user=MAKER),
+    order('short', 20.04, 0.5, order_id=8, user=MAKER),
+    order('short', 0, 2.5, offset=0.06, order_id=7),
+]
+
+
+def snapshot_of(orders):
+    records = np.zeros(len(orders), dtype=DLOB_RECORD_DTYPE)
+    for i, o in enumerate(orders):
+        records[i]['user'] = np.frombuffer(base58.b58decode(o['user']), dtype=np.uint8)
+        records[i]['orderId'] = o['orderId']
+        records[i]['orderType'] = ('market', 'limit').index(o['orderType'])
+        records[i]['direction'] = ('long', 'short').index(o['direction'])
+        records[i]['price'] = o['price']
+        records[i]['baseAssetAmount'] = o['baseAssetAmount']
+        records[i]['oraclePriceOffset'] = o['oraclePriceOffset']
+    header = np.zeros(1, dtype=DLOB_HEADER_DTYPE)[0]
+    header['oracle_price'] = ORACLE_PRICE
+    header['oracle_twap'] = ORACLE_PRICE
+    return DLOBSnapshot(header, records)
+
+
+class TestOrderBook(unittest.TestCase):
+    def setUp(self):
+        self.book = OrderBook.from_orders(ORDERS)
+
+    def test_sides_sorted_best_first_with_pegged_prices(self):
+        np.testing.assert_allclose(self.book.bids.prices, [19.98, 19.95, 19.81])
+        np.testing.assert_allclose(self.book.asks.prices, [20.04, 20.04, 20.06, 20.21])
+        self.assertEqual(self.book['best_bid'], 19.98)
+        self.assertEqual(self.book['best_ask'], 20.04)
+        self.assertEqual([o['orderId'] for o in self.book['long_orders']], [3, 1, 2])
+
+    def test_levels_and_cumulative_depth(self):
+        prices, sizes = self.book.asks.levels(0.1)
+        np.testing.assert_allclose(prices, [20.1, 20.3])
+        np.testing.assert_allclose(sizes, [4.5, 3.0])
+        levels = list(self.book['short_orderbook'].values())
+        self.assertEqual([level['cumulative_quantity'] for level in levels], [4.5, 7.5])
+
+    def test_depth_lookups(self):
+        self.assertEqual(self.book.bids.depth_at(19.95), 1.5)
+        self.assertEqual(self.book.bids.depth_at(20.5), 0.0)
+        self.assertEqual(self.book.asks.price_for_depth(3.5), 20.06)
+        self.assertIsNone(self.book.asks.price_for_depth(100.0))
+
+    def test_resolutions_are_cached(self):
+        prices, sizes = self.book.levels('long', 1.0)
+        np.testing.assert_allclose(prices, [19.0])
+        np.testing.assert_allclose(sizes, [3.5])
+        self.assertIs(self.book.levels('long', 1.0), self.book.bids.levels(1.0))
+        # Every configured tick size is built together from the exact price levels
+        self.assertIn(0.01, self.book.bids._levels)
+        self.assertIs(self.book.order_book('short', 0.1), self.book['short_orderbook'])
+        # 10 bps of the 20.01 mid is about 0.02 wide
+        prices, _ = self.book.levels('short', 'bps')
+        self.assertEqual(len(prices), 3)
+
+    def test_snapshot_matches_dictionaries(self):
+        book = OrderBook.from_snapshot(snapshot_of(ORDERS))
+        np.testing.assert_allclose(book.bids.prices, self.book.bids.prices)
+        np.testing.assert_allclose(book.asks.sizes, self.book.asks.sizes)
+        self.assertEqual([o['orderId'] for o in book['short_orders']], [5, 8, 7, 6])
+        self.assertEqual(book['short_orders'][2]['price'], 20.06)
+        self.assertEqual(book.open_orders(MAKER), (1, 2))
+        self.assertEqual(book.queue_ahead(MAKER, 8), (0.0, 1.5))
+
+    def test_oracle_price_remarks_pegged_orders(self):
+        self.book.set_oracle_price(19.90)
+        # The pegged bid drops from 19.98 to 19.88, behind the 19.95 bid
+        np.testing.assert_allclose(self.book.bids.prices, [19.95, 19.88, 19.81])
+        np.testing.assert_allclose(self.book.asks.prices, [19.96, 20.04, 20.04, 20.21])
+        self.assertAlmostEqual(self.book['best_ask'], 19.96)
+        self.assertEqual([o['orderId'] for o in self.book['long_orders']], [1, 3, 2])
+        self.assertEqual(self.book['long_orders'][1]['oracle_price'], 19.90)
+        self.assertEqual(self.book.find_order(MAKER, 6), ('short', 3))
+
+    def test_user_index(self):
+        self.assertEqual(self.book.open_orders(MAKER), (1, 2))
+        self.assertEqual(self.book.open_sizes(MAKER), (2.0, 3.5))
+        self.assertEqual(self.book.open_orders('nobody'), (0, 0))
+        self.assertEqual(self.book.find_order(MAKER, 6), ('short', 3))
+        self.assertIsNone(self.book.find_order(MAKER, 5))
+
+    def test_user_orders(self):
+        orders = ORDERS + [order('short', 0, 1.0, offset=0.10, order_id=9, user=MAKER)]
+        for book in (OrderBook.from_orders(orders), OrderBook.from_snapshot(snapshot_of(orders))):
+            records = book.user_orders(MAKER)
+            self.assertEqual([r['orderId'] for r in records], [2, 8, 9, 6])
+            # Pegged orders keep price 0, as in userorders.json
+            self.assertEqual([r['price'] for r in records], [19.81, 20.04, 0.0, 20.21])
+            self.assertAlmostEqual(records[2]['oraclePriceOffset'], 0.10)
+            self.assertEqual(book.user_orders('nobody'), [])
+
+    def test_queue_ahead(self):
+        # Behind order 5 at 20.04, nothing better
+        self.assertEqual(self.book.queue_ahead(MAKER, 8), (0.0, 1.5))
+        # Last ask: everything else is at better prices
+        self.assertEqual(self.book.queue_ahead(MAKER, 6), (4.5, 0.0))
+        self.assertIsNone(self.book.queue_ahead(OTHER, 99))
+
+    def test_empty_side(self):
+        book = OrderBook.from_orders([o for o in ORDERS if o['direction'] == 'long'])
+        self.assertIsNone(book['best_ask'])
+        self.assertEqual(book['short_orderbook'], {})
+        self.assertEqual(set(book.to_dict()), set(book))
+
+
+class TestCreateOrderBook(unittest.TestCase):
+    def test_levels_accumulate_every_order(self):
+        book = OrderBook.from_orders(ORDERS)
+        levels = create_order_book(book['short_orders'], 0.1)
+        self.assertEqual(levels, book['short_orderbook'])
+        self.assertEqual([level['quantity'] for level in levels.values()], [4.5, 3.0])
+        self.assertEqual(create_order_book(book['long_orders'], 0.1), book['long_orderbook'])
+
+
+if __name__ == '__main__':
+    unittest.main()
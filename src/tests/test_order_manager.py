@@ -0,0 +1,156 @@
+import unittest
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+
+from src.order_manager import OrderManager
+from src.tx_packer import BatchResult
+
+BASE_PRECISION = 10**9
+PRICE_PRECISION = 10**6
+
+
+def params(direction, size, offset):
+    return SimpleNamespace(direction=f"PositionDirection.{direction}()", base_asset_amount=int(size * BASE_PRECISION),
+                           price=0, oracle_price_offset=int(offset * PRICE_PRECISION), user_order_id=0)
+
+
+def submission(placements=(), cancels=(), modifies=(), cancel_all=False):
+    return SimpleNamespace(ixs=['cancel-all'] if cancel_all else [], ix_changes={},
+                           changes=lambda: (list(placements), list(cancels), list(modifies)))
+
+
+def sent(orders, *changes):
+    """Instructions as Orders.get_order_ix_phases builds them, one per (order id, OrderParams) change."""
+    ixs = [object() for _ in changes]
+    orders.ix_changes.update({id(ix): change for ix, change in zip(ixs, changes)})
+    return ixs
+
+
+def account_order(order_id, user_order_id, direction, size, filled=0.0, offset=-0.05, market_index=0):
+    return SimpleNamespace(status="OrderStatus.Open()", market_index=market_index, order_id=order_id,
+                           user_order_id=user_order_id, direction=f"PositionDirection.{direction}()",
+                           base_asset_amount=int(size * BASE_PRECISION),
+                           base_asset_amount_filled=int(filled * BASE_PRECISION), price=0,
+                           oracle_price_offset=int(offset * PRICE_PRECISION))
+
+
+def user(*orders):
+    return SimpleNamespace(orders=list(orders))
+
+
+class TestOrderManager(unittest.TestCase):
+    def setUp(self):
+        self.oms = OrderManager(0, pending_timeout=30)
+
+    def test_lifecycle_from_account_slots(self):
+        bid, ask = params('LONG', 1.0, -0.05), params('SHORT', 2.0, 0.05)
+        pending = self.oms.record_submission(submission([bid, ask]))
+        self.assertEqual([bid.user_order_id, ask.user_order_id], [1, 2])
+        self.assertEqual([o.status for o in pending], ['pending', 'pending'])
+        self.assertEqual(self.oms.open_counts(), [1, 1])
+        self.assertEqual([o.order_id for o in self.oms.live_orders()], [None, None])
+
+        self.oms.reconcile_user(user(account_order(10, 1, 'LONG', 1.0),
+                                     account_order(11, 2, 'SHORT', 2.0, filled=0.5, offset=0.05),
+                                     account_order(12, 0, 'LONG', 1.0, market_index=1)), slot=100)
+        self.assertEqual([(o.order_id, o.status) for o in pending], [(10, 'open'), (11, 'partially_filled')])
+        self.assertAlmostEqual(self.oms.open_size('short'), 1.5)
+
+        # Order 10 left the account without a cancel: filled. Order 11 was cancelled
+        self.oms.record_submission(submission(cancels=[11]))
+        self.assertEqual(self.oms.open_counts(), [1, 0])
+        self.oms.reconcile_user(user(), slot=101)
+        self.assertEqual([o.status for o in pending], ['filled', 'cancelled'])
+        self.assertEqual([(o.order_id, size) for o, size in self.oms.fills], [(11, 0.5), (10, 1.0)])
+        self.assertEqual(self.oms.orders, [])
+
+    def test_stale_accounts_and_unsent_orders(self):
+        self.oms.reconcile_user(user(account_order(5, 0, 'LONG', 1.0)), slot=100)
+        self.assertEqual(self.oms.get(5).status, 'open')
+        # An older account does not close the order
+        self.oms.reconcile_user(user(), slot=99)
+        self.assertEqual(self.oms.open_counts(), [1, 0])
+
+        ask = params('SHORT', 1.0, 0.05)
+        orders = submission([ask])
+        unsent = self.oms.record_submission(orders)
+        self.oms.on_sent(unsent, [BatchResult(0, sent(orders, (None, ask)), error=Exception("blockhash not found"))],
+                         orders)
+        self.assertEqual(unsent[0].status, 'expired')
+
+        lost = self.oms.record_submission(submission([params('SHORT', 1.0, 0.05)]))
+        lost[0].created_at -= 31
+        self.oms.reconcile_user(user(account_order(5, 0, 'LONG', 1.0)), slot=102)
+        self.assertEqual(lost[0].status, 'expired')
+
+    def test_failed_cancels_reopen_orders(self):
+        self.oms.reconcile_user(user(account_order(5, 0, 'LONG', 1.0), account_order(6, 0, 'SHORT', 1.0),
+                                     account_order(7, 0, 'SHORT', 1.0)), slot=100)
+        bid = params('LONG', 1.0, -0.1)
+        orders = submission([bid], cancels=[5, 6])
+        pending = self.oms.record_submission(orders)
+        self.assertEqual(self.oms.open_counts(), [1, 1])
+        # The cancel of 5 landed with the placement; the cancel of 6 failed
+        results = [BatchResult(0, sent(orders, (5, None), (None, bid)), signature='a'),
+                   BatchResult(0, sent(orders, (6, None)), error=Exception("blockhash not found"))]
+        self.oms.on_sent(pending, results, orders)
+        self.assertEqual([o.order_id for o in self.oms.open_orders('short')], [6, 7])
+        self.assertEqual(self.oms.open_counts(), [1, 2])
+        # A failed cancel-all reopens every order it was to cancel
+        orders = submission(cancel_all=True)
+        pending = self.oms.record_submission(orders)
+        self.assertEqual(self.oms.open_counts(), [0, 0])
+        orders.ix_changes[id(orders.ixs[0])] = (None, None)
+        self.oms.on_sent(pending, [BatchResult(0, orders.ixs, error=Exception("blockhash not found"))], orders)
+        # Order 5, whose own cancel was sent, stays cancelled
+        self.assertEqual(self.oms.open_counts(), [1, 2])
+        self.assertTrue(self.oms.get(5).cancel_requested)
+        # Nothing sent at all, e.g. the instructions could not be built
+        bid = params('LONG', 1.0, -0.2)
+        orders = submission([bid], cancels=[6])
+        pending = self.oms.record_submission(orders)
+        self.oms.on_sent(pending, [], orders)
+        self.assertEqual(pending[0].status, 'expired')
+        self.assertEqual(self.oms.open_counts(), [1, 2])
+
+    def test_modify_replaces_the_order(self):
+        bid = params('LONG', 1.0, -0.05)
+        original, = self.oms.record_submission(submission([bid]))
+        self.oms.reconcile_user(user(account_order(10, 1, 'LONG', 1.0)), slot=100)
+        replacement, = self.oms.record_submission(submission(modifies=[(10, params('LONG', 2.0, -0.1))]))
+        self.assertEqual(replacement.user_order_id, 1)
+        self.assertEqual([(o.order_id, o.size) for o in self.oms.live_orders()], [(None, 2.0)])
+        self.oms.reconcile_user(user(account_order(13, 1, 'LONG', 2.0, offset=-0.1)), slot=101)
+        self.assertEqual((original.status, replacement.status, replacement.order_id), ('cancelled', 'open', 13))
+
+    def test_userorders_snapshot_only_advances(self):
+        pending, = self.oms.record_submission(submission([params('SHORT', 2.0, 0.05)]))
+        records = [{'orderId': 21, 'direction': 'short', 'baseAssetAmount': 2.0, 'baseAssetAmountFilled': 0.5,
+                    'price': 0, 'oraclePriceOffset': 0.05},
+                   {'orderId': 22, 'direction': 'long', 'baseAssetAmount': 1.0, 'baseAssetAmountFilled': 0.0,
+                    'price': 19.5, 'oraclePriceOffset': 0.0}]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'userorders.json')
+            with open(path, 'w') as f:
+                json.dump(records, f)
+            self.oms.started_at -= 1
+            self.oms.reconcile_snapshot_file(path)
+            self.assertEqual((pending.order_id, pending.status, pending.filled), (21, 'partially_filled', 0.5))
+            self.assertEqual(self.oms.get(22).price, 19.5)
+            # An older snapshot never undoes a fill or closes an order
+            self.oms.reconcile_snapshot([dict(records[0], baseAssetAmountFilled=0.0)])
+            self.assertEqual((pending.filled, self.oms.open_counts()), (0.5, [1, 1]))
+            # Unchanged file: not read again
+            self.oms.orders.clear()
+            self.oms.reconcile_snapshot_file(path)
+            self.assertEqual(self.oms.orders, [])
+            # A file left from an earlier run is never adopted
+            os.utime(path, (self.oms.started_at - 60, self.oms.started_at - 60))
+            self.oms.reconcile_snapshot_file(path)
+            self.assertEqual(self.oms.orders, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from anchorpy import Provider, Wallet
+from solana.keypair import Keypair
+from solana.publickey import PublicKey
+from solana.rpc.async_api import AsyncClient
+from driftpy.clearing_house import ClearingHouse
+from driftpy.constants.config import configs
+from driftpy.addresses import get_perp_market_public_key
+
+from src.driftclient import MMOrder, Orders
+from src.quote_reconciler import LiveOrder
+from src import MARKET_NAME
+from src.market_registry import MARKETS
+
+ORACLE = PublicKey(7)
+
+
+def perp_market(market_index):
+    pubkey = get_perp_market_public_key(configs['devnet'].clearing_house_program_id, market_index)
+    return SimpleNamespace(pubkey=pubkey, amm=SimpleNamespace(oracle=ORACLE))
+
+
+class TestOrders(unittest.TestCase):
+    def setUp(self):
+        # A real ClearingHouse: only the account fetches are patched, so remaining accounts and
+        # instructions are built by driftpy and anchorpy with their real signatures
+        provider = Provider(AsyncClient("http://localhost:8899"), Wallet(Keypair()))
+        with patch('builtins.print'):
+            self.drift_acct = ClearingHouse.from_config(configs['devnet'], provider)
+        user = SimpleNamespace(perp_positions=[], spot_positions=[])
+        self.user_fetch = AsyncMock(return_value=user)
+        self.market_fetch = AsyncMock(side_effect=lambda pubkey: perp_market(self.market_index))
+        patch.object(self.drift_acct.program.account["User"], 'fetch', self.user_fetch).start()
+        patch.object(self.drift_acct.program.account["PerpMarket"], 'fetch', self.market_fetch).start()
+        self.addCleanup(patch.stopall)
+        self.market_index = MARKETS[MARKET_NAME].market_index
+        self.orders = Orders(self.drift_acct)
+
+    def test_ladder_instructions(self):
+        for i in range(6):
+            self.orders.add_order(MMOrder(oracle_price_offset=0.1 * (i + 1)))
+        cancels, places = asyncio.run(self.orders.get_order_ix_phases())
+        self.assertEqual(cancels, [])
+        self.assertEqual(len(places), 6)
+        self.assertEqual([self.orders.ix_changes[id(ix)] for ix in places],
+                         [(None, order.orderparams) for order in self.orders.orders])
+        # Remaining accounts are fetched once for the whole ladder
+        self.assertEqual(self.market_fetch.await_count, 1)
+        market = perp_market(self.market_index).pubkey
+        for ix in places:
+            self.assertEqual(ix.program_id, self.drift_acct.program_id)
+            self.assertIn((market, True), [(meta.pubkey, meta.is_writable) for meta in ix.keys])
+            self.assertIn(ORACLE, [meta.pubkey for meta in ix.keys])
+
+    def test_cancel_only_diff(self):
+        self.orders.reconcile([LiveOrder(3, 'long', 0.1, -0.1), LiveOrder(4, 'short', 0.1, 0.1)])
+        cancels, places = asyncio.run(self.orders.get_order_ix_phases())
+        self.assertEqual(len(cancels), 2)
+        self.assertEqual([self.orders.ix_changes[id(ix)] for ix in cancels], [(3, None), (4, None)])
+        self.assertEqual(places, [])
+        # No market is written to
+        self.assertEqual(self.market_fetch.await_count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from src.order_book import OrderBook
+from src.quote_reconciler import LiveOrder, Quote, QuoteReconciler, live_orders_from_book
+from src.tests.test_order_book import MAKER, order
+
+
+class TestQuoteReconciler(unittest.TestCase):
+    def setUp(self):
+        self.reconciler = QuoteReconciler(price_tolerance=0.005, size_tolerance=0.1)
+
+    def test_orders_within_tolerance_are_kept(self):
+        live = [LiveOrder(1, 'long', 1.0, -0.05), LiveOrder(2, 'short', 1.05, 0.05)]
+        diff = self.reconciler.reconcile([Quote('long', 1.0, -0.053), Quote('short', 1.0, 0.05)], live)
+        self.assertEqual(diff.keep, live)
+        self.assertEqual(len(diff), 0)
+
+    def test_moved_quotes_modify_pegged_orders(self):
+        live = [LiveOrder(1, 'long', 1.0, -0.05), LiveOrder(2, 'long', 2.0, -0.10)]
+        wanted = [Quote('long', 1.0, -0.05), Quote('long', 2.0, -0.20)]
+        diff = self.reconciler.reconcile(wanted, live)
+        self.assertEqual([o.order_id for o in diff.keep], [1])
+        self.assertEqual([(o.order_id, q) for o, q in diff.modify], [(2, wanted[1])])
+        self.assertEqual(diff.cancel, [])
+        self.assertEqual(diff.place, [])
+
+    def test_leftovers_are_placed_or_cancelled(self):
+        live = [LiveOrder(1, 'short', 1.0, 0.30, pegged=False), LiveOrder(2, 'short', 1.0, 0.40),
+                LiveOrder(3, 'short', 1.0, 0.50)]
+        diff = self.reconciler.reconcile([Quote('short', 1.0, 0.30), Quote('long', 1.0, -0.1)], live)
+        # Fixed-price orders are never kept or modified
+        self.assertEqual([(o.order_id, q.offset) for o, q in diff.modify], [(2, 0.30)])
+        self.assertEqual(sorted(o.order_id for o in diff.cancel), [1, 3])
+        self.assertEqual(diff.place, [Quote('long', 1.0, -0.1)])
+        self.assertEqual(len(diff), 4)
+
+    def test_without_modify_orders_are_replaced(self):
+        reconciler = QuoteReconciler(price_tolerance=0.005, size_tolerance=0.1, modify=False)
+        live = [LiveOrder(1, 'long', 1.0, -0.05), LiveOrder(2, 'long', 2.0, -0.10)]
+        wanted = [Quote('long', 1.0, -0.05), Quote('long', 2.0, -0.20)]
+        diff = reconciler.reconcile(wanted, live)
+        self.assertEqual([o.order_id for o in diff.keep], [1])
+        self.assertEqual(diff.modify, [])
+        self.assertEqual([o.order_id for o in diff.cancel], [2])
+        self.assertEqual(diff.place, [wanted[1]])
+
+    def test_equal_orders_are_told_apart(self):
+        live = [LiveOrder(1, 'long', 1.0, -0.05), LiveOrder(2, 'long', 1.0, -0.05),
+                LiveOrder(3, 'long', 1.0, -0.05, pegged=False), LiveOrder(4, 'long', 1.0, -0.05)]
+        diff = self.reconciler.reconcile([Quote('long', 1.0, -0.05), Quote('long', 1.0, -0.30)], live)
+        self.assertEqual([o.order_id for o in diff.keep], [1])
+        self.assertEqual([(o.order_id, q.offset) for o, q in diff.modify], [(2, -0.30)])
+        # The fixed-price order compares equal to the modified one but is still cancelled
+        self.assertEqual(sorted(o.order_id for o in diff.cancel), [3, 4])
+
+    def test_live_orders_from_book(self):
+        book = OrderBook.from_orders([order('long', 0, 1.0, offset=-0.02, order_id=3, user=MAKER),
+                                      order('long', 19.95, 1.0, order_id=4),
+                                      order('short', 20.21, 3.0, order_id=6, user=MAKER)])
+        live = sorted(live_orders_from_book(book, MAKER), key=lambda o: o.order_id)
+        self.assertEqual([(o.order_id, o.side, o.size, o.pegged) for o in live],
+                         [(3, 'long', 1.0, True), (6, 'short', 3.0, False)])
+        self.assertAlmostEqual(live[0].offset, -0.02)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import asyncio
+
+from aiohttp import web
+
+from src.rpc_pool import RPCPool
+
+
+class StubRPC:
+    """Local JSON-RPC stand-in answering getSlot with its own slot after an injected delay."""
+
+    def __init__(self, slot, delay=0.0, status=200):
+        self.slot = slot
+        self.delay = delay
+        self.status = status
+        self.methods = []
+
+    async def handle(self, request):
+        body = await request.json()
+        self.methods.append(body["method"])
+        await asyncio.sleep(self.delay)
+        if self.status != 200:
+            return web.Response(status=self.status)
+        return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": self.slot})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+class TestRPCPool(unittest.IsolatedAsyncioTestCase):
+    async def start(self, *stubs, **kwargs):
+        for stub in stubs:
+            await stub.start()
+            self.addAsyncCleanup(stub.stop)
+        pool = RPCPool([stub.url for stub in stubs], **kwargs)
+        self.addAsyncCleanup(pool.close)
+        return pool
+
+    async def test_routes_to_fastest_endpoint(self):
+        slow, fast = StubRPC(1, delay=0.05), StubRPC(2)
+        pool = await self.start(slow, fast, hedge_delay=1.0)
+        # Both endpoints are measured first, then the fastest one serves
+        for _ in range(2):
+            await pool.make_request("getSlot")
+        for _ in range(5):
+            self.assertEqual((await pool.make_request("getSlot"))["result"], 2)
+        self.assertEqual(len(slow.methods), 1)
+        self.assertEqual(pool.endpoint_uri, fast.url)
+
+    async def test_slow_read_is_hedged(self):
+        stuck, backup = StubRPC(1, delay=1.0), StubRPC(2, delay=0.01)
+        pool = await self.start(stuck, backup, hedge_delay=0.05)
+        start = asyncio.get_running_loop().time()
+        response = await pool.make_request("getSlot")
+        self.assertEqual(response["result"], 2)
+        self.assertLess(asyncio.get_running_loop().time() - start, 0.5)
+        self.assertEqual((len(stuck.methods), len(backup.methods)), (1, 1))
+        # The abandoned request still counts against the stuck endpoint
+        self.assertGreater(pool.endpoints[0].ewma, pool.endpoints[1].ewma)
+
+    async def test_writes_are_not_hedged(self):
+        slow, other = StubRPC(1, delay=0.2), StubRPC(2)
+        pool = await self.start(slow, other, hedge_delay=0.01)
+        response = await pool.make_request("sendTransaction", "tx")
+        self.assertEqual(response["result"], 1)
+        self.assertEqual(other.methods, [])
+
+    async def test_failing_endpoint_is_benched(self):
+        broken, healthy = StubRPC(1, status=429), StubRPC(2)
+        pool = await self.start(broken, healthy, hedge_delay=1.0, max_failures=1)
+        self.assertEqual((await pool.make_request("getSlot"))["result"], 2)
+        self.assertFalse(pool.endpoints[0].healthy)
+        for _ in range(3):
+            await pool.make_request("getSlot")
+        self.assertEqual(len(broken.methods), 1)
+
+    async def test_every_endpoint_failing_raises(self):
+        pool = await self.start(StubRPC(1, status=500), StubRPC(2, status=503))
+        with self.assertRaises(Exception):
+            await pool.make_request("getSlot")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+from src.snapshot import SnapshotAssembler, SNAPSHOT_OK, SNAPSHOT_DEGRADED, SNAPSHOT_STALE
+
+
+def stamped(slot, received_at):
+    return {"slot": slot, "received_at": received_at}
+
+
+class TestSnapshotAssembler(unittest.TestCase):
+    def setUp(self):
+        self.assembler = SnapshotAssembler(degrade_slot_skew=10, max_slot_skew=50, degrade_age=5, max_age=20)
+
+    def assemble(self, dlob_slot, user, market, dlob_received_at=100.0, now=100.0):
+        return self.assembler.assemble(None, dlob_slot, dlob_received_at, user, market, now=now)
+
+    def test_aligned_snapshot_is_ok(self):
+        snapshot = self.assemble(1000, stamped(1002, 99.0), stamped(1002, 99.0))
+        self.assertEqual(snapshot.status, SNAPSHOT_OK)
+        self.assertEqual(snapshot.slot_skew, 2)
+        self.assertEqual(snapshot.age, 1.0)
+
+    def test_slot_skew_degrades_then_skips(self):
+        self.assertEqual(self.assemble(1000, stamped(1020, 100.0), stamped(1020, 100.0)).status, SNAPSHOT_DEGRADED)
+        snapshot = self.assemble(1000, stamped(1080, 100.0), stamped(1080, 100.0))
+        self.assertEqual(snapshot.status, SNAPSHOT_STALE)
+        self.assertFalse(snapshot.tradeable)
+
+    def test_age_degrades_then_skips(self):
+        self.assertEqual(self.assemble(1000, stamped(1000, 90.0), stamped(1000, 100.0)).status, SNAPSHOT_DEGRADED)
+        self.assertEqual(self.assemble(1000, stamped(1000, 100.0), stamped(1000, 100.0),
+                                       dlob_received_at=70.0).status, SNAPSHOT_STALE)
+
+    def test_unknown_dlob_slot_only_checks_age(self):
+        snapshot = self.assemble(None, stamped(1000, 100.0), stamped(1000, 100.0))
+        self.assertEqual(snapshot.status, SNAPSHOT_OK)
+        self.assertEqual(snapshot.slot_skew, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from src.tx_packer import TransactionPacker, transaction_size
+
+PAYER = 'payer'
+PROGRAM = 'drift'
+SHARED = ['state', 'user'] + [f'market{i}' for i in range(8)]
+
+
+def ix(name, data_size=40, accounts=SHARED):
+    keys = [SimpleNamespace(pubkey=PAYER, is_signer=True)] + [SimpleNamespace(pubkey=a, is_signer=False)
+                                                              for a in accounts]
+    return SimpleNamespace(name=name, keys=keys, program_id=PROGRAM, data=bytes(data_size))
+
+
+class TestTransactionPacker(unittest.TestCase):
+    def setUp(self):
+        self.drift_acct = SimpleNamespace(authority=PAYER, send_ixs=AsyncMock(side_effect=lambda ixs: len(ixs)))
+        self.packer = TransactionPacker(self.drift_acct, max_size=1232, ix_compute_units=100_000,
+                                        max_compute_units=1_400_000)
+
+    def test_transaction_size(self):
+        # Signature, header, payer and program keys, blockhash, one instruction with one key and 10 bytes
+        self.assertEqual(transaction_size([ix('a', 10, accounts=[])], PAYER), 1 + 64 + 3 + 1 + 64 + 32 + 1 + 14)
+        # Shared accounts are counted once
+        one = transaction_size([ix('a')], PAYER)
+        self.assertEqual(transaction_size([ix('a'), ix('b')], PAYER) - one, _ix_bytes(ix('b')))
+
+    def test_pack_respects_size_and_compute(self):
+        ixs = [ix(str(i)) for i in range(30)]
+        batches = self.packer.pack(ixs)
+        for batch in batches:
+            self.assertLessEqual(transaction_size(batch, PAYER), 1232)
+            self.assertLessEqual(len(batch), 14)
+        self.assertCountEqual([i.name for batch in batches for i in batch], [i.name for i in ixs])
+        # Every transaction but the last is full
+        self.assertEqual(len(batches), -(-30 // len(batches[0])))
+        self.assertEqual([i.name for i in batches[0]], [str(i) for i in range(len(batches[0]))])
+
+    def test_cancels_are_sent_before_places(self):
+        cancels = [ix(f'c{i}') for i in range(12)]
+        places = [ix(f'p{i}') for i in range(12)]
+        results = asyncio.run(self.packer.send([cancels, places]))
+        sent = [call.args[0] for call in self.drift_acct.send_ixs.call_args_list]
+        first_place = min(i for i, batch in enumerate(sent) if batch[0].name.startswith('p'))
+        self.assertTrue(all(i.name.startswith('c') for batch in sent[:first_place] for i in batch))
+        self.assertEqual([r.phase for r in results], sorted(r.phase for r in results))
+        self.assertTrue(all(r.ok and r.signature == len(r.ixs) for r in results))
+
+    def test_places_are_not_sent_after_a_failed_cancel(self):
+        cancels = [ix(f'c{i}') for i in range(12)]
+        places = [ix(f'p{i}') for i in range(12)]
+
+        async def send_ixs(ixs):
+            if ixs[0].name == 'c0':
+                raise Exception("blockhash not found")
+            return len(ixs)
+        self.drift_acct.send_ixs = AsyncMock(side_effect=send_ixs)
+        results = asyncio.run(self.packer.send([cancels, places]))
+        sent = [call.args[0] for call in self.drift_acct.send_ixs.call_args_list]
+        self.assertTrue(all(i.name.startswith('c') for batch in sent for i in batch))
+        # The other cancels went out; every place is reported unsent
+        self.assertEqual([r.ok for r in results if r.phase == 0].count(True), len(sent) - 1)
+        self.assertTrue(all(not r.ok and r.sent_at is None for r in results if r.phase == 1))
+        self.assertCountEqual([i.name for r in results if r.phase == 1 for i in r.ixs], [i.name for i in places])
+
+    def test_cancels_land_before_places_are_sent_without_confirmation(self):
+        cancels = [ix(f'c{i}') for i in range(12)]
+        places = [ix(f'p{i}') for i in range(12)]
+        events = []
+
+        async def send_ixs(ixs, opts=None):
+            events.append(ixs[0].name[0])
+            return ixs[0].name
+
+        async def get_signature_statuses(signatures):
+            # Unseen on the first poll, then confirmed
+            first = 'poll' not in events
+            events.append('poll')
+            landed = {"confirmationStatus": "confirmed", "err": None}
+            failed = {"confirmationStatus": "confirmed", "err": {"InstructionError": [0, "Custom"]}}
+            value = [None if first else failed if sig == self.failing else landed for sig in signatures]
+            return {"result": {"value": value}}
+        connection = SimpleNamespace(get_signature_statuses=AsyncMock(side_effect=get_signature_statuses))
+        self.drift_acct.program = SimpleNamespace(provider=SimpleNamespace(connection=connection))
+        packer = TransactionPacker(self.drift_acct, sender=SimpleNamespace(send_ixs=send_ixs),
+                                   opts=SimpleNamespace(skip_confirmation=True), poll_interval=0)
+        self.failing = None
+        results = asyncio.run(packer.send([cancels, places]))
+        self.assertTrue(all(r.ok for r in results))
+        # Every cancel is sent, then polled until landed, then the places go out
+        self.assertEqual(events.index('poll'), events.count('c'))
+        self.assertEqual(events.index('p'), events.index('poll') + 2)
+        self.assertNotIn('poll', events[events.index('p'):])
+        # A cancel that lands with an error stops the places
+        events.clear()
+        self.failing = 'c0'
+        results = asyncio.run(packer.send([cancels, places]))
+        self.assertNotIn('p', events)
+        self.assertEqual([r.ok for r in results if r.phase == 0].count(False), 1)
+        self.assertTrue(all(not r.ok for r in results if r.phase == 1))
+
+    def test_small_lots_go_in_one_transaction_and_failures_are_reported(self):
+        self.drift_acct.send_ixs = AsyncMock(side_effect=Exception("blockhash not found"))
+        results = asyncio.run(self.packer.send([[ix('c')], [ix('p1'), ix('p2')]]))
+        self.assertEqual(len(results), 1)
+        self.assertEqual([i.name for i in results[0].ixs], ['c', 'p1', 'p2'])
+        self.assertFalse(results[0].ok)
+        self.assertIsNone(results[0].signature)
+
+    @patch('src.tx_packer.Transaction')
+    def test_opts_are_passed_to_the_provider(self, _):
+        opts = SimpleNamespace(skip_confirmation=True)
+        self.drift_acct.signers = ['signer']
+        self.drift_acct.program = SimpleNamespace(provider=SimpleNamespace(send=AsyncMock(return_value='sig')))
+        self.packer.opts = opts
+        results = asyncio.run(self.packer.send([[ix('c')], [ix('p')]]))
+        self.assertEqual([r.signature for r in results], ['sig'])
+        self.assertIs(self.drift_acct.program.provider.send.call_args.kwargs['opts'], opts)
+        # ClearingHouse.send_ixs takes no options
+        self.drift_acct.send_ixs.assert_not_called()
+        # A pipeline takes them
+        pipeline = SimpleNamespace(send_ixs=AsyncMock(return_value='sig'))
+        packer = TransactionPacker(self.drift_acct, sender=pipeline, opts=opts)
+        asyncio.run(packer.send([[ix('c')]]))
+        self.assertIs(pipeline.send_ixs.call_args.kwargs['opts'], opts)
+
+
+def _ix_bytes(instruction):
+    return 1 + 1 + len(instruction.keys) + 1 + len(instruction.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from aiohttp import web
+from solana.keypair import Keypair
+from solana.transaction import AccountMeta, TransactionInstruction
+
+from src.rpc_pool import RPCPool
+from src.tx_pipeline import BlockhashCache, TransactionPipeline
+
+
+class BlockhashRPC:
+    """Local JSON-RPC stand-in answering getLatestBlockhash with a new blockhash per request."""
+
+    def __init__(self):
+        self.requests = 0
+
+    async def handle(self, request):
+        body = await request.json()
+        self.requests += 1
+        value = {"blockhash": BLOCKHASH if self.requests == 1 else f"hash{self.requests}",
+                 "lastValidBlockHeight": 1000 + self.requests}
+        return web.json_response({"jsonrpc": "2.0", "id": body["id"],
+                                  "result": {"context": {"slot": self.requests}, "value": value}})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+PAYER = Keypair()
+# A blockhash is a base58 hash
+BLOCKHASH = str(Keypair().public_key)
+
+
+def make_drift_acct():
+    provider = SimpleNamespace(wallet=SimpleNamespace(public_key=PAYER.public_key, payer=PAYER), opts=None,
+                               connection=SimpleNamespace(send_transaction=AsyncMock(return_value={"result": "sig"})))
+    return SimpleNamespace(program=SimpleNamespace(provider=provider), signers=[PAYER],
+                           send_ixs=AsyncMock(return_value="fallback-sig"),
+                           get_remaining_accounts=AsyncMock(return_value=['market']),
+                           get_cancel_orders_ix=AsyncMock(return_value='cancel-all'),
+                           get_state_public_key=lambda: 'state', get_user_account_public_key=lambda: 'user',
+                           authority=PAYER.public_key)
+
+
+def make_ix():
+    return TransactionInstruction(keys=[AccountMeta(PAYER.public_key, is_signer=True, is_writable=True)],
+                                  program_id=Keypair().public_key, data=bytes(8))
+
+
+class TestTransactionPipeline(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.rpc = BlockhashRPC()
+        await self.rpc.start()
+        self.addAsyncCleanup(self.rpc.stop)
+        self.pool = RPCPool([self.rpc.url])
+        self.addAsyncCleanup(self.pool.close)
+
+    async def test_blockhash_refreshed_in_background(self):
+        cache = BlockhashCache(self.pool, refresh_interval=0.02)
+        self.assertIsNone(cache.get())
+        await cache.start()
+        self.addAsyncCleanup(cache.stop)
+        self.assertEqual(cache.get(), BLOCKHASH)
+        self.assertEqual(cache.last_valid_block_height, 1001)
+        await asyncio.sleep(0.2)
+        self.assertGreater(self.rpc.requests, 2)
+        self.assertEqual(cache.get(), f"hash{self.rpc.requests}")
+        # Too old to sign with
+        cache.fetched_at -= cache.max_age + 1
+        self.assertIsNone(cache.get())
+
+    async def test_send_signs_with_cached_blockhash(self):
+        drift_acct = make_drift_acct()
+        pipeline = TransactionPipeline(drift_acct, rpc=self.pool)
+        # No blockhash yet: ClearingHouse.send_ixs fetches its own
+        ix = make_ix()
+        self.assertEqual(await pipeline.send_ixs([ix]), "fallback-sig")
+        await pipeline.blockhash_cache.refresh()
+        self.assertEqual(await pipeline.send_ixs([ix]), "sig")
+        tx, *signers = drift_acct.program.provider.connection.send_transaction.call_args.args
+        self.assertEqual((str(tx.recent_blockhash), list(tx.instructions), signers), (BLOCKHASH, [ix], [PAYER]))
+        self.assertEqual(drift_acct.send_ixs.await_count, 1)
+        # Send options, e.g. skip_confirmation, override the provider's
+        opts = SimpleNamespace(skip_confirmation=True)
+        await pipeline.send_ixs([ix], opts=opts)
+        self.assertIs(drift_acct.program.provider.connection.send_transaction.call_args.kwargs['opts'], opts)
+
+    async def test_templates_are_reused_until_stale(self):
+        drift_acct = make_drift_acct()
+        pipeline = TransactionPipeline(drift_acct, rpc=self.pool, template_ttl=60)
+        first = await pipeline.context(0)
+        self.assertIs(await pipeline.context(0), first)
+        self.assertEqual(await pipeline.get_cancel_orders_ix(), await pipeline.get_cancel_orders_ix())
+        self.assertEqual(drift_acct.get_remaining_accounts.await_count, 1)
+        # ClearingHouse.get_remaining_accounts takes one market index
+        self.assertEqual(drift_acct.get_remaining_accounts.await_args.kwargs, {"writable_market_index": 0})
+        self.assertEqual(drift_acct.get_cancel_orders_ix.await_count, 1)
+        pipeline.built_at -= 61
+        self.assertIsNot(await pipeline.context(0), first)
+        self.assertEqual(drift_acct.get_remaining_accounts.await_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,283 @@
+"""Transaction packing.
+
+ClearingHouse.send_ixs puts every instruction in one transaction, which fails
+outright once a ladder (or several markets) goes over the 1232 byte packet
+or the compute budget. The packer estimates the serialized size of each
+instruction, accounts shared with the rest of the transaction counted once,
+and bin-packs them first-fit decreasing into the fewest transactions that
+fit. When everything fits in one transaction it is sent as one, in order.
+Otherwise instructions are sent in phases, cancels before places: the
+transactions of a phase are independent and sent concurrently, and a phase
+starts once the previous one landed. If any transaction of a phase fails,
+the later phases are not sent: places must not go out when the cancels
+before them did not. Given TxOpts (e.g. skip_confirmation
+for a ConfirmationTracker), transactions are sent with them instead of the
+provider's; with skip_confirmation sending returns before a transaction
+lands, so each phase is confirmed with getSignatureStatuses before the next
+one is sent.
+
+Classes:
+- BatchResult: The outcome of one transaction.
+- TransactionPacker: Packs instructions into transactions and sends them.
+
+Functions:
+- compact_u16_size(value: int) -> int: Bytes taken by a compact-u16 length prefix.
+- transaction_size(ixs: list, payer) -> int: Serialized size of a legacy transaction.
+"""
+import asyncio
+import time
+from typing import Optional
+
+from solana.transaction import Transaction
+
+import sys
+from pathlib import Path
+base_path = Path(__file__).resolve().parent
+sys.path.append(str(base_path.parent))
+from src import *
+from confirmation_tracker import COMMITMENT_LEVELS
+
+SIGNATURE_SIZE = 64
+PUBKEY_SIZE = 32
+# Message header: required signatures, readonly signed and readonly unsigned accounts
+HEADER_SIZE = 3
+
+
+def compact_u16_size(value: int) -> int:
+    """Returns the bytes taken by a compact-u16 length prefix (7 bits per byte)."""
+    return 1 if value < 0x80 else 2 if value < 0x4000 else 3
+
+
+class _Batch:
+    """Instructions of one transaction, with what its size is made of."""
+
+    def __init__(self, payer):
+        self.ixs = []
+        self.signers = {payer}
+        self.accounts = {payer}
+        self.ix_bytes = 0
+        self.compute_units = 0
+
+    @staticmethod
+    def ix_size(ix) -> int:
+        """Bytes one compiled instruction takes: program index, account indices and data."""
+        return 1 + compact_u16_size(len(ix.keys)) + len(ix.keys) + compact_u16_size(len(ix.data)) + len(ix.data)
+
+    def size(self, ix=None) -> int:
+        """Serialized size of the transaction, with ix added if given."""
+        signers, accounts = self.signers, self.accounts
+        ix_bytes, ix_count = self.ix_bytes, len(self.ixs)
+        if ix is not None:
+            signers = signers | {meta.pubkey for meta in ix.keys if meta.is_signer}
+            accounts = accounts | {meta.pubkey for meta in ix.keys} | {ix.program_id}
+            ix_bytes, ix_count = ix_bytes + self.ix_size(ix), ix_count + 1
+        return (compact_u16_size(len(signers)) + SIGNATURE_SIZE * len(signers) + HEADER_SIZE
+                + compact_u16_size(len(accounts)) + PUBKEY_SIZE * len(accounts) + PUBKEY_SIZE
+                + compact_u16_size(ix_count) + ix_bytes)
+
+    def add(self, ix, compute_units: int):
+        self.ixs.append(ix)
+        self.signers |= {meta.pubkey for meta in ix.keys if meta.is_signer}
+        self.accounts |= {meta.pubkey for meta in ix.keys} | {ix.program_id}
+        self.ix_bytes += self.ix_size(ix)
+        self.compute_units += compute_units
+
+
+def transaction_size(ixs: list, payer) -> int:
+    """
+    Returns the serialized size of a legacy transaction holding ixs.
+
+    Args:
+        ixs (list[TransactionInstruction]): The instructions.
+        payer (PublicKey): The fee payer, which signs.
+
+    Returns:
+        int: Size in bytes, signatures included.
+    """
+    batch = _Batch(payer)
+    for ix in ixs:
+        batch.add(ix, 0)
+    return batch.size()
+
+
+class BatchResult:
+    """
+    The outcome of one transaction.
+
+    Attributes:
+        phase (int): The phase the transaction was sent in, 0 first.
+        ixs (list[TransactionInstruction]): Its instructions.
+        signature (Optional[str]): The transaction signature, None if sending failed.
+        error (Optional[Exception]): Why sending failed.
+        sent_at (Optional[float]): time.monotonic() just before it was sent.
+    """
+
+    def __init__(self, phase: int, ixs: list, signature: Optional[str] = None, error: Optional[Exception] = None,
+                 sent_at: Optional[float] = None):
+        self.phase = phase
+        self.ixs = ixs
+        self.signature = signature
+        self.error = error
+        self.sent_at = sent_at
+
+    @property
+    def ok(self) -> bool:
+        """bool: Whether the transaction was sent."""
+        return self.error is None
+
+    def __repr__(self):
+        outcome = self.signature if self.ok else f"failed: {self.error}"
+        return f"BatchResult(phase {self.phase}, {len(self.ixs)} ixs, {outcome})"
+
+
+class TransactionPacker:
+    """
+    Packs instructions into the fewest transactions within the size and
+    compute limits and sends them with ClearingHouse.send_ixs, or a
+    TransactionPipeline's.
+
+    Attributes:
+        drift_acct (ClearingHouse): Its authority pays the fees.
+        sender (Any): Sends each transaction with send_ixs(ixs): a TransactionPipeline, or drift_acct itself.
+        max_size (int): Largest serialized transaction, in bytes.
+        ix_compute_units (int): Compute units assumed for each instruction.
+        max_compute_units (int): Compute budget of a transaction.
+        opts (Optional[TxOpts]): Send options, None for the provider's.
+        poll_interval (float): Seconds between status polls while confirming a phase.
+        confirm_timeout (float): Seconds for a phase to land before it counts as failed.
+    """
+
+    def __init__(self, drift_acct, max_size: int = TX_MAX_SIZE, ix_compute_units: int = TX_IX_COMPUTE_UNITS,
+                 max_compute_units: int = TX_MAX_COMPUTE_UNITS, sender=None, opts=None,
+                 poll_interval: float = CONFIRM_POLL_INTERVAL, confirm_timeout: float = CONFIRM_TIMEOUT):
+        self.drift_acct = drift_acct
+        self.sender = sender or drift_acct
+        self.max_size = max_size
+        self.ix_compute_units = ix_compute_units
+        self.max_compute_units = max_compute_units
+        self.opts = opts
+        self.poll_interval = poll_interval
+        self.confirm_timeout = confirm_timeout
+
+    def fits(self, ixs: list) -> bool:
+        """Returns whether ixs fit in one transaction."""
+        return (transaction_size(ixs, self.drift_acct.authority) <= self.max_size
+                and len(ixs) * self.ix_compute_units <= self.max_compute_units)
+
+    def pack(self, ixs: list) -> list[list]:
+        """
+        Bin-packs instructions into transactions, largest instruction first,
+        each into the first transaction it fits. Every transaction keeps its
+        instructions in their original order.
+
+        Args:
+            ixs (list[TransactionInstruction]): Independent instructions.
+
+        Returns:
+            list[list[TransactionInstruction]]: The instructions of each transaction.
+        """
+        payer = self.drift_acct.authority
+        batches = []
+        order = {id(ix): i for i, ix in enumerate(ixs)}
+        for ix in sorted(ixs, key=_Batch.ix_size, reverse=True):
+            for batch in batches:
+                if (batch.size(ix) <= self.max_size
+                        and batch.compute_units + self.ix_compute_units <= self.max_compute_units):
+                    batch.add(ix, self.ix_compute_units)
+                    break
+            else:
+                batch = _Batch(payer)
+                if batch.size(ix) > self.max_size:
+                    raise Exception(f"TransactionSizeError: instruction of {batch.size(ix)} bytes "
+                                    f"does not fit in a {self.max_size} byte transaction")
+                batch.add(ix, self.ix_compute_units)
+                batches.append(batch)
+        return [sorted(batch.ixs, key=lambda ix: order[id(ix)]) for batch in batches]
+
+    async def send_ixs(self, ixs: list) -> str:
+        """Sends ixs in one transaction with the sender, and opts if set."""
+        if self.opts is None:
+            return await self.sender.send_ixs(ixs)
+        if self.sender is not self.drift_acct:
+            return await self.sender.send_ixs(ixs, opts=self.opts)
+        # ClearingHouse.send_ixs always sends with the provider's options
+        tx = Transaction()
+        for ix in ixs:
+            tx.add(ix)
+        return await self.drift_acct.program.provider.send(tx, signers=self.drift_acct.signers, opts=self.opts)
+
+    async def confirm(self, results: list[BatchResult]):
+        """
+        Waits for the sent transactions of results to land at CONFIRM_COMMITMENT.
+        Those that fail, or have not landed within confirm_timeout, get an error.
+
+        Args:
+            results (list[BatchResult]): The transactions of one phase.
+        """
+        connection = self.drift_acct.program.provider.connection
+        required = COMMITMENT_LEVELS.index(CONFIRM_COMMITMENT)
+        deadline = time.monotonic() + self.confirm_timeout
+        pending = [result for result in results if result.ok]
+        while pending:
+            try:
+                response = await connection.get_signature_statuses([str(r.signature) for r in pending])
+                if "result" not in response:
+                    raise Exception(f"APICallError: getSignatureStatuses failed: {response.get('error')}")
+            except Exception as e:
+                for result in pending:
+                    result.error = e
+                return
+            waiting = []
+            for result, status in zip(pending, response["result"]["value"]):
+                if status is not None and status.get("err") is not None:
+                    result.error = Exception(f"TransactionFailed: {status['err']}")
+                elif status is None or COMMITMENT_LEVELS.index(status.get("confirmationStatus")
+                                                               or 'processed') < required:
+                    waiting.append(result)
+            pending = waiting
+            if pending and time.monotonic() > deadline:
+                for result in pending:
+                    result.error = Exception(f"TransactionUnconfirmed: not {CONFIRM_COMMITMENT} "
+                                             f"after {self.confirm_timeout}s")
+                return
+            if pending:
+                await asyncio.sleep(self.poll_interval)
+
+    async def send(self, phases: list[list]) -> list[BatchResult]:
+        """
+        Sends every instruction in one transaction if they fit, otherwise
+        packs and sends each phase of instructions in turn; the transactions
+        of a phase are sent concurrently, and the next phase only once they
+        landed. A failed transaction does not stop the others of its phase,
+        but no later phase is sent; every failed or unsent transaction is
+        reported in its result.
+
+        Args:
+            phases (list[list[TransactionInstruction]]): e.g. [cancels, places].
+
+        Returns:
+            list[BatchResult]: One result per transaction, phase by phase.
+        """
+        every_ix = [ix for ixs in phases for ix in ixs]
+        if every_ix and self.fits(every_ix):
+            phases = [every_ix]
+        results = []
+        for phase, ixs in enumerate(phases):
+            if not ixs:
+                continue
+            batches = self.pack(ixs)
+            if any(not result.ok for result in results):
+                skipped = Exception(f"TransactionSkipped: phase {phase} not sent, an earlier phase failed")
+                results.extend(BatchResult(phase, batch, error=skipped) for batch in batches)
+                continue
+            sent_at = time.monotonic()
+            sent = await asyncio.gather(*(self.send_ixs(batch) for batch in batches), return_exceptions=True)
+            phase_results = [BatchResult(phase, batch, error=outcome, sent_at=sent_at)
+                             if isinstance(outcome, Exception) else
+                             BatchResult(phase, batch, signature=outcome, sent_at=sent_at)
+                             for batch, outcome in zip(batches, sent)]
+            results.extend(phase_results)
+            # Without confirmation a signature only means the node accepted the transaction
+            if self.opts is not None and self.opts.skip_confirmation and any(phases[phase + 1:]):
+                await self.confirm(phase_results)
+        return results
@@ -0,0 +1,245 @@
+"""Transaction pipeline.
+
+ClearingHouse.send_ixs awaits a getLatestBlockhash round trip before it can
+sign, and every cycle rebuilds the same accounts for the same instructions,
+all between the strategy's decision and the wire. The pipeline keeps that
+work off the critical path:
+
+- BlockhashCache refreshes a recent blockhash on a timer in the background
+  and hands it out without awaiting;
+- TransactionPipeline keeps templates of what every cycle's transactions
+  share (the instruction Context of the ladder and the cancel-all
+  instruction), rebuilt in the background before they go stale, and sends
+  with the cached blockhash, so signing and sending is all that is left.
+
+Classes:
+- BlockhashCache: A recent blockhash, refreshed in the background.
+- TransactionPipeline: Instruction templates and sending with the cached blockhash.
+"""
+import asyncio
+import time
+from typing import Any, Optional
+
+from anchorpy import Context
+from solana.transaction import Transaction
+
+import sys
+from pathlib import Path
+base_path = Path(__file__).resolve().parent
+sys.path.append(str(base_path.parent))
+from src import *
+from market_registry import MARKETS
+
+class BlockhashCache:
+    """
+    A recent blockhash, refreshed in the background every `refresh_interval`
+    seconds with getLatestBlockhash.
+
+    Attributes:
+        rpc (RPCPool): Sends the requests; anything with make_request(method, *params).
+        commitment (str): Commitment of the blockhash.
+        refresh_interval (float): Seconds between refreshes.
+        max_age (float): Seconds after which the blockhash is no longer handed out.
+        blockhash (Optional[str]): The last blockhash fetched.
+        last_valid_block_height (Optional[int]): Last block height at which it is valid.
+        fetched_at (float): time.monotonic() of the last refresh.
+    """
+
+    def __init__(self, rpc, commitment: str = "finalized", refresh_interval: float = BLOCKHASH_REFRESH,
+                 max_age: float = BLOCKHASH_MAX_AGE):
+        self.rpc = rpc
+        self.commitment = commitment
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.blockhash = None
+        self.last_valid_block_height = None
+        self.fetched_at = 0.0
+        self.task = None
+
+    async def refresh(self):
+        """Fetches a new blockhash."""
+        response = await self.rpc.make_request("getLatestBlockhash", {"commitment": self.commitment})
+        if "result" not in response:
+            raise Exception(f"APICallError: getLatestBlockhash failed: {response.get('error')}")
+        value = response["result"]["value"]
+        self.blockhash = value["blockhash"]
+        self.last_valid_block_height = value["lastValidBlockHeight"]
+        self.fetched_at = time.monotonic()
+
+    @property
+    def age(self) -> float:
+        """float: Seconds since the last refresh."""
+        return time.monotonic() - self.fetched_at
+
+    def get(self) -> Optional[str]:
+        """Returns the cached blockhash, None if there is none younger than max_age."""
+        if self.blockhash is None or self.age > self.max_age:
+            return None
+        return self.blockhash
+
+    async def start(self):
+        """Fetches a first blockhash and starts refreshing. Does nothing if already running."""
+        if self.task is not None:
+            return
+        await self.refresh()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops refreshing. The last blockhash is kept until it is too old."""
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                # Keep the last blockhash; get() stops handing it out once it is too old
+                print(f"Blockhash refresh failed: {e}")
+
+
+class TransactionPipeline:
+    """
+    Sends the transactions of a ClearingHouse with a cached blockhash, and
+    keeps templates of what every cycle's instructions share.
+
+    Attributes:
+        drift_acct (ClearingHouse): The clearing house whose transactions are sent.
+        blockhash_cache (BlockhashCache): The blockhash transactions are signed with.
+        template_ttl (float): Seconds templates are reused before being rebuilt.
+        contexts (dict[Optional[int], Context]): Instruction accounts by writable market index.
+        cancel_orders_ix (Optional[TransactionInstruction]): The cancel-all instruction.
+        built_at (float): time.monotonic() the templates were built.
+    """
+
+    def __init__(self, drift_acct, rpc=None, template_ttl: float = TX_TEMPLATE_TTL,
+                 blockhash_cache: BlockhashCache = None):
+        self.drift_acct = drift_acct
+        self.blockhash_cache = blockhash_cache or BlockhashCache(
+            rpc or drift_acct.program.provider.connection._provider)
+        self.template_ttl = template_ttl
+        self.contexts = {}
+        self.cancel_orders_ix = None
+        self.built_at = 0.0
+        self.task = None
+
+    @property
+    def stale(self) -> bool:
+        """bool: Whether the templates are older than template_ttl."""
+        return time.monotonic() - self.built_at > self.template_ttl
+
+    def invalidate(self):
+        """Drops the templates, e.g. after a transaction built from them failed."""
+        self.contexts = {}
+        self.cancel_orders_ix = None
+        self.built_at = 0.0
+
+    async def build_context(self, market_index: int = None) -> Context:
+        """Builds the accounts of an order instruction writing to a perp market, or to none."""
+        remaining_accounts = await self.drift_acct.get_remaining_accounts(writable_market_index=market_index)
+        return Context(
+            accounts={
+                "state": self.drift_acct.get_state_public_key(),
+                "user": self.drift_acct.get_user_account_public_key(),
+                "authority": self.drift_acct.authority,
+            },
+            remaining_accounts=remaining_accounts,
+        )
+
+    async def context(self, market_index: int = None) -> Context:
+        """
+        Returns the accounts of an order instruction, from the templates if they are fresh.
+
+        Args:
+            market_index (int): The perp market the instruction writes to, None for cancels.
+
+        Returns:
+            Context: For place_perp_order, modify_order and cancel_order.
+        """
+        if self.stale:
+            self.invalidate()
+        if market_index not in self.contexts:
+            self.contexts[market_index] = await self.build_context(market_index)
+            self.built_at = self.built_at or time.monotonic()
+        return self.contexts[market_index]
+
+    async def get_cancel_orders_ix(self):
+        """Returns the instruction cancelling every order, from the templates if they are fresh."""
+        if self.stale:
+            self.invalidate()
+        if self.cancel_orders_ix is None:
+            self.cancel_orders_ix = await self.drift_acct.get_cancel_orders_ix()
+            self.built_at = self.built_at or time.monotonic()
+        return self.cancel_orders_ix
+
+    async def rebuild(self):
+        """Rebuilds the templates in use, the ladder's market always included."""
+        market_indexes = set(self.contexts) | {MARKETS[MARKET_NAME].market_index}
+        contexts = {market_index: await self.build_context(market_index) for market_index in market_indexes}
+        cancel_orders_ix = await self.drift_acct.get_cancel_orders_ix()
+        self.contexts, self.cancel_orders_ix, self.built_at = contexts, cancel_orders_ix, time.monotonic()
+
+    async def send_ixs(self, ixs: list, opts=None) -> Any:
+        """
+        Signs and sends ixs in one transaction with the cached blockhash, like
+        ClearingHouse.send_ixs. Without a fresh blockhash, falls back to it.
+
+        Args:
+            ixs (list[TransactionInstruction]): The instructions.
+            opts (Optional[TxOpts]): Send options, None for the provider's.
+
+        Returns:
+            str: The transaction signature.
+        """
+        blockhash = self.blockhash_cache.get()
+        provider = self.drift_acct.program.provider
+        if blockhash is None:
+            if opts is None:
+                return await self.drift_acct.send_ixs(ixs)
+            return await provider.send(Transaction(instructions=ixs), signers=self.drift_acct.signers, opts=opts)
+        tx = Transaction(recent_blockhash=blockhash, fee_payer=provider.wallet.public_key, instructions=ixs)
+        signers = [provider.wallet.payer] + [signer for signer in self.drift_acct.signers
+                                             if signer != provider.wallet.payer]
+        try:
+            response = await provider.connection.send_transaction(tx, *signers, opts=opts or provider.opts,
+                                                                  recent_blockhash=blockhash)
+        except Exception:
+            # The accounts may have changed (a new position, a new market): rebuild before the next send
+            self.invalidate()
+            raise
+        return response["result"]
+
+    async def start(self):
+        """Starts the blockhash cache and keeping the templates fresh. Does nothing if already running."""
+        if self.task is not None:
+            return
+        await self.blockhash_cache.start()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the background refreshes."""
+        await self.blockhash_cache.stop()
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.rebuild()
+            except Exception as e:
+                print(f"Transaction template rebuild failed: {e}")
+            # Rebuild a little before they go stale, so the trading loop never has to
+            await asyncio.sleep(self.template_ttl * 0.8)
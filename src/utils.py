@@ -8,8 +8,14 @@ Functions:
 - strategies_dir_path() -> str: Returns the absolute path of the strategies source directory.
 - javascript_dir_path() -> str: Returns the absolute path of the JavaScript source directory.
 - fetch_javascript_json(data: str) -> list[dict]: Executes javascript in terminal to collect data via JS SDK.
+- DLOBSidecarClient: Persistent connection to handle_dlob.js running in sidecar mode (--serve).
+- fetch_binary_dlob() -> DLOBSnapshot: Retrieves the DLOB in the compact binary snapshot format.
+- run_javascript(*args: str, timeout: float) -> str: Runs handle_dlob.js once without blocking the event loop.
+- fetch_javascript_json_async(data: str) -> list[dict]: Coroutine version of fetch_javascript_json.
+- fetch_binary_dlob_async() -> DLOBSnapshot: Coroutine version of fetch_binary_dlob.
+- gather_or_cancel(*aws, timeout: float = None) -> list: Runs awaitables concurrently, cancelling the rest if one fails or the timeout passes.
 - read_javascript_data(data_name: str) -> list[dict]: Returns specified JSON file containing orders as a list of dictionaries.
-- format_dlob(dlob: list[dict] = read_javascript_data('dlob')) -> dict: Formats dlob data for program usability.
+- format_dlob(dlob: list[dict] = None) -> OrderBook: Formats dlob data for program usability.
 - read_archived_dataset() -> list[dict]: Reads and returns all archived datasets (for development purposes only).
 - read_archived_data(data_category: str) -> dict: Returns the latest archived dataset for a given data category.
 - delete_oldest_archived() -> None: Deletes oldest file in each subdirectory of data/archived.
@@ -18,7 +24,7 @@ Functions:
 - archive_data(data: dict) -> None: Archive dataset by creating a timestamped JSON and storing appropriate subdirectory in '/data/archived'.
 - keyword_in_data(data, keywords: list[str]) -> bool: Checks if any of the given keywords exist in the data dictionary keys.
 - make_data_readable(data: Union[dict, list]) -> Union[dict, list]: Converts BigNumber values to readable format. Formats data extracted from driftpy (Market and User data).
-- create_order_book(sorted_orders: list[dict], order_tick_size: float = 0.05) -> dict: Creates an order book. Handles both long and short orderbooks.
+- create_order_book(sorted_orders: list[dict], order_tick_size: float = 0.1) -> dict: Creates an order book in one pass. Handles both long and short orderbooks.
 - choose_strategy() -> None: Displays list of available strategies, prompts user selection to load given strategy. Pressing any key yields default strategy.
 - update_prices(orders: list[dict]) -> list[dict]: Updates dlob entries for orders with price 0.
 - filter_orders(orders: list[dict], filter: str='long', param: str='direction') -> list[dict]: Filter orders list by given field.
@@ -26,7 +32,7 @@ Functions:
 - get_dir_path(dir_name: str) -> str: Returns the absolute path of the requested directory.
 - print_all_data(dlob_data: list[dict], user_data: dict, market_data: dict) -> None: Formatted print of the datasets to the console.
 - print_orders(dlob: list[dict], maxprints: int = 3) -> None: Formatted printing of dlob orders up to maxprints.
-- print_ob(order_book: dict) -> None: Prints order book to console.
+- print_ob(order_book: dict | OrderBook, max_print: int, side: str, resolution) -> None: Prints order book to console, at a cached resolution for an OrderBook.
 - console_line() -> None: Prints separator line in console.
 
 Constants:
@@ -38,11 +44,11 @@ Constants:
 import os
 import json
 import datetime, time
-from copy import deepcopy
 
 from typing import Union, Any, List, Dict
 import asyncio
-from subprocess import run
+import socket
+from subprocess import run, Popen, DEVNULL, PIPE, STDOUT
 from solana.publickey import PublicKey
 from driftpy.constants.config import configs
 from driftpy.constants.numeric_constants import BASE_PRECISION, PRICE_PRECISION, QUOTE_PRECISION, PEG_PRECISION, FUNDING_RATE_PRECISION
@@ -54,6 +60,8 @@ from pathlib import Path
 base_path = Path(__file__).resolve().parent
 sys.path.append(str(base_path.parent))
 from src import *
+from dlob_binary import DLOBSnapshot, decode_dlob_snapshot, read_dlob_binary
+from order_book import OrderBook
 
 
 # Private key handler
@@ -87,10 +95,193 @@ def javascript_dir_path() -> str:
 
 
 # Fetching and handling of Javascript JSONs
+class DLOBSidecarClient:
+    """
+    Client for handle_dlob.js running in sidecar mode. The sidecar stays
+    subscribed to Drift and serves fresh snapshots over a Unix socket, so
+    each cycle skips the SDK cold start.
+
+    The connection is kept open between requests. If it drops, the client
+    reconnects, and respawns the sidecar if the node process has exited.
+
+    Attributes:
+        socket_path (str): Path of the Unix socket the sidecar listens on.
+        timeout (float): Seconds to wait for startup or for a response.
+        process (Popen): The sidecar process, if spawned by this client.
+    """
+
+    def __init__(self, socket_path: str = None, timeout: float = DLOB_SIDECAR_TIMEOUT, spawn: bool = True):
+        self.socket_path = socket_path or os.path.join(data_dir_path(), DLOB_SOCKET_NAME)
+        self.timeout = timeout
+        self.spawn = spawn
+        self.process = None
+        self.sock = None
+        self.reader = None
+        self.stream = None
+
+    def connect(self):
+        """Opens the socket connection, starting the sidecar first if needed."""
+        if self.sock is not None:
+            return
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+                break
+            except OSError:
+                sock.close()
+                if self.spawn and not self.is_running():
+                    self.start()
+                if time.monotonic() > deadline:
+                    raise Exception("APICallError: DLOB sidecar did not start in time")
+                time.sleep(0.5)
+        self.sock = sock
+        self.reader = sock.makefile('rb')
+
+    def start(self):
+        """Spawns `node handle_dlob.js --serve` in the background, with the ring and websocket options set in src/__init__.py."""
+        path = os.path.join(javascript_dir_path(), 'handle_dlob.js')
+        command = ["node", path, "--serve", "--socket", self.socket_path]
+        if USE_DLOB_RING:
+            command += ["--ring", os.path.join(data_dir_path(), DLOB_RING_NAME)]
+        if USE_WEBSOCKET_FEEDS:
+            command += ["--websocket"]
+        self.process = Popen(command, stdout=DEVNULL, stderr=DEVNULL)
+
+    def is_running(self) -> bool:
+        """Returns True if the sidecar spawned by this client is still alive."""
+        return self.process is not None and self.process.poll() is None
+
+    def request(self, request_type: str = 'dlob', retries: int = 1, **params) -> Union[dict, bytes]:
+        """
+        Sends a request to the sidecar and returns its decoded response.
+
+        Args:
+            request_type (str): 'dlob' for a snapshot or 'ping' for a health check.
+            retries (int): Number of reconnect attempts if the connection drops.
+            **params: Extra request fields, e.g. format='binary'.
+
+        Returns:
+            dict | bytes: The sidecar response. A 'dlob' response carries 'slot', 'dlob' and 'userorders';
+                with format='binary' the raw snapshot bytes are returned instead.
+
+        Raises:
+            Exception: If the sidecar cannot be reached or reports an error.
+        """
+        for attempt in range(retries + 1):
+            try:
+                self.connect()
+                self.sock.sendall((json.dumps({'type': request_type, **params}) + '\n').encode('utf-8'))
+                line = self.reader.readline()
+                if not line:
+                    raise ConnectionError("DLOB sidecar closed the connection")
+                response = json.loads(line)
+                if response.get('format') == 'binary':
+                    payload = self.reader.read(response['length'])
+                    if len(payload) < response['length']:
+                        raise ConnectionError("DLOB sidecar closed the connection")
+                    return payload
+                break
+            except OSError:
+                self.close()
+                if attempt == retries:
+                    raise Exception("APICallError: Lost connection to DLOB sidecar")
+        if not response.get('ok'):
+            raise Exception(f"APICallError: {response.get('error')}")
+        return response
+
+    async def request_async(self, request_type: str = 'dlob', retries: int = 1, **params) -> Union[dict, bytes]:
+        """
+        Coroutine version of request(), over a separate asyncio connection so
+        the event loop keeps running while the sidecar builds the snapshot.
+        If the call is cancelled (e.g. on timeout) that connection is closed,
+        so no partial response is left for the next request.
+
+        Args:
+            request_type (str): 'dlob' for a snapshot or 'ping' for a health check.
+            retries (int): Number of reconnect attempts if the connection drops.
+            **params: Extra request fields, e.g. format='binary'.
+
+        Returns:
+            dict | bytes: The sidecar response, as for request().
+
+        Raises:
+            Exception: If the sidecar cannot be reached or reports an error.
+        """
+        for attempt in range(retries + 1):
+            try:
+                if self.stream is None:
+                    await self._connect_async()
+                reader, writer = self.stream
+                writer.write((json.dumps({'type': request_type, **params}) + '\n').encode('utf-8'))
+                await writer.drain()
+                line = await reader.readline()
+                if not line:
+                    raise ConnectionError("DLOB sidecar closed the connection")
+                response = json.loads(line)
+                if response.get('format') == 'binary':
+                    return await reader.readexactly(response['length'])
+                break
+            except (OSError, asyncio.IncompleteReadError):
+                self._close_stream()
+                if attempt == retries:
+                    raise Exception("APICallError: Lost connection to DLOB sidecar")
+            except asyncio.CancelledError:
+                self._close_stream()
+                raise
+        if not response.get('ok'):
+            raise Exception(f"APICallError: {response.get('error')}")
+        return response
+
+    async def _connect_async(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                # Snapshot lines can be far larger than the default 64 KiB stream limit
+                self.stream = await asyncio.open_unix_connection(self.socket_path, limit=1 << 28)
+                return
+            except OSError:
+                if self.spawn and not self.is_running():
+                    self.start()
+                if time.monotonic() > deadline:
+                    raise Exception("APICallError: DLOB sidecar did not start in time")
+                await asyncio.sleep(0.5)
+
+    def _close_stream(self):
+        if self.stream is not None:
+            self.stream[1].close()
+            self.stream = None
+
+    def close(self):
+        """Closes the socket connection. The sidecar process keeps running."""
+        if self.reader is not None:
+            self.reader.close()
+        if self.sock is not None:
+            self.sock.close()
+        self.sock = None
+        self.reader = None
+        self._close_stream()
+
+    def shutdown(self):
+        """Asks the sidecar to unsubscribe and exit, then closes the connection."""
+        try:
+            self.request('shutdown', retries=0)
+        except Exception:
+            if self.is_running():
+                self.process.terminate()
+        self.close()
+
+dlob_sidecar = DLOBSidecarClient()
+"""DLOBSidecarClient: Shared sidecar connection used by fetch_javascript_json."""
+
 def fetch_javascript_json(data: str) -> list[dict]:
     """ 
     Retrieves data using the Drift Javascript SDK. The output is 
-    then parsed as a list of dictionaries.
+    then parsed as a list of dictionaries. When USE_DLOB_SIDECAR is
+    set the data is requested from the persistent sidecar, otherwise
+    node is run once and the JSON files in data/ are read back.
     
     Args:
         data (str= 'dlob' or 'userorders'): The name of the data to be fetched as a string.
@@ -102,12 +293,123 @@ def fetch_javascript_json(data: str) -> list[dict]:
     Raises:
         Exception: If there is a problem with the Javascript SDK retrieval or the data cannot be found.
     """
+    if USE_DLOB_SIDECAR:
+        return dlob_sidecar.request('dlob')[data]
+    path = os.path.join(javascript_dir_path(),'handle_dlob.js')
+    try: result = run(["node", path, "--json"], capture_output=True, text=True)
+    except: raise Exception("APICallError: Problem retrieval from Javascript SDK")
+    print(result.stdout)
+    return read_javascript_data(data)
+
+def fetch_binary_dlob() -> DLOBSnapshot:
+    """
+    Retrieves the DLOB as a binary snapshot, decoded into NumPy structured
+    arrays. Uses the sidecar when USE_DLOB_SIDECAR is set, otherwise runs
+    node once and reads data/dlob.bin.
+
+    Returns:
+        DLOBSnapshot: The decoded snapshot.
+
+    Raises:
+        Exception: If there is a problem with the Javascript SDK retrieval.
+    """
+    if USE_DLOB_SIDECAR:
+        return decode_dlob_snapshot(dlob_sidecar.request('dlob', format='binary'))
     path = os.path.join(javascript_dir_path(),'handle_dlob.js')
     try: result = run(["node", path], capture_output=True, text=True)
     except: raise Exception("APICallError: Problem retrieval from Javascript SDK")
     print(result.stdout)
+    return read_dlob_binary(os.path.join(data_dir_path(), 'dlob.bin'))
+
+async def run_javascript(*args: str, timeout: float = FETCH_TIMEOUT) -> str:
+    """
+    Runs handle_dlob.js once as an asyncio subprocess, so the event loop
+    keeps running meanwhile. The process is killed if the call times out
+    or is cancelled.
+
+    Args:
+        *args (str): Command line options, e.g. '--json'.
+        timeout (float): Seconds to wait for node to exit.
+
+    Returns:
+        str: The script's console output.
+
+    Raises:
+        Exception: If node cannot be started or does not finish in time.
+    """
+    path = os.path.join(javascript_dir_path(), 'handle_dlob.js')
+    try: process = await asyncio.create_subprocess_exec("node", path, *args, stdout=PIPE, stderr=STDOUT)
+    except OSError: raise Exception("APICallError: Problem retrieval from Javascript SDK")
+    try:
+        output, _ = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise Exception(f"APICallError: Javascript SDK retrieval timed out after {timeout}s")
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+    return output.decode()
+
+async def fetch_javascript_json_async(data: str) -> list[dict]:
+    """
+    Coroutine version of fetch_javascript_json that does not block the event loop.
+
+    Args:
+        data (str= 'dlob' or 'userorders'): The name of the data to be fetched as a string.
+
+    Returns:
+        list[dict]: The fetched data as a list of dictionaries.
+    """
+    if USE_DLOB_SIDECAR:
+        return (await dlob_sidecar.request_async('dlob'))[data]
+    print(await run_javascript("--json"))
     return read_javascript_data(data)
 
+async def fetch_binary_dlob_async() -> DLOBSnapshot:
+    """
+    Coroutine version of fetch_binary_dlob that does not block the event loop.
+
+    Returns:
+        DLOBSnapshot: The decoded snapshot.
+    """
+    if USE_DLOB_SIDECAR:
+        return decode_dlob_snapshot(await dlob_sidecar.request_async('dlob', format='binary'))
+    print(await run_javascript())
+    return read_dlob_binary(os.path.join(data_dir_path(), 'dlob.bin'))
+
+async def gather_or_cancel(*aws, timeout: float = None) -> list:
+    """
+    Runs awaitables concurrently, like asyncio.gather, but as soon as one
+    of them fails or the timeout passes the others are cancelled.
+
+    Args:
+        *aws: Coroutines or futures to run.
+        timeout (float): Seconds to wait for all of them, or None to wait indefinitely.
+
+    Returns:
+        list: Their results, in order.
+
+    Raises:
+        Exception: The first exception raised, or an APICallError on timeout.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        done, pending = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        # Also reached when the caller itself is cancelled
+        unfinished = [task for task in tasks if not task.done()]
+        for task in unfinished:
+            task.cancel()
+        await asyncio.gather(*unfinished, return_exceptions=True)
+    for task in tasks:
+        if task in done and task.exception() is not None:
+            raise task.exception()
+    if pending:
+        raise Exception(f"APICallError: Data fetch timed out after {timeout}s")
+    return [task.result() for task in tasks]
+
 def read_javascript_data(data_name: str) -> list[dict]:
     """
     Return specified JSON file containing orders as list of dictionaries.
@@ -122,20 +424,19 @@ def read_javascript_data(data_name: str) -> list[dict]:
     with open(path, 'r') as f: js_data = json.load(f)
     return js_data
 
-def format_dlob(dlob: list[dict] = read_javascript_data('dlob')) -> dict:
+def format_dlob(dlob: Union[list[dict], DLOBSnapshot] = None) -> OrderBook:
     """
     Formats the provided dlob data in a more human-readable format
 
     Args:
-        dlob (dict): The dlob data to format
+        dlob (list[dict] | DLOBSnapshot, optional): The dlob data to format. Reads data/dlob.json if None.
 
     Returns:
-        dict: A formatted version of the provided dlob data
-
-        The returned dictionary has the following keys:
+        OrderBook: An array-backed book of the limit orders, which also reads as
+        a dictionary (each key is built on first access):
 
-        - 'best_bid': A float representing the highest bid in the orderbook
-        - 'best_ask': A float representing the lowest ask in the orderbook
+        - 'best_bid': A float representing the highest bid in the orderbook, None if there are no bids
+        - 'best_ask': A float representing the lowest ask in the orderbook, None if there are no asks
         - 'long_orderbook': A dictionary representing the long orderbook, with the following keys:
             - 'price': A float representing the price of the order
             - 'quantity': A float representing the quantity of the order
@@ -150,36 +451,15 @@ def format_dlob(dlob: list[dict] = read_javascript_data('dlob')) -> dict:
             - 'oraclePriceOffset': A float representing the offset from the oracle price of the order
         - 'short_orders': A list of dictionaries representing the top short orders, with the same keys as 'long_orders'
 
-        The 'long_orderbook' and 'short_orderbook' dictionaries contain one entry for each price in the orderbook. The 'cumulative_quantity' 
-        value is the sum of the 'quantity' values for all orders at or below the current price.
-        The 'long_orders' and 'short_orders' lists contain the top 3 orders in each category, sorted by price.
-        Each dictionary in the 'long_orders' and 'short_orders' lists has the same keys as described above for individual orders.
-    """
-    dlob = read_javascript_data('dlob')
-    updated_dlob = update_prices(dlob)
-    updated_dlob = filter_orders(updated_dlob, "limit",'orderType')
-    filtered_longs = filter_orders(updated_dlob, 'long', 'direction')
-    filtered_shorts = filter_orders(updated_dlob,'short', 'direction')
-    sorted_longs = sorted(filtered_longs, key=lambda x: x['price'], reverse=True)
-    sorted_shorts = sorted(filtered_shorts, key=lambda x: x['price'])
-    if len(sorted_shorts) > 0:
-        return {
-        'best_bid': sorted_longs[0]['price'],
-        'best_ask': sorted_shorts[0]['price'],
-        'long_orderbook': create_order_book(sorted_longs, 0.1),
-        'short_orderbook': create_order_book(sorted_shorts, 0.1),
-        'long_orders': sorted_longs,
-        'short_orders': sorted_shorts
-        }
-    else:
-        return {
-        'best_bid': sorted_longs[0]['price'],
-        'best_ask': None,
-        'long_orderbook': create_order_book(sorted_longs, 0.1),
-        'short_orderbook': create_order_book(sorted_shorts, 0.1),
-        'long_orders': sorted_longs,
-        'short_orders': sorted_shorts
-        }
+        The 'long_orderbook' and 'short_orderbook' dictionaries contain one entry for each price level (0.1 wide) in the orderbook. The 'cumulative_quantity' 
+        value is the sum of the 'quantity' values for all levels at or better than the current price.
+        The 'long_orders' and 'short_orders' lists contain the orders of each side, sorted best price first.
+    """
+    if dlob is None:
+        dlob = read_javascript_data('dlob')
+    if isinstance(dlob, DLOBSnapshot):
+        return OrderBook.from_snapshot(dlob)
+    return OrderBook.from_orders(dlob)
 
 # Archived Data Helper Functions
 def read_archived_dataset() -> list[dict]:
@@ -276,6 +556,8 @@ def archive_data(data: dict):
     Raises:
         ValueError: If the input data is not valid for archiving.
     """
+    if isinstance(data, OrderBook):
+        data = data.to_dict()
     if keyword_in_data(data, ['collateral','leverage']): 
         data_category = 'user'
     elif keyword_in_data(data,['mark', 'spread','twap', 'volume']): 
@@ -343,11 +625,13 @@ def make_data_readable(data: Union[dict, list]) -> Union[dict, list]:
 
 def create_order_book(sorted_orders: list[dict], order_tick_size: float = 0.1) -> dict:
     """
-    Creates an order book from a list of sorted orders.
+    Creates an order book from a list of sorted orders in a single pass:
+    each order is added to its price level, then cumulative quantities are
+    filled in once per level.
 
     Args:
         sorted_orders (list[dict]): The list of sorted orders.
-        order_tick_size (float, optional): The tick size to generate order blocks. Default is 0.05.
+        order_tick_size (float, optional): The tick size to generate order blocks. Default is 0.1.
 
     Returns:
         dict: The order book representing either longs or shorts orderbook.
@@ -359,14 +643,16 @@ def create_order_book(sorted_orders: list[dict], order_tick_size: float = 0.1) -
             group = ((order['price']+ order_tick_size) // order_tick_size) * order_tick_size
         else:
             group = ((order['price']+order_tick_size/100)//order_tick_size) * order_tick_size
-        if group not in order_book:
+        level = order_book.get(str(group))
+        if level is None:
             order_book[str(group)] = {'price': group, 'quantity': order['baseAssetAmount']}
-        order_book[str(group)]['quantity'] += order['baseAssetAmount']
-        # Create cumulative sum for quantities
-        cumulative_quantity = 0
-        for price, order in order_book.items():
-            cumulative_quantity += order['quantity']
-            order['cumulative_quantity'] = cumulative_quantity      
+        else:
+            level['quantity'] += order['baseAssetAmount']
+    # Create cumulative sum for quantities, best level first
+    cumulative_quantity = 0
+    for level in order_book.values():
+        cumulative_quantity += level['quantity']
+        level['cumulative_quantity'] = cumulative_quantity
     return order_book
 
 def choose_strategy() -> str:
@@ -432,6 +718,7 @@ def input_with_timeout(prompt, timeout=10.0):
 def update_prices(orders: list[dict]) -> list[dict]:
     """
     Updates entries for orders with price 0 in the given list of orders.
+    Only the oracle-pegged orders are copied; the others are returned as is.
 
     Args:
         orders (list[dict]): The list of orders to update.
@@ -439,11 +726,8 @@ def update_prices(orders: list[dict]) -> list[dict]:
     Returns:
         list[dict]: The updated list of orders.
     """    
-    updated_orders = deepcopy(orders)
-    for i, order in enumerate(orders):
-        if updated_orders[i]['price'] == 0:
-            updated_orders[i]['price'] = order['oracle_price'] + order['oraclePriceOffset']
-    return updated_orders
+    return [{**order, 'price': order['oracle_price'] + order['oraclePriceOffset']} if order['price'] == 0 else order
+            for order in orders]
 
 def filter_orders(orders: list[dict], filter: str='long', param: str='direction'):
     """Filters a list of orders by the given field.
@@ -497,8 +781,8 @@ def print_all_data(dlob_data: list[dict], user_data: dict, market_data: dict):
     except:
         print("Highest bid: ", f"{dlob_data['best_bid']:.3f}",
         "Lowest ask: ", f"{dlob_data['best_ask']}, # Limit Orders: {sum}")       
-    #print("\nOrderbook Bids:"), print_ob(dlob_data['long_orderbook'])
-    #print("Orderbook Asks:"), print_ob(dlob_data['short_orderbook']) 
+    #print("\nOrderbook Bids:"), print_ob(dlob_data, side='long', resolution=0.1)
+    #print("Orderbook Asks:"), print_ob(dlob_data, side='short', resolution=0.1) 
     console_line()   
     print("Market Maker User Data: \n", user_data)
     print(type(user_data['user_position']))
@@ -519,13 +803,19 @@ def print_orders(dlob: list[dict], maxprints: int = 3):
         else:
             print(order,'\n')
 
-def print_ob(order_book, max_print: int = 5):
+def print_ob(order_book, max_print: int = 5, side: str = 'long', resolution: Union[float, str] = None):
     """Prints order book to console.
 
     Args:
-        order_book (dict): The dictionary that represents the data for the order book.
+        order_book (dict | OrderBook): The dictionary that represents the data for the order book,
+            or an OrderBook to print one side of.
         max_print (int): Maximum orderbook items printed to console
+        side (str): Side printed when order_book is an OrderBook: 'long' or 'short'.
+        resolution (float | str): Level width printed when order_book is an OrderBook: a tick size,
+            'bps' (ORDERBOOK_BPS_BUCKET basis points of the mid price) or None for 0.1.
     """
+    if isinstance(order_book, OrderBook):
+        order_book = order_book.order_book(side, resolution)
     counter = 0
     for key, value in order_book.items():
         if counter == max_print: